@@ -0,0 +1,433 @@
+"""
+D&D 5E Benchmarks
+Times inventory and roster hot paths on synthetic data and compares runs against a stored baseline.
+
+Usage: python benchmark.py [--sizes 1000,10000] [--output results.json] [--baseline baseline.json]
+       python benchmark.py --only startup. [--startup-budget 100]
+"""
+
+import argparse
+import contextlib
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, replace
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from campaign_data import generate_items, generate_roster, write_inventory, write_roster
+from character_maker import CharacterMakerCLI, CharacterManager
+from data_check import check_file
+from dnd_inventory import InventoryItem, InventoryManager
+from game_data import snapshot_path
+from roster_codecs import encode, read_file
+
+DEFAULT_SIZES = (1000, 10000)
+DEFAULT_REPEAT = 5
+SEED = 1
+
+# Slowdown against the baseline (as a fraction) before a benchmark fails
+DEFAULT_TOLERANCE = 0.25
+# Differences smaller than this many seconds are timer noise, never regressions
+NOISE_FLOOR = 0.0005
+
+# Calls timed per run by benchmarks of single lookups and edits
+CALLS = 200
+
+# Roster storage formats timed besides the default readable JSON
+STORAGE_FORMATS = ("compact", "binary", "compact+gzip", "binary+lzma")
+
+# Longest a tool may take to import and reach its first menu, in seconds
+DEFAULT_STARTUP_BUDGET = 0.1
+
+UTIL_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+@dataclass
+class Benchmark:
+    """setup(size, workdir) builds the state once per size; reset(state) runs untimed
+    before each timed run(state); calls is how many operations one run makes."""
+    name: str
+    setup: Callable[[int, str], Any]
+    run: Callable[[Any], Any]
+    calls: Callable[[int], int] = lambda size: 1
+    reset: Optional[Callable[[Any], Any]] = None
+    max_size: int = 10 ** 6
+    # run returns the seconds to record (e.g. measured in a subprocess) instead of being timed
+    self_timed: bool = False
+
+
+def synthetic_items(count: int, seed: int = SEED) -> List[InventoryItem]:
+    """count item stacks with the generator's default distributions."""
+    return [InventoryItem.from_dict(record) for record in generate_items(count, seed)]
+
+
+@contextlib.contextmanager
+def _quiet():
+    """The tools print on most calls; send that to /dev/null while timing, as a terminal would cost."""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+# Inventory benchmarks: size is the number of item stacks held
+
+def _inventory(size: int, workdir: str) -> InventoryManager:
+    with _quiet():
+        manager = InventoryManager(os.path.join(workdir, f"inventory_{size}.json"))
+    manager.character_name = "Benchmark"
+    manager.items = synthetic_items(size)
+    return manager
+
+
+def _inventory_file(size: int, workdir: str) -> str:
+    path = os.path.join(workdir, f"inventory_{size}.json")
+    write_inventory(path, generate_items(size, SEED))
+    return path
+
+
+def _inventory_edits(size: int, workdir: str) -> Dict[str, Any]:
+    manager = _inventory(size, workdir)
+    rng = random.Random(SEED)
+    picks = [rng.choice(manager.items) for _ in range(CALLS)]
+    return {"manager": manager, "base": list(manager.items),
+            "quantities": [item.quantity for item in manager.items],
+            "new": [replace(item, name=f"New {item.name}") for item in synthetic_items(CALLS // 2, SEED + 1)],
+            "stacks": [InventoryItem.from_dict(item.to_dict()) for item in picks[:CALLS // 2]],
+            "names": [item.name.upper() for item in picks]}
+
+
+def _reset_inventory(state: Dict[str, Any]):
+    state["manager"].items = list(state["base"])
+    for item, quantity in zip(state["base"], state["quantities"]):
+        item.quantity = quantity
+
+
+def _add_items(state: Dict[str, Any]):
+    manager = state["manager"]
+    for new, stack in zip(state["new"], state["stacks"]):
+        manager.add_item(new)
+        manager.add_item(stack)
+
+
+def _find_items(state: Dict[str, Any]):
+    manager = state["manager"]
+    for name in state["names"]:
+        manager.find_item_by_name(name)
+    manager.find_item_by_name("No Such Item")
+
+
+def _remove_items(state: Dict[str, Any]):
+    manager = state["manager"]
+    for name in state["names"]:
+        manager.remove_item(name, 1)
+
+
+SORT_KEYS = ["name", "weight", "rarity", "quantity", "value", "type", "total_weight"]
+SEARCHES = ["rope", "glows", "potion", "ring of protection 1", "nothing matches this"]
+
+
+def _sort_items(manager: InventoryManager):
+    for key in SORT_KEYS:
+        manager.sort_items(key)
+
+
+def _search_items(manager: InventoryManager):
+    for query in SEARCHES:
+        manager.search_items(query)
+
+
+def _totals(manager: InventoryManager):
+    manager.get_total_weight()
+    manager.get_total_value()
+
+
+def _load_inventory(path: str):
+    InventoryManager(path)
+
+
+def _drop_snapshot(path: str):
+    """Make the next load parse the JSON (and write a fresh snapshot) rather than reuse the last one."""
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(snapshot_path(path))
+
+
+# Roster benchmarks: size is the number of characters
+
+def _roster_file(size: int, workdir: str) -> str:
+    path = os.path.join(workdir, f"characters_{size}.json")
+    write_roster(path, generate_roster(size, SEED))
+    return path
+
+
+def _roster(size: int, workdir: str) -> CharacterManager:
+    return CharacterManager(_roster_file(size, workdir), verbose=False)
+
+
+def _load_roster(path: str):
+    CharacterManager(path, verbose=False)
+
+
+def _roster_file_as(storage_format: str) -> Callable[[int, str], str]:
+    def setup(size: int, workdir: str) -> str:
+        path = os.path.join(workdir, f"characters_{size}.{storage_format}")
+        with open(path, 'wb') as f:
+            f.write(encode(read_file(_roster_file(size, workdir))[0], storage_format))
+        return path
+    return setup
+
+
+def _roster_as(storage_format: str) -> Callable[[int, str], CharacterManager]:
+    def setup(size: int, workdir: str) -> CharacterManager:
+        return CharacterManager(_roster_file_as(storage_format)(size, workdir), verbose=False)
+    return setup
+
+
+def _roster_lookups(size: int, workdir: str) -> Dict[str, Any]:
+    manager = _roster(size, workdir)
+    rng = random.Random(SEED)
+    names = manager.list_characters()
+    return {"manager": manager, "names": [rng.choice(names) for _ in range(CALLS)]}
+
+
+def _get_characters(state: Dict[str, Any]):
+    manager = state["manager"]
+    for name in state["names"]:
+        manager.get_character(name)
+    manager.list_characters()
+
+
+def _derive(manager: CharacterManager):
+    # The editor's recalculation only needs the CLI for its spell stats helper
+    cli = CharacterMakerCLI.__new__(CharacterMakerCLI)
+    for character in manager.characters.values():
+        cli.recalculate_level_stats(character)
+
+
+# Start-up benchmarks: a fresh interpreter imports the tool and sets up its menu
+# next to a data file of size records, which should be left for later
+
+STARTUP_SCRIPT = """
+import sys, time
+sys.path.insert(0, {util_dir!r})
+start = time.perf_counter()
+{code}
+print(time.perf_counter() - start)
+"""
+
+
+def _startup(code: str, data_file: str, write: Callable[[str, int], Any]) -> Callable[[int, str], Dict[str, Any]]:
+    def setup(size: int, workdir: str) -> Dict[str, Any]:
+        directory = os.path.join(workdir, f"startup_{size}")
+        os.makedirs(directory, exist_ok=True)
+        write(os.path.join(directory, data_file), size)
+        # Bytecode is cached as an installed tool's would be, so only the first (untimed) run compiles
+        env = {key: value for key, value in os.environ.items() if key != "PYTHONDONTWRITEBYTECODE"}
+        state = {"directory": directory, "env": env,
+                 "script": STARTUP_SCRIPT.format(util_dir=UTIL_DIR, code=code)}
+        _run_startup(state)
+        return state
+    return setup
+
+
+def _run_startup(state: Dict[str, Any]) -> float:
+    output = subprocess.run([sys.executable, "-c", state["script"]], cwd=state["directory"], env=state["env"],
+                            capture_output=True, text=True, check=True).stdout
+    return float(output.splitlines()[-1])
+
+
+BENCHMARKS = [
+    Benchmark("inventory.load", _inventory_file, _load_inventory),
+    Benchmark("inventory.load_cold", _inventory_file, _load_inventory, reset=_drop_snapshot),
+    Benchmark("inventory.save", _inventory, InventoryManager.save_inventory),
+    Benchmark("inventory.add", _inventory_edits, _add_items, lambda size: CALLS, _reset_inventory),
+    Benchmark("inventory.find", _inventory_edits, _find_items, lambda size: CALLS + 1),
+    Benchmark("inventory.remove", _inventory_edits, _remove_items, lambda size: CALLS, _reset_inventory),
+    Benchmark("inventory.sort", _inventory, _sort_items, lambda size: len(SORT_KEYS)),
+    Benchmark("inventory.search", _inventory, _search_items, lambda size: len(SEARCHES)),
+    Benchmark("inventory.totals", _inventory, _totals, lambda size: 2),
+    Benchmark("inventory.check", _inventory_file, check_file),
+    # Characters are ~2.5 KB of JSON each, so rosters stop at 10^5
+    Benchmark("roster.load", _roster_file, _load_roster, max_size=10 ** 5),
+    Benchmark("roster.load_cold", _roster_file, _load_roster, reset=_drop_snapshot, max_size=10 ** 5),
+    *[Benchmark(f"roster.load_cold.{storage_format}", _roster_file_as(storage_format), _load_roster,
+                reset=_drop_snapshot, max_size=10 ** 5) for storage_format in STORAGE_FORMATS],
+    Benchmark("roster.save", _roster, CharacterManager.save_characters, max_size=10 ** 5),
+    *[Benchmark(f"roster.save.{storage_format}", _roster_as(storage_format), CharacterManager.save_characters,
+                max_size=10 ** 5) for storage_format in STORAGE_FORMATS],
+    Benchmark("roster.check", _roster_file, check_file, max_size=10 ** 5),
+    Benchmark("roster.get", _roster_lookups, _get_characters, lambda size: CALLS + 1, max_size=10 ** 5),
+    Benchmark("character.derive", _roster, _derive, lambda size: size, max_size=10 ** 5),
+    Benchmark("startup.character_maker",
+              _startup("import character_maker\ncharacter_maker.CharacterMakerCLI()", "characters.json",
+                       lambda path, size: write_roster(path, generate_roster(size, SEED))),
+              _run_startup, max_size=10 ** 5, self_timed=True),
+    Benchmark("startup.dnd_inventory",
+              _startup("import dnd_inventory\ndnd_inventory.InventoryManager(lazy=True)", "character_inventory.json",
+                       lambda path, size: write_inventory(path, generate_items(size, SEED))),
+              _run_startup, self_timed=True),
+]
+
+
+def time_benchmark(benchmark: Benchmark, size: int, repeat: int, workdir: str) -> Dict[str, Any]:
+    """Time repeat runs of a benchmark at one size (garbage collection off while timing)."""
+    with _quiet():
+        state = benchmark.setup(size, workdir)
+    times = []
+    for _ in range(repeat):
+        with _quiet():
+            if benchmark.reset:
+                benchmark.reset(state)
+            gc.collect()
+            gc.disable()
+            try:
+                start = time.perf_counter()
+                measured = benchmark.run(state)
+                times.append(measured if benchmark.self_timed else time.perf_counter() - start)
+            finally:
+                gc.enable()
+    calls = benchmark.calls(size)
+    return {"benchmark": benchmark.name, "size": size, "calls": calls, "times": times,
+            "min": min(times), "median": statistics.median(times),
+            "per_call": statistics.median(times) / calls}
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, repeat: int = DEFAULT_REPEAT, only: Optional[str] = None,
+                   progress: Callable[[str], Any] = lambda message: None) -> Dict[str, Any]:
+    """Run every benchmark (those whose name contains only) at each size it supports."""
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="dnd_bench_") as workdir:
+        for benchmark in BENCHMARKS:
+            if only and only not in benchmark.name:
+                continue
+            for size in sizes:
+                if size > benchmark.max_size:
+                    continue
+                progress(f"{benchmark.name} @ {size}")
+                result = time_benchmark(benchmark, size, repeat, workdir)
+                results[f"{benchmark.name}@{size}"] = result
+    return {
+        "meta": {"time": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                 "python": platform.python_version(), "implementation": platform.python_implementation(),
+                 "platform": platform.platform(), "cpus": os.cpu_count(),
+                 "sizes": list(sizes), "repeat": repeat},
+        "results": results
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any],
+            tolerance: float = DEFAULT_TOLERANCE) -> List[Dict[str, Any]]:
+    """Compare best times per benchmark and size.
+
+    Status is "regression" when a run is more than tolerance slower (and by
+    more than NOISE_FLOOR), "faster" when that much quicker, otherwise "ok";
+    "new" and "missing" mark results only one side has.
+    """
+    rows = []
+    old, new = baseline.get("results", {}), current.get("results", {})
+    for key in list(new) + [key for key in old if key not in new]:
+        if key not in old or key not in new:
+            rows.append({"key": key, "status": "new" if key in new else "missing",
+                         "baseline": old.get(key, {}).get("min"), "current": new.get(key, {}).get("min")})
+            continue
+        before, after = old[key]["min"], new[key]["min"]
+        ratio = after / before if before else float("inf")
+        if after - before > NOISE_FLOOR and ratio > 1 + tolerance:
+            status = "regression"
+        elif before - after > NOISE_FLOOR and ratio < 1 / (1 + tolerance):
+            status = "faster"
+        else:
+            status = "ok"
+        rows.append({"key": key, "status": status, "baseline": before, "current": after, "ratio": ratio})
+    return rows
+
+
+def _seconds(value: Optional[float]) -> str:
+    if value is None:
+        return "-"
+    if value < 1e-3:
+        return f"{value * 1e6:.1f}us"
+    if value < 1:
+        return f"{value * 1e3:.2f}ms"
+    return f"{value:.3f}s"
+
+
+def format_results(results: Dict[str, Any]) -> str:
+    lines = [f"{'Benchmark':<32} {'Size':>8} {'Best':>10} {'Median':>10} {'Per call':>10}"]
+    for key, result in results["results"].items():
+        lines.append(f"{result['benchmark']:<32} {result['size']:>8} {_seconds(result['min']):>10} "
+                     f"{_seconds(result['median']):>10} {_seconds(result['per_call']):>10}")
+    return "\n".join(lines)
+
+
+def format_comparison(rows: List[Dict[str, Any]]) -> str:
+    lines = [f"{'Benchmark':<38} {'Baseline':>10} {'Current':>10} {'Change':>8}  Status"]
+    for row in rows:
+        change = f"{(row['ratio'] - 1) * 100:+.0f}%" if "ratio" in row else "-"
+        lines.append(f"{row['key']:<38} {_seconds(row['baseline']):>10} {_seconds(row['current']):>10} "
+                     f"{change:>8}  {row['status']}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the benchmarks; exits 1 when a baseline is given and something regressed."""
+    parser = argparse.ArgumentParser(description="Benchmark the inventory and character tools.")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="comma-separated data sizes, up to 1000000 (default: 1000,10000)")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="timed runs per benchmark and size")
+    parser.add_argument("--only", help="only benchmarks whose name contains this, e.g. inventory. or .load")
+    parser.add_argument("--output", help="write the results as JSON (use one as a later --baseline)")
+    parser.add_argument("--baseline", help="results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed slowdown before failing (default: 0.25 = 25%%)")
+    parser.add_argument("--startup-budget", type=float, default=DEFAULT_STARTUP_BUDGET * 1000,
+                        help="fail if a tool takes longer than this many milliseconds to start (default: 100)")
+    args = parser.parse_args(argv)
+
+    try:
+        sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    except ValueError:
+        parser.error("--sizes must be comma-separated whole numbers")
+    if args.repeat < 1 or any(size < 1 for size in sizes):
+        parser.error("--repeat and --sizes must be positive")
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+
+    results = run_benchmarks(sizes, args.repeat, args.only,
+                             lambda message: print(f"  {message}...", file=sys.stderr))
+    print(format_results(results))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+    slow_starts = [key for key, result in results["results"].items()
+                   if result["benchmark"].startswith("startup.") and result["min"] * 1000 > args.startup_budget]
+    if slow_starts:
+        print(f"\nOver the {args.startup_budget:g}ms start-up budget: {', '.join(slow_starts)}")
+    if baseline is None:
+        return 1 if slow_starts else 0
+
+    # Only hold this run to the baseline results it set out to repeat
+    baseline["results"] = {key: result for key, result in baseline.get("results", {}).items()
+                           if result["size"] in sizes and (not args.only or args.only in result["benchmark"])}
+    rows = compare(results, baseline, args.tolerance)
+    print()
+    print(format_comparison(rows))
+    regressions = [row["key"] for row in rows if row["status"] == "regression"]
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+        return 1
+    print("\nNo regressions.")
+    return 1 if slow_starts else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,274 @@
+"""
+D&D 5E Campaign Data Generator
+Streams large, seeded rosters and inventories in the formats the character maker and inventory manager load.
+
+Usage: python campaign_data.py roster|inventory --count N --output FILE [--seed S] [distribution options]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+from bisect import bisect
+from itertools import accumulate
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Union
+
+from character_maker import DND_CLASSES
+from dnd_inventory import Rarity
+from npc_generator import NPCTemplate, generate_npcs
+
+# Either a list of equally likely options or option -> relative weight
+Weights = Union[Sequence[Any], Mapping[Any, float]]
+
+# List length weights are spread over for the NPC generator's equal-chance picks
+_WEIGHT_RESOLUTION = 1000
+
+DEFAULT_RACES = {"Human": 30, "Elf": 15, "Dwarf": 15, "Halfling": 12, "Half-Orc": 8,
+                 "Gnome": 8, "Tiefling": 6, "Dragonborn": 6}
+# Most campaigns are low level: 40% at 1-4, 35% at 5-10, 20% at 11-16, 5% at 17-20
+DEFAULT_LEVELS = {**{level: 10 for level in range(1, 5)}, **{level: 35 / 6 for level in range(5, 11)},
+                  **{level: 20 / 6 for level in range(11, 17)}, **{level: 5 / 4 for level in range(17, 21)}}
+
+DEFAULT_ITEM_TYPES = {"Gear": 30, "Weapon": 15, "Potion": 12, "Ammunition": 10, "Tool": 10,
+                      "Armor": 8, "Scroll": 8, "Wondrous Item": 7}
+DEFAULT_RARITIES = {"Common": 70, "Uncommon": 18, "Rare": 8, "Very Rare": 3, "Legendary": 0.9, "Artifact": 0.1}
+DEFAULT_STACKS = {1: 60, 2: 10, 5: 10, 10: 8, 20: 7, 50: 5}
+
+# Chance a magical item needs (and has) attunement
+ATTUNEMENT_CHANCE = 0.3
+RARITY_VALUE_MULTIPLIER = {"Common": 1, "Uncommon": 10, "Rare": 50, "Very Rare": 250, "Legendary": 1000, "Artifact": 5000}
+
+# Item type -> (name, weight in lb, value in gp)
+ITEM_CATALOG = {
+    "Gear": [("Rope, Hempen (50 feet)", 10, 1), ("Torch", 1, 0.01), ("Rations (1 day)", 2, 0.5),
+             ("Bedroll", 7, 1), ("Waterskin", 5, 0.2), ("Hooded Lantern", 2, 5), ("Backpack", 5, 2),
+             ("Tinderbox", 1, 0.5), ("Crowbar", 5, 2), ("Piton", 0.25, 0.05)],
+    "Weapon": [("Longsword", 3, 15), ("Dagger", 1, 2), ("Shortbow", 2, 25), ("Handaxe", 2, 5),
+               ("Spear", 3, 1), ("Rapier", 2, 25), ("Warhammer", 2, 15), ("Light Crossbow", 5, 25)],
+    "Potion": [("Potion of Healing", 0.5, 50), ("Potion of Greater Healing", 0.5, 150), ("Antitoxin", 0, 50),
+               ("Potion of Climbing", 0.5, 75), ("Oil of Slipperiness", 0.5, 100)],
+    "Ammunition": [("Arrows (20)", 1, 1), ("Crossbow Bolts (20)", 1.5, 1), ("Sling Bullets (20)", 1.5, 0.04)],
+    "Tool": [("Thieves' Tools", 1, 25), ("Healer's Kit", 3, 5), ("Herbalism Kit", 3, 5),
+             ("Smith's Tools", 8, 20), ("Lute", 2, 35)],
+    "Armor": [("Leather Armor", 10, 10), ("Studded Leather Armor", 13, 45), ("Chain Mail", 55, 75),
+              ("Scale Mail", 45, 50), ("Breastplate", 20, 400), ("Shield", 6, 10)],
+    "Scroll": [("Spell Scroll (Cantrip)", 0, 25), ("Spell Scroll (1st Level)", 0, 75),
+               ("Spell Scroll (3rd Level)", 0, 300), ("Treasure Map", 0, 1)],
+    "Wondrous Item": [("Bag of Holding", 15, 500), ("Cloak of Protection", 1, 350), ("Boots of Elvenkind", 1, 250),
+                      ("Ring of Protection", 0, 350), ("Amulet of Health", 1, 800), ("Wand of Magic Missiles", 1, 400)]
+}
+DESCRIPTIONS = ["", "", "", "Well worn", "Freshly made", "Stamped with a guild mark", "Glows faintly"]
+
+
+def _weighted(weights: Weights, kind: str) -> Dict[Any, float]:
+    """Weights as option -> weight, validated; a plain list weighs every option equally."""
+    if not isinstance(weights, Mapping):
+        weights = {option: 1 for option in weights}
+    if not weights:
+        raise ValueError(f"Need at least one {kind}")
+    for option, weight in weights.items():
+        if isinstance(weight, bool) or not isinstance(weight, (int, float)) or weight < 0:
+            raise ValueError(f"Weight for {kind} '{option}' must be a number of at least 0")
+    if not any(weights.values()):
+        raise ValueError(f"At least one {kind} needs a weight above 0")
+    return dict(weights)
+
+
+def expand_weights(weights: Weights, kind: str = "option") -> List[Any]:
+    """A list in which each option appears in proportion to its weight (every weighted option at least once)."""
+    weights = _weighted(weights, kind)
+    total = sum(weights.values())
+    options = []
+    for option, weight in weights.items():
+        if weight:
+            options.extend([option] * max(1, round(weight / total * _WEIGHT_RESOLUTION)))
+    return options
+
+
+class _Picker:
+    """Draws options by weight from a seeded stream."""
+
+    def __init__(self, weights: Weights, kind: str):
+        weights = _weighted(weights, kind)
+        self.options = list(weights)
+        self.cumulative = list(accumulate(weights.values()))
+        self.total = self.cumulative[-1]
+
+    def __call__(self, rng: random.Random) -> Any:
+        return self.options[bisect(self.cumulative, rng.random() * self.total)]
+
+
+def roster_template(classes: Optional[Weights] = None, levels: Optional[Weights] = None,
+                    races: Optional[Weights] = None, name: str = "NPC", **options) -> NPCTemplate:
+    """An NPC template drawing class, level and race from the given distributions.
+
+    Classes default to all of them equally, levels and races to DEFAULT_LEVELS
+    and DEFAULT_RACES. Other NPCTemplate fields can be passed through.
+    """
+    template = NPCTemplate(name=name,
+                           classes=expand_weights(classes if classes is not None else list(DND_CLASSES), "class"),
+                           levels=expand_weights(levels if levels is not None else DEFAULT_LEVELS, "level"),
+                           races=expand_weights(races if races is not None else DEFAULT_RACES, "race"),
+                           **options)
+    template.validate()
+    return template
+
+
+def generate_roster(count: int, seed: Optional[int] = None, template: Optional[NPCTemplate] = None,
+                    workers: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """count character records as load_characters reads them, named "<template name> <n>" from 1."""
+    return generate_npcs(template or roster_template(), count, seed, workers=workers)
+
+
+def generate_items(count: int, seed: Optional[int] = None, item_types: Optional[Weights] = None,
+                   rarities: Optional[Weights] = None, stacks: Optional[Weights] = None,
+                   unique_names: bool = True) -> Iterator[Dict[str, Any]]:
+    """count item records as load_inventory reads them.
+
+    Anything rarer than Common is magical (with a chance of attunement) and
+    worth more. With unique_names each stack is numbered, as if nothing
+    had stacked; otherwise the same item can appear in several stacks.
+    """
+    pick_type = _Picker(item_types if item_types is not None else DEFAULT_ITEM_TYPES, "item type")
+    pick_rarity = _Picker(rarities if rarities is not None else DEFAULT_RARITIES, "rarity")
+    pick_stack = _Picker(stacks if stacks is not None else DEFAULT_STACKS, "stack size")
+    unknown = [item_type for item_type in pick_type.options if item_type not in ITEM_CATALOG]
+    if unknown:
+        raise ValueError(f"Unknown item type(s) {', '.join(map(str, unknown))}; choose from {', '.join(ITEM_CATALOG)}")
+    valid_rarities = {rarity.value for rarity in Rarity}
+    unknown = [rarity for rarity in pick_rarity.options if rarity not in valid_rarities]
+    if unknown:
+        raise ValueError(f"Unknown rarity {', '.join(map(str, unknown))}; choose from {', '.join(valid_rarities)}")
+    if any(not isinstance(size, int) or isinstance(size, bool) or size < 1 for size in pick_stack.options):
+        raise ValueError("Stack sizes must be whole numbers of at least 1")
+
+    rng = random.Random(seed)
+    for number in range(1, count + 1):
+        item_type = pick_type(rng)
+        name, weight, value = rng.choice(ITEM_CATALOG[item_type])
+        rarity = pick_rarity(rng)
+        magical = rarity != "Common"
+        yield {
+            "name": f"{name} {number}" if unique_names else name,
+            "weight": float(weight),
+            "rarity": rarity,
+            "quantity": pick_stack(rng),
+            "description": rng.choice(DESCRIPTIONS),
+            "value_gp": float(value * RARITY_VALUE_MULTIPLIER[rarity]),
+            "item_type": item_type,
+            "magical": magical,
+            "attuned": magical and rng.random() < ATTUNEMENT_CHANCE
+        }
+
+
+def _write_atomically(path: str, write: Callable[[Any], int]) -> int:
+    """Write through a temporary file swapped in at the end, so a failed run leaves no half file."""
+    temp_file = f"{path}.tmp"
+    try:
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            written = write(f)
+        os.replace(temp_file, path)
+    except BaseException:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        raise
+    return written
+
+
+def _indented(value: Any, depth: int) -> str:
+    """JSON for a value nested depth levels into an indent=2 document."""
+    return json.dumps(value, indent=2, ensure_ascii=False).replace("\n", "\n" + "  " * depth)
+
+
+def write_roster(path: str, records: Iterable[Dict[str, Any]]) -> int:
+    """Write character records to a roster file one at a time (laid out as save_characters does). Returns the count."""
+    def write(f) -> int:
+        count = 0
+        f.write("{")
+        for record in records:
+            f.write(f"{',' if count else ''}\n  {json.dumps(record['name'])}: {_indented(record, 1)}")
+            count += 1
+        f.write("\n}" if count else "}")
+        return count
+    return _write_atomically(path, write)
+
+
+def write_inventory(path: str, items: Iterable[Dict[str, Any]], character_name: str = "Generated Adventurer") -> int:
+    """Write item records to an inventory file one at a time (laid out as save_inventory does). Returns the count."""
+    def write(f) -> int:
+        count = 0
+        f.write(f'{{\n  "character_name": {json.dumps(character_name, ensure_ascii=False)},\n  "items": [')
+        for item in items:
+            f.write(f"{',' if count else ''}\n    {_indented(item, 2)}")
+            count += 1
+        f.write("\n  ]\n}" if count else "]\n}")
+        return count
+    return _write_atomically(path, write)
+
+
+def parse_weights(text: Optional[str], key: Callable[[str], Any] = str, ranges: bool = False) -> Optional[Dict[Any, float]]:
+    """Parse "a=3,b=1" (a bare "a" weighs 1). With ranges, "1-4=40" spreads 40 over keys 1 to 4."""
+    if not text:
+        return None
+    weights: Dict[Any, float] = {}
+    for part in text.split(","):
+        option, sep, weight_text = part.strip().rpartition("=") if "=" in part else (part.strip(), "", "1")
+        try:
+            weight = float(weight_text)
+            low, dash, high = option.partition("-") if ranges else (option, "", "")
+            options = [key(value) for value in range(int(low), int(high) + 1)] if dash else [key(option)]
+        except ValueError:
+            raise ValueError(f"Could not read weight '{part.strip()}'")
+        for value in options:
+            weights[value] = weights.get(value, 0) + weight / len(options)
+    return weights
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Generate large rosters and inventories for load testing.")
+    subparsers = parser.add_subparsers(dest="kind", required=True)
+    for kind, help_text in (("roster", "characters in characters.json format"),
+                            ("inventory", "items in character_inventory.json format")):
+        sub = subparsers.add_parser(kind, help=help_text)
+        sub.add_argument("--count", type=int, required=True)
+        sub.add_argument("--output", required=True, help="file to write (replaced if it exists)")
+        sub.add_argument("--seed", type=int, help="seed for reproducible data (default: random, and printed)")
+        if kind == "roster":
+            sub.add_argument("--classes", help="class weights, e.g. Fighter=3,Wizard=1 (default: all equally)")
+            sub.add_argument("--levels", help="level weights, e.g. 1-4=40,5-10=35,11-20=25")
+            sub.add_argument("--races", help="race weights, e.g. Human=2,Elf=1")
+            sub.add_argument("--name", default="NPC", help="name prefix; characters are numbered from 1")
+            sub.add_argument("--workers", type=int, help="worker processes (default: one per CPU)")
+        else:
+            sub.add_argument("--types", help=f"item type weights from: {', '.join(ITEM_CATALOG)}")
+            sub.add_argument("--rarities", help="rarity weights, e.g. Common=80,Uncommon=15,Rare=5")
+            sub.add_argument("--stacks", help="stack size weights, e.g. 1=70,10=20,50=10")
+            sub.add_argument("--character-name", default="Generated Adventurer")
+            sub.add_argument("--repeat-names", action="store_true",
+                             help="reuse item names instead of numbering every stack")
+    args = parser.parse_args(argv)
+    if args.count < 0:
+        parser.error("--count cannot be negative")
+    seed = args.seed if args.seed is not None else random.SystemRandom().randrange(2 ** 31)
+
+    try:
+        if args.kind == "roster":
+            template = roster_template(parse_weights(args.classes), parse_weights(args.levels, int, ranges=True),
+                                       parse_weights(args.races), args.name)
+            written = write_roster(args.output, generate_roster(args.count, seed, template, args.workers))
+            what = "characters"
+        else:
+            items = generate_items(args.count, seed, parse_weights(args.types), parse_weights(args.rarities),
+                                   parse_weights(args.stacks, int), not args.repeat_names)
+            written = write_inventory(args.output, items, args.character_name)
+            what = "items"
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    print(f"Wrote {written} {what} to {args.output} (seed {seed})", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,651 @@
+"""
+D&D 5E Character Commands
+Non-interactive JSON-in/JSON-out commands for scripting the character roster.
+
+Usage: python character_maker.py <command> [options]   (see --help)
+"""
+
+import argparse
+import contextlib
+import json
+import sys
+from collections.abc import MutableMapping
+from typing import Any, Dict, Iterable, List, Optional
+
+import instrumentation
+from character_maker import DND_CLASSES, Character, CharacterManager, get_class_progression
+from dice import DiceRoller, compile_dice
+from proficiencies import ABILITIES
+from roster import expand_ability
+from roster_codecs import encode, parse_format
+from roster_stream import compile_where, is_jsonl, project, stream_records
+from roster_sync import normalize_record
+
+
+class CommandError(ValueError):
+    """A command could not be applied."""
+
+
+def _check_type(field: str, default: Any, value: Any) -> None:
+    if isinstance(default, bool):
+        valid = isinstance(value, bool)
+    elif isinstance(default, int):
+        valid = isinstance(value, int) and not isinstance(value, bool)
+    elif isinstance(default, (str, list)):
+        valid = isinstance(value, type(default))
+    else:
+        valid = True
+    if not valid:
+        raise CommandError(f"Field '{field}' expects {type(default).__name__}, got {type(value).__name__}")
+
+
+def apply_patch(character: Character, changes: Dict[str, Any]) -> List[str]:
+    """Set fields on a character, merging dict fields (skills, spell_slots, ...) key by key.
+
+    Derived stats follow the changes: a new class or level re-applies the class
+    progression, DEX updates initiative and spell DCs are recalculated. Returns
+    the fields that were changed.
+    """
+    if not isinstance(changes, dict):
+        raise CommandError("Changes must be an object of field: value")
+    template = Character()
+    # Validate everything first so a bad field leaves the character untouched
+    for field, value in changes.items():
+        if field == "name" or not hasattr(template, field):
+            raise CommandError(f"Unknown or read-only field '{field}'")
+        default = getattr(template, field)
+        if isinstance(default, MutableMapping):
+            if not isinstance(value, dict):
+                raise CommandError(f"Field '{field}' expects an object")
+            unknown = [key for key in value if key not in default]
+            if unknown:
+                raise CommandError(f"Unknown key '{unknown[0]}' for '{field}'")
+            for key, item in value.items():
+                _check_type(f"{field}.{key}", default[key], item)
+        else:
+            _check_type(field, default, value)
+    if "level" in changes and not 1 <= changes["level"] <= 20:
+        raise CommandError("Level must be between 1 and 20")
+
+    for field, value in changes.items():
+        current = getattr(character, field, None)
+        if isinstance(current, MutableMapping):
+            for key, item in value.items():
+                current[key] = item
+        else:
+            setattr(character, field, value)
+
+    if "dexterity" in changes and "initiative" not in changes:
+        character.initiative = character.get_ability_modifier(character.dexterity)
+    if "character_class" in changes or "level" in changes:
+        character.apply_class_progression()
+    character.recalculate_spell_stats()
+    return list(changes)
+
+
+def _names(manager: CharacterManager, spec: Dict[str, Any]) -> List[str]:
+    """Names from a spec's "name" or "names" (all characters when neither is given)."""
+    names = spec.get("names")
+    if names is None:
+        names = [spec["name"]] if spec.get("name") else manager.list_characters()
+    missing = [name for name in names if name not in manager.characters]
+    if missing:
+        raise CommandError(f"Character(s) not found: {', '.join(missing)}")
+    return list(names)
+
+
+def _character(manager: CharacterManager, spec: Dict[str, Any]) -> Character:
+    name = spec.get("name")
+    if not name:
+        raise CommandError("A character name is required")
+    character = manager.get_character(name)
+    if character is None:
+        raise CommandError(f"Character '{name}' not found")
+    return character
+
+
+def cmd_create(manager: CharacterManager, spec: Dict[str, Any], roller: DiceRoller) -> Dict[str, Any]:
+    """Create a character from field values.
+
+    Class features, hit dice and saving-throw proficiencies come from the
+    class tables, and hit points default to the fixed value for the class and
+    level.
+    """
+    name = spec.get("name")
+    if not name:
+        raise CommandError("A character name is required")
+    if name in manager.characters:
+        raise CommandError(f"Character '{name}' already exists")
+
+    fields = {key: value for key, value in spec.items() if key != "name"}
+    character = Character(name)
+    character.initiative = character.get_ability_modifier(character.dexterity)
+    apply_patch(character, fields)
+    class_data = DND_CLASSES.get(character.character_class)
+    if class_data and "saving_throws" not in fields:
+        for save in class_data["saving_throws"]:
+            character.saving_throws[save.lower()] = True
+
+    progression = get_class_progression(character.character_class, character.level)
+    if progression and "hit_point_maximum" not in fields:
+        con_mod = character.get_ability_modifier(character.constitution)
+        hit_die = progression["hit_die"]
+        character.hit_point_maximum = max(1, hit_die + con_mod) + \
+            max(1, hit_die // 2 + 1 + con_mod) * (character.level - 1)
+        character.current_hit_points = character.hit_point_maximum
+    manager.add_character(character)
+    return character.to_dict()
+
+
+def cmd_get(manager: CharacterManager, spec: Dict[str, Any], roller: DiceRoller) -> Dict[str, Any]:
+    """Get characters by name (all when none given), optionally only some fields."""
+    fields = spec.get("fields")
+    result = {}
+    for name in _names(manager, spec):
+        data = manager.get_character(name).to_dict()
+        result[name] = {field: data.get(field) for field in fields} if fields else data
+    return result
+
+
+def cmd_patch(manager: CharacterManager, spec: Dict[str, Any], roller: DiceRoller) -> Dict[str, Any]:
+    """Change fields on one character ("changes": {...}); "rename" renames it."""
+    character = _character(manager, spec)
+    new_name = spec.get("rename")
+    if new_name and new_name != character.name and new_name in manager.characters:
+        raise CommandError(f"Character '{new_name}' already exists")
+    changed = apply_patch(character, spec.get("changes", {}))
+    if new_name and new_name != character.name:
+        del manager.characters[character.name]
+        character.name = character.character_name = new_name
+        manager.add_character(character)
+        changed.append("name")
+    return {"name": character.name, "changed": changed}
+
+
+def cmd_level_up(manager: CharacterManager, spec: Dict[str, Any], roller: DiceRoller) -> Dict[str, Any]:
+    """Level up characters by "levels" (default 1); returns new level and features gained."""
+    levels = int(spec.get("levels", 1))
+    if levels < 1:
+        raise CommandError("levels must be at least 1")
+    gained = manager.level_up_characters(_names(manager, spec), levels)
+    return {name: {"level": manager.get_character(name).level, "features": features}
+            for name, features in gained.items()}
+
+
+def _amount(value: Any) -> Any:
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise CommandError("amount must be a number or dice expression")
+    return value
+
+
+def cmd_damage(manager: CharacterManager, spec: Dict[str, Any], roller: DiceRoller) -> Dict[str, Any]:
+    """Deal "amount" (number or dice, rolled once) to characters.
+
+    With "save" (an ability) and "dc" each target saves for half damage.
+    """
+    save_ability = expand_ability(spec["save"]) if spec.get("save") else None
+    if save_ability and save_ability not in ABILITIES:
+        raise CommandError(f"Unknown saving throw '{spec['save']}'")
+    if save_ability and spec.get("dc") is None:
+        raise CommandError("A save needs a dc")
+    results = manager.apply_area_damage(_names(manager, spec), _amount(spec.get("amount")), save_ability,
+                                        spec.get("dc"), roller, save=False)
+    return {name: {"damage": lost, "saved": saved,
+                   "current_hit_points": manager.get_character(name).current_hit_points}
+            for name, (lost, saved) in results.items()}
+
+
+def cmd_heal(manager: CharacterManager, spec: Dict[str, Any], roller: DiceRoller) -> Dict[str, Any]:
+    """Heal characters by "amount" (number or dice, rolled once)."""
+    amount = _amount(spec.get("amount"))
+    if isinstance(amount, str):
+        amount = compile_dice(amount).roll(roller)
+    healed = manager.heal_party(_names(manager, spec), amount, save=False)
+    return {name: {"healed": amount, "current_hit_points": manager.get_character(name).current_hit_points}
+            for name, amount in healed.items()}
+
+
+def cmd_rest(manager: CharacterManager, spec: Dict[str, Any], roller: DiceRoller) -> Dict[str, Any]:
+    """Long rest ("type": "long", the default) or short rest spending "hit_dice" per character."""
+    names = _names(manager, spec)
+    rest_type = spec.get("type", "long")
+    if rest_type == "long":
+        manager.long_rest(names, save=False)
+        healed = {name: None for name in names}
+    elif rest_type == "short":
+        hit_dice = spec.get("hit_dice", 0)
+        per_character = hit_dice if isinstance(hit_dice, dict) else {name: hit_dice for name in names}
+        spend = {name: int(per_character.get(name, 0)) for name in names}
+        if any(count < 0 for count in spend.values()):
+            raise CommandError("hit_dice cannot be negative")
+        healed = manager.short_rest(spend, roller, save=False)
+    else:
+        raise CommandError("Rest type must be 'long' or 'short'")
+    result = {}
+    for name in names:
+        char = manager.get_character(name)
+        result[name] = {"current_hit_points": char.current_hit_points,
+                        "hit_dice_remaining": char.get_hit_dice_remaining()}
+        if healed[name] is not None:
+            result[name]["healed"] = healed[name]
+    return result
+
+
+def cmd_delete(manager: CharacterManager, spec: Dict[str, Any], roller: DiceRoller) -> Dict[str, Any]:
+    """Delete one character."""
+    character = _character(manager, spec)
+    manager.delete_character(character.name)
+    return {"deleted": character.name}
+
+
+def cmd_export(manager: CharacterManager, spec: Dict[str, Any], roller: DiceRoller) -> Dict[str, Any]:
+    """Export characters as a characters.json-style object, to "output" if given.
+
+    "where" (a roster search) and "fields" narrow what is exported. An output
+    ending .jsonl gets one record per line, written a character at a time.
+    """
+    names = _names(manager, spec)
+    where, fields = spec.get("where"), spec.get("fields")
+    output = spec.get("output")
+    if output and is_jsonl(output):
+        try:
+            exported = manager.export_records(output, names, where, fields)
+        except OSError as e:
+            raise CommandError(f"Could not write {output}: {e}")
+        return {"output": output, "exported": exported}
+
+    matches = compile_where(where)
+    data = {}
+    for name in names:
+        record = manager.get_character(name).to_dict()
+        if matches(record):
+            data[name] = project(record, fields)
+    if not output:
+        return data
+    try:
+        with open(output, 'w') as f:
+            json.dump(data, f, indent=2)
+    except OSError as e:
+        raise CommandError(f"Could not write {output}: {e}")
+    return {"output": output, "exported": list(data)}
+
+
+def cmd_history(manager: CharacterManager, spec: Dict[str, Any], roller: DiceRoller) -> List[Dict[str, Any]]:
+    """Logged combat events for the named characters (all when none), the last "limit" of them."""
+    names = set(_names(manager, spec)) if spec.get("name") or spec.get("names") else None
+    limit = spec.get("limit")
+    events = [event for event in manager.events.read() if names is None or event.get("character") in names]
+    return events[-int(limit):] if limit else events
+
+
+def cmd_sheet(manager: CharacterManager, spec: Dict[str, Any], roller: DiceRoller) -> Dict[str, Any]:
+    """Fill a PDF character sheet per character into "output_dir" (default character_sheets)."""
+    from pdf_export import PDFError, export_character_sheets
+    output_dir = spec.get("output_dir") or "character_sheets"
+    characters = [manager.get_character(name) for name in _names(manager, spec)]
+    try:
+        paths = export_character_sheets(characters, output_dir, spec.get("workers"))
+    except (OSError, PDFError) as e:
+        raise CommandError(f"Could not export character sheets: {e}")
+    return {"output_dir": output_dir, "files": paths}
+
+
+def cmd_generate(manager: CharacterManager, spec: Dict[str, Any], roller: DiceRoller) -> Dict[str, Any]:
+    """Generate "count" NPCs from a "template" (see NPCTemplate) into the roster.
+
+    Uses "seed" if given, otherwise one drawn from the command's (--seed) dice.
+    """
+    from npc_generator import NPCTemplate, add_npcs_to_roster
+    template = NPCTemplate.from_dict(spec.get("template", {}))
+    count = int(spec.get("count", 1))
+    seed = spec.get("seed")
+    if seed is None:
+        seed = roller.roll(1, 2 ** 31)[0]
+    names = add_npcs_to_roster(manager, template, count, seed, spec.get("workers"), save=False,
+                               factory=Character.from_dict)
+    return {"generated": len(names), "names": names}
+
+
+def cmd_import(manager: CharacterManager, spec: Dict[str, Any], roller: DiceRoller) -> Dict[str, Any]:
+    """Add characters from the JSON Lines or roster file at "path", reading one record at a time.
+
+    Invalid records are skipped and reported ("strict" fails on the first
+    instead). "where" filters with a roster search, and existing characters are
+    only overwritten with "replace".
+    """
+    path = spec.get("path")
+    if not path:
+        raise CommandError("import needs a path")
+    try:
+        return manager.import_records(path, spec.get("where"), bool(spec.get("replace")), bool(spec.get("strict")))
+    except OSError as e:
+        raise CommandError(f"Could not read {path}: {e}")
+
+
+def cmd_convert(manager: CharacterManager, spec: Dict[str, Any], roller: DiceRoller) -> Dict[str, Any]:
+    """Save the roster in another "format" from then on, or write a converted copy to "output"."""
+    storage_format = spec.get("format")
+    if not storage_format:
+        raise CommandError("convert needs a format, e.g. json, compact+gzip or binary+lzma")
+    parse_format(storage_format)
+    output = spec.get("output")
+    if not output:
+        previous = manager.storage_format or manager.loaded_format
+        manager.storage_format = storage_format
+        return {"format": storage_format, "previous": previous, "characters": len(manager.characters)}
+    data = {name: normalize_record(character.to_dict()) for name, character in manager.characters.items()}
+    encoded = encode(data, storage_format)
+    try:
+        with open(output, 'wb') as f:
+            f.write(encoded)
+    except OSError as e:
+        raise CommandError(f"Could not write {output}: {e}")
+    return {"output": output, "format": storage_format, "bytes": len(encoded), "characters": len(data)}
+
+
+# Operation -> (handler, whether it changes the roster: a bool, or a function of the operation's fields)
+OPERATIONS: Dict[str, Any] = {
+    "create": (cmd_create, True),
+    "get": (cmd_get, False),
+    "patch": (cmd_patch, True),
+    "level-up": (cmd_level_up, True),
+    "damage": (cmd_damage, True),
+    "heal": (cmd_heal, True),
+    "rest": (cmd_rest, True),
+    "delete": (cmd_delete, True),
+    "export": (cmd_export, False),
+    "import": (cmd_import, True),
+    "sheet": (cmd_sheet, False),
+    "history": (cmd_history, False),
+    "generate": (cmd_generate, True),
+    "convert": (cmd_convert, lambda spec: not spec.get("output"))
+}
+
+
+def run_operations(manager: CharacterManager, operations: Iterable[Dict[str, Any]],
+                   roller: Optional[DiceRoller] = None, keep_going: bool = False) -> Dict[str, Any]:
+    """Apply many operations to one loaded roster and save once if anything changed.
+
+    By default the batch is all-or-nothing: the first failing operation stops
+    the run and nothing is saved. With keep_going, failures are reported and
+    the remaining operations still run.
+    """
+    roller = roller or DiceRoller()
+    results = []
+    changed = False
+    failed = False
+    for number, operation in enumerate(operations, 1):
+        op = operation.get("op") if isinstance(operation, dict) else None
+        if op not in OPERATIONS:
+            results.append({"op": op, "ok": False, "error": f"Unknown operation '{op}'"})
+            failed = True
+        else:
+            handler, mutates = OPERATIONS[op]
+            spec = {key: value for key, value in operation.items() if key != "op"}
+            try:
+                with instrumentation.span("command", op):
+                    result = handler(manager, spec, roller)
+                results.append({"op": op, "ok": True, "result": result})
+                changed = changed or (mutates(spec) if callable(mutates) else mutates)
+            except (CommandError, ValueError, TypeError) as e:
+                results.append({"op": op, "ok": False, "error": str(e)})
+                failed = True
+        if failed and not keep_going:
+            return {"ok": False, "saved": False, "failed_at": number, "results": results}
+
+    saved = changed and manager.save_characters()
+    summary = {"ok": not failed, "saved": bool(saved), "results": results}
+    if saved and manager.last_conflicts:
+        summary["conflicts"] = manager.last_conflicts
+    return summary
+
+
+def read_operations(path: str) -> List[Dict[str, Any]]:
+    """Read a batch file: a JSON array of operations, or one JSON object per line ("-" for stdin)."""
+    if path == "-":
+        text = sys.stdin.read()
+    else:
+        with open(path, 'r') as f:
+            text = f.read()
+    stripped = text.lstrip()
+    if stripped.startswith("["):
+        return json.loads(stripped)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def _parse_spec(text: Optional[str]) -> Dict[str, Any]:
+    """Parse a JSON spec given inline or as @path."""
+    if not text:
+        return {}
+    if text.startswith("@"):
+        with open(text[1:], 'r') as f:
+            text = f.read()
+    spec = json.loads(text)
+    if not isinstance(spec, dict):
+        raise CommandError("Spec must be a JSON object")
+    return spec
+
+
+def _parse_assignments(assignments: List[str]) -> Dict[str, Any]:
+    """Parse field=value flags; values are read as JSON when possible, else as text."""
+    changes: Dict[str, Any] = {}
+    for assignment in assignments or []:
+        field, sep, value = assignment.partition("=")
+        if not sep:
+            raise CommandError(f"Expected field=value, got '{assignment}'")
+        try:
+            changes[field] = json.loads(value)
+        except json.JSONDecodeError:
+            changes[field] = value
+    return changes
+
+
+def build_parser() -> argparse.ArgumentParser:
+    def add_common(target: argparse.ArgumentParser, suppress: bool) -> None:
+        # Accepted before or after the command; SUPPRESS keeps the sub-level
+        # default from overwriting a value given before the command
+        default = (lambda value: argparse.SUPPRESS) if suppress else (lambda value: value)
+        target.add_argument("--file", default=default("characters.json"),
+                            help="character data file (default: characters.json)")
+        target.add_argument("--seed", type=int, default=default(None), help="seed dice rolls for reproducible results")
+        target.add_argument("-v", "--verbose", action="store_true", default=default(False),
+                            help="print status messages to stderr")
+
+    parser = argparse.ArgumentParser(
+        prog="character_maker.py",
+        description="Script the character roster. Run without arguments for the interactive menu.")
+    add_common(parser, suppress=False)
+    common = argparse.ArgumentParser(add_help=False)
+    add_common(common, suppress=True)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    def add(name: str, help_text: str, names: str = "none") -> argparse.ArgumentParser:
+        sub = subparsers.add_parser(name, help=help_text, parents=[common])
+        if names == "one":
+            sub.add_argument("name")
+        elif names == "many":
+            sub.add_argument("names", nargs="*", help="character names (default: all)")
+        return sub
+
+    sub = add("create", "create a character", "one")
+    sub.add_argument("--spec", help="JSON object of fields, or @file")
+    sub.add_argument("--set", action="append", metavar="FIELD=VALUE", help="set a field (repeatable)")
+
+    sub = add("get", "print characters as JSON", "many")
+    sub.add_argument("--fields", help="comma-separated fields to include")
+
+    sub = add("patch", "change fields on a character", "one")
+    sub.add_argument("--spec", help="JSON object of changes, or @file")
+    sub.add_argument("--set", action="append", metavar="FIELD=VALUE", help="set a field (repeatable)")
+    sub.add_argument("--rename", help="new character name")
+
+    sub = add("level-up", "gain levels using average hit points", "many")
+    sub.add_argument("--levels", type=int, default=1)
+
+    sub = add("damage", "deal damage, rolled once for all targets", "many")
+    sub.add_argument("--amount", required=True, help="number or dice expression")
+    sub.add_argument("--save", help="saving throw ability for half damage")
+    sub.add_argument("--dc", type=int, help="saving throw DC")
+
+    sub = add("heal", "restore hit points", "many")
+    sub.add_argument("--amount", required=True, help="number or dice expression")
+
+    sub = add("rest", "take a long or short rest", "many")
+    sub.add_argument("--type", choices=["long", "short"], default="long")
+    sub.add_argument("--hit-dice", type=int, default=0, help="hit dice each character spends on a short rest")
+
+    add("delete", "delete a character", "one")
+
+    sub = add("export", "export characters as characters.json-style JSON", "many")
+    sub.add_argument("--output", help="write to a file instead of stdout (.jsonl: one character per line)")
+    sub.add_argument("--where", help='only characters matching a search, e.g. "class=wizard level>=5"')
+    sub.add_argument("--fields", help="comma-separated fields to include")
+
+    sub = add("import", "add characters from a JSON Lines (.jsonl) or roster file, a record at a time")
+    sub.add_argument("path")
+    sub.add_argument("--where", help='only characters matching a search, e.g. "race=elf"')
+    sub.add_argument("--replace", action="store_true", help="overwrite characters that already exist")
+    sub.add_argument("--strict", action="store_true", help="fail on the first invalid record instead of skipping it")
+
+    sub = add("stream", "filter and copy characters between JSON Lines and roster files without loading the roster")
+    sub.add_argument("source", help="JSON Lines (.jsonl) or roster file to read")
+    sub.add_argument("output", help="file to write: .jsonl for one character per line, otherwise a roster")
+    sub.add_argument("--where", help='only characters matching a search, e.g. "class=cleric,druid level>=5"')
+    sub.add_argument("--fields", help="comma-separated fields to keep (name is always kept)")
+    sub.add_argument("--limit", type=int, help="stop after this many characters")
+    sub.add_argument("--strict", action="store_true", help="fail on the first invalid record instead of skipping it")
+    sub.add_argument("--no-validate", dest="validate", action="store_false", help="copy records without checking them")
+
+    sub = add("history", "list logged combat events (HP, slots, conditions)", "many")
+    sub.add_argument("--limit", type=int, help="only the most recent events")
+
+    sub = add("sheet", "fill the PDF character sheet for characters", "many")
+    sub.add_argument("--output-dir", help="folder for the PDFs (default: character_sheets)")
+    sub.add_argument("--workers", type=int, help="worker processes (default: one per CPU)")
+
+    sub = add("generate", "generate NPCs from a template into the roster")
+    sub.add_argument("--template", required=True, help="JSON template object, or @file")
+    sub.add_argument("--count", type=int, required=True)
+    sub.add_argument("--workers", type=int, help="worker processes (default: one per CPU)")
+
+    sub = add("convert", "rewrite the roster in another storage format (or write a converted copy)")
+    sub.add_argument("--to", required=True, dest="format",
+                     help="json, compact or binary, optionally +gzip or +lzma (e.g. compact+gzip)")
+    sub.add_argument("--output", help="write a converted copy here and leave the roster as it is")
+
+    sub = add("serve", "share the roster with other programs over a local socket until stopped")
+    sub.add_argument("--socket", help="Unix socket path (default: TCP on --host and --port)")
+    sub.add_argument("--host", default="127.0.0.1", help="loopback address to listen on (default: 127.0.0.1)")
+    sub.add_argument("--port", type=int, help="TCP port (default: 7420)")
+    sub.add_argument("--save-delay", type=float, help="seconds to gather changes into one save (default: 1)")
+
+    sub = add("batch", "apply operations from a JSON array or JSON-lines file with one load and one save")
+    sub.add_argument("path", help="batch file, or - for stdin")
+    sub.add_argument("--keep-going", action="store_true", help="run remaining operations after a failure")
+    return parser
+
+
+def _parse_fields(text: str) -> List[str]:
+    return [field.strip() for field in text.split(",") if field.strip()]
+
+
+def _operation_from_args(args: argparse.Namespace) -> Dict[str, Any]:
+    """Turn parsed command-line flags into a batch-style operation."""
+    operation: Dict[str, Any] = {"op": args.command}
+    if getattr(args, "name", None):
+        operation["name"] = args.name
+    if getattr(args, "names", None):
+        operation["names"] = args.names
+
+    if args.command == "create":
+        operation.update(_parse_spec(args.spec))
+        operation.update(_parse_assignments(args.set))
+        operation["name"] = args.name
+    elif args.command == "get" and args.fields:
+        operation["fields"] = _parse_fields(args.fields)
+    elif args.command == "patch":
+        operation["changes"] = {**_parse_spec(args.spec), **_parse_assignments(args.set)}
+        if args.rename:
+            operation["rename"] = args.rename
+    elif args.command == "level-up":
+        operation["levels"] = args.levels
+    elif args.command in ("damage", "heal"):
+        amount = args.amount
+        operation["amount"] = int(amount) if amount.lstrip("-").isdigit() else amount
+        if args.command == "damage" and args.save:
+            operation.update(save=args.save, dc=args.dc)
+    elif args.command == "rest":
+        operation.update(type=args.type, hit_dice=args.hit_dice)
+    elif args.command == "export":
+        if args.output:
+            operation["output"] = args.output
+        if args.where:
+            operation["where"] = args.where
+        if args.fields:
+            operation["fields"] = _parse_fields(args.fields)
+    elif args.command == "import":
+        operation.update(path=args.path, replace=args.replace, strict=args.strict)
+        if args.where:
+            operation["where"] = args.where
+    elif args.command == "convert":
+        operation["format"] = args.format
+        if args.output:
+            operation["output"] = args.output
+    elif args.command == "history" and args.limit:
+        operation["limit"] = args.limit
+    elif args.command == "sheet":
+        if args.output_dir:
+            operation["output_dir"] = args.output_dir
+        if args.workers:
+            operation["workers"] = args.workers
+    elif args.command == "generate":
+        operation.update(template=_parse_spec(args.template), count=args.count)
+        if args.workers:
+            operation["workers"] = args.workers
+    return operation
+
+
+def run_stream(args: argparse.Namespace) -> Dict[str, Any]:
+    """Run the stream command, which reads and writes files without loading the roster."""
+    fields = _parse_fields(args.fields) if args.fields else None
+    try:
+        return {"ok": True, "result": stream_records(args.source, args.output, args.where, fields,
+                                                      args.limit, args.validate, args.strict)}
+    except (OSError, ValueError) as e:
+        return {"ok": False, "error": str(e)}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run one command (or a batch) and print the JSON result. Returns the exit code."""
+    args = build_parser().parse_args(argv)
+    out = sys.stdout
+    # Status messages go to stderr so stdout stays valid JSON
+    with contextlib.redirect_stdout(sys.stderr):
+        manager = None if args.command == "stream" else CharacterManager(args.file, verbose=args.verbose)
+        if manager is None:
+            # stream reads and writes its files directly; the roster is never loaded
+            result = run_stream(args)
+        elif manager.load_error:
+            result = {"ok": False, "error": f"Could not load {args.file}: {manager.load_error}"}
+        elif args.command == "serve":
+            from character_server import serve
+            return serve(manager, args.socket, args.host, args.port, DiceRoller(args.seed), args.save_delay)
+        else:
+            try:
+                if args.command == "batch":
+                    operations = read_operations(args.path)
+                    keep_going = args.keep_going
+                else:
+                    operations = [_operation_from_args(args)]
+                    keep_going = False
+                result = run_operations(manager, operations, DiceRoller(args.seed), keep_going)
+            except (OSError, ValueError) as e:
+                result = {"ok": False, "error": str(e)}
+            if args.command != "batch" and "results" in result:
+                single = result["results"][0]
+                result = {"ok": single["ok"], "saved": result["saved"],
+                          **({"result": single["result"]} if single["ok"] else {"error": single["error"]})}
+
+    json.dump(result, out, indent=2)
+    out.write("\n")
+    return 0 if result["ok"] else 1
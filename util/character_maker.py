@@ -4,184 +4,165 @@ D&D 5E Character Maker
 A command-line tool for creating and managing D&D 5th edition characters.
 """
 
-import json
 import os
+import re
 import sys
-import random
-from typing import Dict, List, Optional, Any, Tuple
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Collection, Dict, List, Optional, Tuple
 
-# D&D 5E Class Data
-DND_CLASSES = {
-    "Artificer": {
-        "hit_die": 8,
-        "primary_ability": ["Intelligence"],
-        "saving_throws": ["Constitution", "Intelligence"],
-        "subclasses": {
-            "Alchemist": "Support through elixirs and healing",
-            "Armorer": "Heavy armor and defensive capabilities",
-            "Artillerist": "Ranged damage and battlefield control",
-            "Battle Smith": "Combat pet and versatile fighting"
-        }
-    },
-    "Barbarian": {
-        "hit_die": 12,
-        "primary_ability": ["Strength"],
-        "saving_throws": ["Strength", "Constitution"],
-        "subclasses": {
-            "Path of the Berserker": "Frenzied rage and brutal attacks",
-            "Path of the Totem Warrior": "Animal spirit guidance",
-            "Path of the Ancestral Guardian": "Spiritual protection",
-            "Path of the Storm Herald": "Elemental aura effects",
-            "Path of the Zealot": "Divine rage and resurrection resistance"
-        }
-    },
-    "Bard": {
-        "hit_die": 8,
-        "primary_ability": ["Charisma"],
-        "saving_throws": ["Dexterity", "Charisma"],
-        "subclasses": {
-            "College of Lore": "Additional magical secrets and skills",
-            "College of Valor": "Combat prowess and inspiration",
-            "College of Glamour": "Fey magic and charm",
-            "College of Whispers": "Secrets and psychological manipulation",
-            "College of Swords": "Blade dancing and flourishes"
-        }
-    },
-    "Cleric": {
-        "hit_die": 8,
-        "primary_ability": ["Wisdom"],
-        "saving_throws": ["Wisdom", "Charisma"],
-        "subclasses": {
-            "Life Domain": "Healing and support magic",
-            "Light Domain": "Radiant damage and illumination",
-            "War Domain": "Combat blessing and weapon mastery",
-            "Tempest Domain": "Lightning and thunder magic",
-            "Nature Domain": "Plant and animal communion",
-            "Trickery Domain": "Stealth and illusion magic",
-            "Knowledge Domain": "Information and divination",
-            "Death Domain": "Necromantic power"
-        }
-    },
-    "Druid": {
-        "hit_die": 8,
-        "primary_ability": ["Wisdom"],
-        "saving_throws": ["Intelligence", "Wisdom"],
-        "subclasses": {
-            "Circle of the Land": "Additional spells and spell recovery",
-            "Circle of the Moon": "Enhanced wild shape abilities",
-            "Circle of Dreams": "Healing and teleportation",
-            "Circle of the Shepherd": "Beast summoning and support",
-            "Circle of Spores": "Necromantic nature magic"
-        }
-    },
-    "Fighter": {
-        "hit_die": 10,
-        "primary_ability": ["Strength", "Dexterity"],
-        "saving_throws": ["Strength", "Constitution"],
-        "subclasses": {
-            "Champion": "Improved critical hits and survivability",
-            "Battle Master": "Combat maneuvers and tactics",
-            "Eldritch Knight": "Weapon and spell combination",
-            "Arcane Archer": "Magical arrow effects",
-            "Cavalier": "Mounted combat and protection",
-            "Samurai": "Fighting spirit and social skills"
-        }
-    },
-    "Monk": {
-        "hit_die": 8,
-        "primary_ability": ["Dexterity", "Wisdom"],
-        "saving_throws": ["Strength", "Dexterity"],
-        "subclasses": {
-            "Way of the Open Hand": "Enhanced unarmed combat",
-            "Way of Shadow": "Stealth and shadow magic",
-            "Way of the Four Elements": "Elemental ki manipulation",
-            "Way of the Long Death": "Life force manipulation",
-            "Way of the Sun Soul": "Radiant energy projection",
-            "Way of the Drunken Master": "Unpredictable fighting style"
-        }
-    },
-    "Paladin": {
-        "hit_die": 10,
-        "primary_ability": ["Strength", "Charisma"],
-        "saving_throws": ["Wisdom", "Charisma"],
-        "subclasses": {
-            "Oath of Devotion": "Classic holy warrior",
-            "Oath of the Ancients": "Nature and fey protection",
-            "Oath of Vengeance": "Relentless pursuit of justice",
-            "Oath of Conquest": "Fear and domination",
-            "Oath of Redemption": "Peace and rehabilitation",
-            "Oathbreaker": "Fallen paladin with dark powers"
-        }
-    },
-    "Ranger": {
-        "hit_die": 10,
-        "primary_ability": ["Dexterity", "Wisdom"],
-        "saving_throws": ["Strength", "Dexterity"],
-        "subclasses": {
-            "Hunter": "Specialized monster hunting",
-            "Beast Master": "Animal companion",
-            "Gloom Stalker": "Darkvision and ambush tactics",
-            "Horizon Walker": "Planar travel and detection",
-            "Monster Slayer": "Anti-magic and creature knowledge",
-            "Fey Wanderer": "Fey magic and charm resistance"
-        }
-    },
-    "Rogue": {
-        "hit_die": 8,
-        "primary_ability": ["Dexterity"],
-        "saving_throws": ["Dexterity", "Intelligence"],
-        "subclasses": {
-            "Thief": "Enhanced climbing and item use",
-            "Assassin": "Disguise and poison expertise",
-            "Arcane Trickster": "Magic and illusion",
-            "Mastermind": "Social manipulation and help actions",
-            "Swashbuckler": "Charismatic dueling",
-            "Scout": "Mobility and survival skills",
-            "Inquisitive": "Investigation and insight"
-        }
-    },
-    "Sorcerer": {
-        "hit_die": 6,
-        "primary_ability": ["Charisma"],
-        "saving_throws": ["Constitution", "Charisma"],
-        "subclasses": {
-            "Draconic Bloodline": "Dragon heritage and resilience",
-            "Wild Magic": "Unpredictable magical surges",
-            "Storm Sorcery": "Wind and lightning control",
-            "Divine Soul": "Divine and arcane magic combination",
-            "Shadow Magic": "Darkness and shadow manipulation",
-            "Aberrant Mind": "Telepathic and alien magic"
-        }
-    },
-    "Warlock": {
-        "hit_die": 8,
-        "primary_ability": ["Charisma"],
-        "saving_throws": ["Wisdom", "Charisma"],
-        "subclasses": {
-            "The Fiend": "Infernal patron with fire resistance",
-            "The Archfey": "Fey patron with charm abilities",
-            "The Great Old One": "Cosmic horror patron with telepathy",
-            "The Celestial": "Divine patron with healing abilities",
-            "The Hexblade": "Sentient weapon patron",
-            "The Genie": "Elemental patron with utility magic"
-        }
-    },
-    "Wizard": {
-        "hit_die": 6,
-        "primary_ability": ["Intelligence"],
-        "saving_throws": ["Intelligence", "Wisdom"],
-        "subclasses": {
-            "School of Abjuration": "Protective and dispelling magic",
-            "School of Conjuration": "Summoning and teleportation",
-            "School of Divination": "Future sight and information",
-            "School of Enchantment": "Mind control and charm",
-            "School of Evocation": "Damage and energy manipulation",
-            "School of Illusion": "Deception and misdirection",
-            "School of Necromancy": "Death and undeath magic",
-            "School of Transmutation": "Change and transformation"
+import instrumentation
+from combat_log import SNAPSHOT_INTERVAL, CombatLog, apply_state, describe_event, event_log_path, latest_states
+from dice import DiceRoller, compile_dice, distribution_percentiles, get_default_roller, hit_point_distribution
+from game_data import LazyMapping, load_compiled, load_snapshot, store_snapshot
+from proficiencies import ABILITIES, SKILLS, SKILL_ABILITIES, party_modifier_matrices, save_proficiencies, skill_proficiencies
+from roster import RosterIndex, parse_query
+from roster_codecs import DEFAULT_FORMAT, CodecError, encode, parse_format, read_file
+from roster_sync import FileLock, lock_path, merge_rosters, normalize_record
+
+if TYPE_CHECKING:
+    from encounter import Encounter
+
+# Level in the old combined "Fighter 3" class_level field
+LEGACY_LEVEL_PATTERN = re.compile(r'(\d+)')
+
+SPELL_SLOT_LEVELS = ["1st", "2nd", "3rd", "4th", "5th", "6th", "7th", "8th", "9th"]
+
+# Bump when _compile_game_data changes shape so cached data is rebuilt
+GAME_DATA_VERSION = 1
+# Bump when Character.from_dict changes what it builds so roster snapshots are rebuilt
+ROSTER_SNAPSHOT_VERSION = 2
+
+
+def _spell_slots_for(caster_type: str, level: int, full_caster_slots: Dict[int, List[int]],
+                     pact_magic_slots: Dict[int, Tuple[int, int]]) -> Dict[str, int]:
+    """Work out spell slots by spell level for a caster type at a class level.
+    
+    "full" casters use their class level on the slot table, "half" casters half of
+    it (rounded up, from 2nd level), "artificer" half rounded up from 1st level and
+    "pact" casters use the warlock Pact Magic table.
+    """
+    slots = {slot_level: 0 for slot_level in SPELL_SLOT_LEVELS}
+    
+    if caster_type == "pact":
+        count, slot_level = pact_magic_slots[level]
+        slots[SPELL_SLOT_LEVELS[slot_level - 1]] = count
+        return slots
+    
+    if caster_type == "full":
+        caster_level = level
+    elif caster_type == "half":
+        caster_level = (level + 1) // 2 if level >= 2 else 0
+    else:
+        caster_level = (level + 1) // 2
+    
+    if caster_level:
+        for slot_level, count in zip(SPELL_SLOT_LEVELS, full_caster_slots[caster_level]):
+            slots[slot_level] = count
+    return slots
+
+
+def _class_progression(class_data: Dict[str, Any], full_caster_slots: Dict[int, List[int]],
+                       pact_magic_slots: Dict[int, Tuple[int, int]]
+                       ) -> Tuple[Optional[Tuple[str, str]], Dict[int, Dict[str, Any]]]:
+    """Fill in a class's optional keys and build its progression by level, with its (caster type, ability).
+    
+    Raises KeyError, TypeError or ValueError for a class that cannot be used.
+    """
+    if not isinstance(class_data, dict):
+        raise TypeError(f"expected an object of class details, not {type(class_data).__name__}")
+    class_data.setdefault("primary_ability", [])
+    class_data.setdefault("saving_throws", [])
+    class_data.setdefault("subclasses", {})
+    class_data.setdefault("subclass_level", 3)
+    class_data.setdefault("features", {})
+    
+    caster = class_data.get("spellcasting")
+    hit_die = class_data["hit_die"]
+    if type(hit_die) is not int or hit_die < 1:
+        raise ValueError(f"hit_die must be a whole number of sides, not {hit_die!r}")
+    features_by_level = {int(level): features for level, features in class_data["features"].items()}
+    all_features: List[str] = []
+    levels = {}
+    
+    for level in range(1, 21):
+        new_features = features_by_level.get(level, [])
+        for feature in new_features:
+            if feature not in all_features:
+                all_features.append(feature)
+        
+        levels[level] = {
+            "level": level,
+            "proficiency_bonus": 2 + ((level - 1) // 4),
+            "hit_die": hit_die,
+            "hit_dice": f"{level}d{hit_die}",
+            "features": list(new_features),
+            "all_features": list(all_features),
+            "subclass_level": class_data["subclass_level"],
+            "spell_slots": (_spell_slots_for(caster["type"], level, full_caster_slots, pact_magic_slots)
+                            if caster else None)
         }
+    return ((caster["type"], caster["ability"]) if caster else None), levels
+
+
+def _compile_game_data(raw: Dict[str, Any]) -> Dict[str, Any]:
+    """Build class lookups and the (class, level) progression table from the data files."""
+    classes = raw["classes"]
+    full_caster_slots = {int(level): slots for level, slots in raw["spell_slots"]["full_caster"].items()}
+    pact_magic_slots = {int(level): (entry["slots"], entry["slot_level"])
+                        for level, entry in raw["spell_slots"]["pact_magic"].items()}
+    spellcasting = {}
+    progression = {}
+    
+    for class_name, class_data in list(classes.items()):
+        try:
+            caster, levels = _class_progression(class_data, full_caster_slots, pact_magic_slots)
+        except (AttributeError, KeyError, TypeError, ValueError) as e:
+            # A class a homebrew pack left incomplete is dropped rather than breaking all class data
+            print(f"Skipping homebrew class {class_name}: {f'missing {e}' if isinstance(e, KeyError) else e}")
+            del classes[class_name]
+            continue
+        if caster:
+            spellcasting[class_name] = caster
+        progression.update(((class_name, level), entry) for level, entry in levels.items())
+    
+    return {
+        "classes": classes,
+        "spellcasting": spellcasting,
+        "full_caster_slots": full_caster_slots,
+        "pact_magic_slots": pact_magic_slots,
+        "progression": progression
     }
-}
+
+
+@lru_cache(maxsize=None)
+def get_game_data() -> Dict[str, Any]:
+    """Load class and progression data on first use (data/*.json plus homebrew packs)."""
+    return load_compiled("classes", ["classes", "spell_slots"], _compile_game_data,
+                         version=GAME_DATA_VERSION)
+
+
+# D&D 5E Class Data, loaded from data/classes.json on first access
+DND_CLASSES = LazyMapping(lambda: get_game_data()["classes"])
+
+# Caster type and spellcasting ability for each spellcasting class
+SPELLCASTING_PROGRESSION = LazyMapping(lambda: get_game_data()["spellcasting"])
+
+# Precomputed progression keyed by (class, level)
+CLASS_PROGRESSION = LazyMapping(lambda: get_game_data()["progression"])
+
+
+def get_spell_slots(class_name: str, level: int) -> Optional[Dict[str, int]]:
+    """Get spell slots by spell level for a class level, or None for non-casters."""
+    progression = CLASS_PROGRESSION.get((class_name, level))
+    if progression is None or progression["spell_slots"] is None:
+        return None
+    return dict(progression["spell_slots"])
+
+
+def get_class_progression(class_name: str, level: int) -> Optional[Dict[str, Any]]:
+    """Look up the progression entry for a class at a given level."""
+    return CLASS_PROGRESSION.get((class_name, level))
+
 
 class Character:
     """Represents a D&D 5E character with all relevant stats and information."""
@@ -217,26 +198,13 @@ class Character:
         self.current_hit_points = 8
         self.temporary_hit_points = 0
         self.hit_dice = "1d8"
+        self.hit_dice_used = 0
         
-        # Saving Throws (proficiency)
-        self.saving_throws = {
-            "strength": False,
-            "dexterity": False,
-            "constitution": False,
-            "intelligence": False,
-            "wisdom": False,
-            "charisma": False
-        }
+        # Saving Throws (proficiency), stored as a bitmask
+        self.saving_throws = save_proficiencies()
         
-        # Skills (proficiency)
-        self.skills = {
-            "acrobatics": False, "animal_handling": False, "arcana": False,
-            "athletics": False, "deception": False, "history": False,
-            "insight": False, "intimidation": False, "investigation": False,
-            "medicine": False, "nature": False, "perception": False,
-            "performance": False, "persuasion": False, "religion": False,
-            "sleight_of_hand": False, "stealth": False, "survival": False
-        }
+        # Skills (proficiency), stored as a bitmask
+        self.skills = skill_proficiencies()
         
         # Spellcasting
         self.spellcasting_class = ""
@@ -261,6 +229,9 @@ class Character:
         # Other proficiencies
         self.languages = []
         self.other_proficiencies = []
+        
+        # Bumped on every save that changes this character; used to merge concurrent sessions
+        self.version = 0
     
     def get_ability_modifier(self, ability_score: int) -> int:
         """Calculate ability modifier from ability score."""
@@ -268,70 +239,413 @@ class Character:
     
     def get_skill_modifier(self, skill: str) -> int:
         """Calculate skill modifier including proficiency if applicable."""
-        skill_ability_map = {
-            "acrobatics": self.dexterity, "animal_handling": self.wisdom,
-            "arcana": self.intelligence, "athletics": self.strength,
-            "deception": self.charisma, "history": self.intelligence,
-            "insight": self.wisdom, "intimidation": self.charisma,
-            "investigation": self.intelligence, "medicine": self.wisdom,
-            "nature": self.intelligence, "perception": self.wisdom,
-            "performance": self.charisma, "persuasion": self.charisma,
-            "religion": self.intelligence, "sleight_of_hand": self.dexterity,
-            "stealth": self.dexterity, "survival": self.wisdom
-        }
-        
-        ability_score = skill_ability_map.get(skill, 10)
-        modifier = self.get_ability_modifier(ability_score)
+        ability = SKILL_ABILITIES.get(skill)
+        modifier = self.get_ability_modifier(getattr(self, ability) if ability else 10)
         
         if self.skills.get(skill, False):
             modifier += self.proficiency_bonus
             
         return modifier
     
+    def get_saving_throw_modifier(self, ability: str) -> int:
+        """Calculate saving throw modifier including proficiency if applicable."""
+        modifier = self.get_ability_modifier(getattr(self, ability, 10))
+        if self.saving_throws.get(ability, False):
+            modifier += self.proficiency_bonus
+        return modifier
+    
+    def take_damage(self, damage: int) -> int:
+        """Apply damage to temporary HP first, then current HP. Returns HP lost."""
+        damage = max(0, damage)
+        if self.temporary_hit_points > 0:
+            temp_lost = min(damage, self.temporary_hit_points)
+            self.temporary_hit_points -= temp_lost
+            damage -= temp_lost
+        
+        hp_lost = min(damage, self.current_hit_points)
+        self.current_hit_points -= hp_lost
+        return hp_lost
+    
+    def heal(self, healing: int) -> int:
+        """Restore hit points up to the maximum. Returns HP regained."""
+        healed = max(0, min(healing, self.hit_point_maximum - self.current_hit_points))
+        self.current_hit_points += healed
+        return healed
+    
+    def add_temporary_hit_points(self, temp_hp: int):
+        """Gain temporary HP; they don't stack, so the higher value is kept."""
+        self.temporary_hit_points = max(self.temporary_hit_points, temp_hp)
+    
+    def recover_spell_slots(self):
+        """Recover all expended spell slots."""
+        for level in self.spell_slots_expended:
+            self.spell_slots_expended[level] = 0
+    
+    def get_hit_dice(self) -> Tuple[int, int]:
+        """Get (total, die size) from the hit dice string, e.g. "5d10" -> (5, 10)."""
+        count, _, sides = self.hit_dice.strip().lower().partition("d")
+        try:
+            return int(count or 1), int(sides)
+        except ValueError:
+            return self.level, 8
+    
+    def get_hit_dice_remaining(self) -> int:
+        """Get how many hit dice can still be spent before a long rest."""
+        total, _ = self.get_hit_dice()
+        return max(0, total - self.hit_dice_used)
+    
+    def short_rest(self, hit_dice: int = 0, roller: Optional[DiceRoller] = None) -> int:
+        """Take a short rest, spending up to hit_dice hit dice to heal.
+        
+        Each die heals its roll plus CON modifier (minimum 0). Pact Magic casters
+        also recover their spell slots. Returns HP regained.
+        """
+        roller = roller or get_default_roller()
+        _, sides = self.get_hit_dice()
+        con_mod = self.get_ability_modifier(self.constitution)
+        spent = max(0, min(hit_dice, self.get_hit_dice_remaining()))
+        
+        healing = sum(max(0, roll + con_mod) for roll in roller.roll(spent, sides)) if spent else 0
+        self.hit_dice_used += spent
+        
+        caster_type = SPELLCASTING_PROGRESSION.get(self.spellcasting_class, (None, None))[0]
+        if caster_type == "pact":
+            self.recover_spell_slots()
+        return self.heal(healing)
+    
+    def long_rest(self):
+        """Take a long rest: full HP, all spell slots and half the total hit dice back."""
+        total, _ = self.get_hit_dice()
+        self.current_hit_points = self.hit_point_maximum
+        self.temporary_hit_points = 0
+        self.hit_dice_used = max(0, self.hit_dice_used - max(1, total // 2))
+        self.recover_spell_slots()
+    
+    def recalculate_spell_stats(self):
+        """Recalculate spell save DC and attack bonus from the spellcasting ability."""
+        if self.spellcasting_ability:
+            ability_mod = self.get_ability_modifier(getattr(self, self.spellcasting_ability))
+            self.spell_save_dc = 8 + self.proficiency_bonus + ability_mod
+            self.spell_attack_bonus = self.proficiency_bonus + ability_mod
+    
+    def get_max_prepared_spells(self) -> Optional[int]:
+        """Get how many spells this character can prepare, or None if they don't prepare spells."""
+        class_data = DND_CLASSES.get(self.spellcasting_class)
+        spellcasting = class_data.get("spellcasting") if class_data else None
+        if not spellcasting or not spellcasting.get("prepared") or not self.spellcasting_ability:
+            return None
+        
+        level = self.level // 2 if spellcasting["prepared"] == "half_level" else self.level
+        ability_mod = self.get_ability_modifier(getattr(self, self.spellcasting_ability))
+        return max(1, ability_mod + level)
+    
+    def apply_class_progression(self) -> List[str]:
+        """Apply the progression table for the current class and level.
+        
+        Sets proficiency bonus, hit dice and spell slots, and adds any missing
+        class features. Returns the features that were newly added.
+        """
+        progression = get_class_progression(self.character_class, self.level)
+        if progression is None:
+            return []
+        
+        self.proficiency_bonus = progression["proficiency_bonus"]
+        self.hit_dice = progression["hit_dice"]
+        
+        features = list(progression["all_features"])
+        if self.subclass and self.level >= progression["subclass_level"]:
+            features.append(f"{self.subclass} features")
+        
+        added = []
+        for feature in features:
+            if feature not in self.features_and_traits:
+                self.features_and_traits.append(feature)
+                added.append(feature)
+        
+        slots = progression["spell_slots"]
+        if slots is not None and any(slots.values()):
+            if not self.spellcasting_class:
+                self.spellcasting_class = self.character_class
+                self.spellcasting_ability = SPELLCASTING_PROGRESSION[self.character_class][1]
+            self.spell_slots = dict(slots)
+            for slot_level in SPELL_SLOT_LEVELS:
+                self.spell_slots_expended[slot_level] = min(
+                    self.spell_slots_expended.get(slot_level, 0), slots[slot_level])
+        
+        self.recalculate_spell_stats()
+        return added
+    
+    def level_up(self, levels: int = 1) -> List[str]:
+        """Gain levels using average hit points per level.
+        
+        Returns the class features gained. Raises ValueError for fewer than one level.
+        """
+        if levels < 1:
+            raise ValueError(f"Cannot gain {levels} levels; level up by at least 1")
+        progression = get_class_progression(self.character_class, self.level)
+        new_level = min(20, self.level + levels)
+        if progression is None or new_level == self.level:
+            return []
+        
+        hit_die = progression["hit_die"]
+        con_mod = self.get_ability_modifier(self.constitution)
+        hp_gain = max(1, hit_die // 2 + 1 + con_mod) * (new_level - self.level)
+        self.hit_point_maximum += hp_gain
+        self.current_hit_points += hp_gain
+        self.level = new_level
+        
+        return self.apply_class_progression()
+    
     def to_dict(self) -> Dict[str, Any]:
         """Convert character to dictionary for JSON serialization."""
-        return self.__dict__
+        data = dict(self.__dict__)
+        data["saving_throws"] = self.saving_throws.to_dict()
+        data["skills"] = self.skills.to_dict()
+        return data
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'Character':
         """Create character from dictionary (JSON deserialization)."""
         character = cls()
         character.__dict__.update(data)
+        character.saving_throws = save_proficiencies(data.get("saving_throws"))
+        character.skills = skill_proficiencies(data.get("skills"))
         return character
 
 
 class CharacterManager:
     """Manages character data storage and retrieval."""
     
-    def __init__(self, data_file: str = "characters.json"):
+    def __init__(self, data_file: str = "characters.json", verbose: bool = True, lazy: bool = False,
+                 storage_format: Optional[str] = None):
         self.data_file = data_file
-        self.characters: Dict[str, Character] = {}
-        self.load_characters()
+        self.verbose = verbose
+        self.load_error: Optional[str] = None
+        if storage_format is not None:
+            parse_format(storage_format)
+        # Format saves use (see roster_codecs); None keeps whatever the file was in when loaded
+        self.storage_format = storage_format
+        # None until the roster is read; with lazy=True that waits for the first use of characters
+        self._characters: Optional[Dict[str, Character]] = None
+        self.lock_file = lock_path(data_file)
+        self.events = CombatLog(event_log_path(data_file), lock_path=self.lock_file)
+        # Saved form of each character as loaded (or last saved); saves merge changes against it
+        self._baseline: Dict[str, Dict[str, Any]] = {}
+        self.loaded_format = DEFAULT_FORMAT
+        self.last_conflicts: Dict[str, List[str]] = {}
+        # Saved records that could not be loaded, by name, with why; saves leave them in the file
+        self.invalid_records: Dict[str, str] = {}
+        if not lazy:
+            self.load_characters()
+    
+    @property
+    def characters(self) -> Dict[str, Character]:
+        if self._characters is None:
+            self.load_characters()
+        return self._characters
+    
+    @characters.setter
+    def characters(self, characters: Dict[str, Character]):
+        self._characters = characters
+    
+    def has_characters(self) -> bool:
+        """Whether the roster has anyone in it, answered from the file size if it has not been read yet."""
+        if self._characters is not None:
+            return bool(self._characters)
+        try:
+            return os.path.getsize(self.data_file) > len("{}")
+        except OSError:
+            return False
+    
+    def log(self, message: str, error: bool = False):
+        """Print a status message; errors are always shown (on stderr when quiet)."""
+        if self.verbose:
+            print(message)
+        elif error:
+            print(message, file=sys.stderr)
     
     def load_characters(self):
-        """Load characters from JSON file."""
+        """Load characters from the data file, in any roster format, or its snapshot while the file is unchanged."""
+        if self._characters is None:
+            self._characters = {}
+        self.invalid_records = {}
         if os.path.exists(self.data_file):
             try:
-                with open(self.data_file, 'r') as f:
-                    data = json.load(f)
-                    for name, char_data in data.items():
-                        self.characters[name] = Character.from_dict(char_data)
-                print(f"Loaded {len(self.characters)} characters.")
-            except (json.JSONDecodeError, FileNotFoundError) as e:
-                print(f"Error loading characters: {e}")
+                with FileLock(self.lock_file, shared=True):
+                    if not self._load_snapshot():
+                        data, self.loaded_format = read_file(self.data_file)
+                        if not isinstance(data, dict):
+                            raise CodecError("The roster is not an object of characters by name")
+                        for name, char_data in data.items():
+                            try:
+                                if not isinstance(char_data.get("name"), str):
+                                    raise ValueError("missing name")
+                                self.characters[name] = Character.from_dict(char_data)
+                            except (AttributeError, TypeError, ValueError) as e:
+                                self.invalid_records[name] = str(e)
+                        self._reset_baseline()
+                        self._store_snapshot(self.characters, self._baseline, self.loaded_format)
+                    self.log(f"Loaded {len(self.characters)} characters.")
+                    if self.invalid_records:
+                        skipped = list(self.invalid_records)
+                        self.log(f"Skipped {len(skipped)} unreadable character(s): {', '.join(skipped[:5])}"
+                                 f"{', ...' if len(skipped) > 5 else ''}. They stay in {self.data_file} until "
+                                 f"`python3 data_check.py {self.data_file} --repair` quarantines them.", error=True)
+                    replayed = self.events.replay(self.characters)
+                if replayed:
+                    self.log(f"Restored combat changes for {replayed} character(s) made since the last save.")
+                    self._reset_baseline()
+            except (CodecError, OSError) as e:
+                self.load_error = str(e)
+                self.log(f"Error loading characters: {e}", error=True)
                 self.characters = {}
         else:
-            print("No existing character file found. Starting fresh.")
+            self.log("No existing character file found. Starting fresh.")
+    
+    def _reset_baseline(self):
+        self._baseline = {name: normalize_record(char.to_dict()) for name, char in self.characters.items()}
+    
+    @staticmethod
+    def _snapshot_version() -> Tuple[int, Tuple[str, ...]]:
+        # Snapshots hold attributes as built, so a new or renamed Character attribute must invalidate them
+        return ROSTER_SNAPSHOT_VERSION, tuple(sorted(vars(Character())))
     
-    def save_characters(self):
-        """Save characters to JSON file."""
+    def _load_snapshot(self) -> bool:
+        """Load the roster and its baseline from the snapshot if the file has not changed since it was taken."""
+        snapshot = load_snapshot(self.data_file, self._snapshot_version())
+        if not (isinstance(snapshot, dict) and isinstance(snapshot.get("characters"), dict)
+                and isinstance(snapshot.get("baseline"), dict) and isinstance(snapshot.get("format"), str)):
+            return False  # None, or a damaged snapshot: parse the file instead
+        attributes = set(vars(Character()))
+        characters = {}
+        for name, state in snapshot["characters"].items():
+            if not (isinstance(state, dict) and state.keys() == attributes):
+                return False
+            # Attribute dicts rather than Character objects, which may belong to __main__
+            character = Character.__new__(Character)
+            character.__dict__.update(state)
+            characters[name] = character
+        self.characters.update(characters)
+        self._baseline = snapshot["baseline"]
+        self.loaded_format = snapshot["format"]
+        return True
+    
+    def _store_snapshot(self, characters: Dict[str, Character], baseline: Dict[str, Dict[str, Any]],
+                        storage_format: str):
+        """Snapshot the roster as just loaded from, or saved to, the data file."""
+        if self.invalid_records:
+            return  # Loading the file again must report the records it skipped
+        store_snapshot(self.data_file, {
+            "characters": {name: char.__dict__ for name, char in characters.items()},
+            "baseline": baseline,
+            "format": storage_format
+        }, self._snapshot_version())
+    
+    def _read_saved_roster(self) -> Dict[str, Dict[str, Any]]:
+        """The roster as other sessions left it: the file plus their logged combat changes."""
+        try:
+            data, _ = read_file(self.data_file)
+        except FileNotFoundError:
+            return {}
+        except CodecError:
+            # Unreadable file: nothing to merge with, so what we loaded wins
+            return dict(self._baseline)
+        # Records saved by older versions lack fields Character has now; bring them to the form the
+        # baseline was built in, or every missing field would read as changed on disk
+        current = set(vars(Character()))
+        for name, record in data.items():
+            if isinstance(record, dict) and name not in self.invalid_records and not (
+                    current <= record.keys() and set(SKILLS) <= (record.get("skills") or {}).keys()
+                    and set(ABILITIES) <= (record.get("saving_throws") or {}).keys()):
+                data[name] = normalize_record(Character.from_dict(record).to_dict())
+        for name, state in latest_states(self.events.pending(), data).items():
+            record = Character.from_dict(data[name])
+            apply_state(record, state)
+            record = normalize_record(record.to_dict())
+            if record != data[name]:
+                record["version"] += 1
+                data[name] = record
+        return data
+    
+    def save_characters(self) -> bool:
+        """Save characters to the data file in storage_format. Returns True on success.
+        
+        The file is locked for the save and only characters changed in this
+        session are merged into what is on disk, so other sessions' edits
+        survive. Fields changed differently in both keep the saved value and
+        are reported in last_conflicts.
+        """
+        if self._characters is None:
+            self.log("No changes to save.")
+            return True
+        saved = self.write_roster(self.roster_records())
+        if saved is None:
+            return False
+        self.apply_saved_roster(saved)
+        return True
+    
+    def roster_records(self) -> Dict[str, Dict[str, Any]]:
+        """Every character as the record a save writes, for write_roster."""
+        return {name: normalize_record(char.to_dict()) for name, char in self.characters.items()}
+    
+    def write_roster(self, ours: Dict[str, Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Merge records from roster_records into the data file and write it. Returns the saved roster, or None.
+        
+        Nothing here reads the in-memory characters, so a server can run it on
+        a worker thread while requests carry on, then hand the result to
+        apply_saved_roster on its own thread.
+        """
         try:
-            data = {name: char.to_dict() for name, char in self.characters.items()}
-            with open(self.data_file, 'w') as f:
-                json.dump(data, f, indent=2)
-            print("Characters saved successfully.")
+            with FileLock(self.lock_file):
+                data, self.last_conflicts = merge_rosters(self._baseline, ours, self._read_saved_roster())
+                # Write a temporary file and swap it in, so a crash never leaves a half-written roster
+                temp_file = f"{self.data_file}.tmp"
+                storage_format = self.storage_format or self.loaded_format
+                with open(temp_file, 'wb') as f:
+                    f.write(encode(data, storage_format))
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(temp_file, self.data_file)
+                self.events.mark_snapshot()
+                characters = {name: Character.from_dict(normalize_record(record)) for name, record in data.items()
+                              if name not in self.invalid_records}
+                self._store_snapshot(characters, data, storage_format)
         except Exception as e:
-            print(f"Error saving characters: {e}")
+            self.log(f"Error saving characters: {e}", error=True)
+            return None
+        self.log("Characters saved successfully.")
+        for name, notes in self.last_conflicts.items():
+            self.log(f"Conflict on {name}: {'; '.join(notes)}.", error=True)
+        return {"records": data, "characters": characters, "format": storage_format}
+    
+    def apply_saved_roster(self, saved: Dict[str, Any], keep: Collection[str] = ()):
+        """Bring in-memory characters in line with a roster write_roster saved, keeping existing objects.
+        
+        Characters named in keep changed after their records were taken for
+        the save and are left as they are; the next save merges them.
+        """
+        records = saved["records"]
+        for name in [name for name in self.characters if name not in records and name not in keep]:
+            del self.characters[name]
+        for name, loaded in saved["characters"].items():
+            if name in keep:
+                continue
+            if name in self.characters:
+                self.characters[name].__dict__.update(loaded.__dict__)
+            else:
+                self.characters[name] = loaded
+        self._baseline = records
+        self.loaded_format = saved["format"]
+    
+    def record_event(self, character: Character, event_type: str, **details):
+        """Append an in-combat change (already made to character) to the combat log.
+        
+        Every SNAPSHOT_INTERVAL events the whole roster is saved, which lets the
+        next load skip the events before it.
+        """
+        self.events.append(character, event_type, **details)
+        if self.events.since_snapshot >= SNAPSHOT_INTERVAL:
+            self.save_characters()
     
     def add_character(self, character: Character):
         """Add a character to the manager."""
@@ -345,6 +659,10 @@ class CharacterManager:
         """Get list of character names."""
         return list(self.characters.keys())
     
+    def get_roster_index(self) -> RosterIndex:
+        """Build a query index over the current roster (a snapshot; rebuild after edits)."""
+        return RosterIndex({name: char.to_dict() for name, char in self.characters.items()})
+    
     def delete_character(self, name: str) -> bool:
         """Delete a character by name."""
         if name in self.characters:
@@ -352,13 +670,130 @@ class CharacterManager:
             return True
         return False
 
+    def export_records(self, path: str, names: Optional[List[str]] = None, where: Optional[str] = None,
+                       fields: Optional[List[str]] = None) -> int:
+        """Write characters to a JSON Lines (.jsonl) or roster file one record at a time. Returns the count.
+    
+        where is a roster search ("class=wizard level>=5") and fields limits
+        each record to those fields (plus name).
+        """
+        from roster_stream import compile_where, project, write_records
+        matches = compile_where(where)
+        names = self.list_characters() if names is None else names
+        records = (self.characters[name].to_dict() for name in names if name in self.characters)
+        return write_records(path, (project(normalize_record(record), fields) for record in records if matches(record)))
+    
+    def import_records(self, path: str, where: Optional[str] = None, replace: bool = False,
+                       strict: bool = False) -> Dict[str, Any]:
+        """Add characters from a JSON Lines (.jsonl) or roster file, reading one record at a time.
+    
+        Each record is validated and, if where is given, filtered first; fields a
+        record leaves out take Character's defaults. Characters already in the
+        roster are kept unless replace is set. Returns counts of what was read,
+        added, replaced, skipped and invalid, with the first few problems.
+        """
+        from roster_stream import StreamReport, iter_records, select_records
+        report = StreamReport()
+        added = replaced = skipped = 0
+        for record in select_records(iter_records(path), report, where, strict=strict):
+            if record["name"] in self.characters:
+                if not replace:
+                    skipped += 1
+                    continue
+                replaced += 1
+            else:
+                added += 1
+            self.characters[record["name"]] = Character.from_dict(record)
+        self.log(f"Imported {added + replaced} characters from {path}.")
+        return {"source": path, "added": added, "replaced": replaced, "skipped": skipped, **report.to_dict()}
+    
+    def level_up_characters(self, names: List[str], levels: int = 1) -> Dict[str, List[str]]:
+        """Level up several characters at once, returning features gained by name."""
+        gained = {}
+        for name in names:
+            character = self.characters.get(name)
+            if character:
+                gained[name] = character.level_up(levels)
+        return gained
+    
+    def _get_party(self, names: List[str]) -> List[Character]:
+        return [self.characters[name] for name in names if name in self.characters]
+    
+    def long_rest(self, names: List[str], save: bool = True) -> List[str]:
+        """Give several characters a long rest, saving once. Returns who rested."""
+        party = self._get_party(names)
+        for character in party:
+            character.long_rest()
+        if save and party:
+            self.save_characters()
+        return [character.name for character in party]
+    
+    def short_rest(self, hit_dice: Dict[str, int], roller: Optional[DiceRoller] = None,
+                   save: bool = True) -> Dict[str, int]:
+        """Short rest with hit dice to spend per character, saving once.
+        
+        Returns HP regained by name.
+        """
+        healed = {character.name: character.short_rest(hit_dice[character.name], roller)
+                  for character in self._get_party(list(hit_dice))}
+        if save and healed:
+            self.save_characters()
+        return healed
+    
+    def apply_area_damage(self, names: List[str], damage, save_ability: Optional[str] = None,
+                          save_dc: Optional[int] = None, roller: Optional[DiceRoller] = None,
+                          save: bool = True) -> Dict[str, Tuple[int, bool]]:
+        """Deal one damage roll to several characters, saving once.
+        
+        damage is a number or dice expression rolled once for every target. With a
+        save ability and DC each target rolls a saving throw and takes half damage
+        on a success. Returns (HP lost, saved) by name.
+        """
+        roller = roller or get_default_roller()
+        if isinstance(damage, str):
+            damage = compile_dice(damage).roll(roller)
+        
+        results = {}
+        for character in self._get_party(names):
+            saved = False
+            if save_ability and save_dc is not None:
+                saved = roller.roll(1, 20)[0] + character.get_saving_throw_modifier(save_ability) >= save_dc
+            results[character.name] = (character.take_damage(damage // 2 if saved else damage), saved)
+        if save and results:
+            self.save_characters()
+        return results
+    
+    def heal_party(self, names: List[str], healing: int, save: bool = True) -> Dict[str, int]:
+        """Heal several characters by the same amount, saving once. Returns HP regained by name."""
+        healed = {character.name: character.heal(healing) for character in self._get_party(names)}
+        if save and healed:
+            self.save_characters()
+        return healed
+    
+    def refresh_spell_slots(self, names: List[str], save: bool = True) -> List[str]:
+        """Recover every expended spell slot for several characters, saving once."""
+        party = self._get_party(names)
+        for character in party:
+            character.recover_spell_slots()
+        if save and party:
+            self.save_characters()
+        return [character.name for character in party]
+
 
 class CharacterMakerCLI:
     """Command-line interface for the character maker."""
     
     def __init__(self):
-        self.manager = CharacterManager()
+        # The roster and dice load on first use so the menu shows straight away
+        self.manager = CharacterManager(lazy=True)
         self.current_character: Optional[Character] = None
+        self._dice: Optional[DiceRoller] = None
+    
+    @property
+    def dice(self) -> DiceRoller:
+        if self._dice is None:
+            self._dice = DiceRoller()
+        return self._dice
     
     def main_menu(self):
         """Display and handle the main menu."""
@@ -374,6 +809,14 @@ class CharacterMakerCLI:
                 print("5. Edit Current Character")
                 print("6. Combat Reference")
                 print(f"   Current: {self.current_character.name}")
+            if self.manager.has_characters():
+                print("7. Simulate Encounter")
+                print("8. Run Encounter (Initiative Tracker)")
+                print("9. Party Operations")
+            print("10. Generate NPCs")
+            if self.manager.has_characters():
+                print("11. Export Character Sheets (PDF)")
+                print("12. Combat Dashboard (Full Screen)")
             print("0. Save and Exit")
             
             try:
@@ -391,6 +834,18 @@ class CharacterMakerCLI:
                     self.edit_character_menu()
                 elif choice == "6" and self.current_character:
                     self.combat_reference()
+                elif choice == "7" and self.manager.characters:
+                    self.simulate_encounter()
+                elif choice == "8" and self.manager.characters:
+                    self.run_encounter()
+                elif choice == "9" and self.manager.characters:
+                    self.party_operations()
+                elif choice == "10":
+                    self.generate_npcs()
+                elif choice == "11" and self.manager.characters:
+                    self.export_character_sheets()
+                elif choice == "12" and self.manager.characters:
+                    self.combat_dashboard()
                 elif choice == "0":
                     self.manager.save_characters()
                     print("Thank you for using D&D Character Maker!")
@@ -498,6 +953,41 @@ class CharacterMakerCLI:
             char = self.manager.get_character(name)
             class_info = f"{char.character_class} {char.level}" if hasattr(char, 'character_class') and hasattr(char, 'level') else getattr(char, 'class_level', 'Unknown')
             print(f"• {name} - {char.race} {class_info}")
+        
+        print("\nSearch with field=value terms: class, subclass, race, ability (spellcasting),")
+        print("level (also level>=N, level<=N), skill, save, plus sort=[-]field, group=field, limit=N.")
+        print("Example: class=cleric,druid level>=5 skill=perception sort=-level")
+        index = self.manager.get_roster_index()
+        while True:
+            text = input("\nSearch (Enter to go back): ").strip()
+            if not text:
+                break
+            self.search_roster(index, text)
+    
+    def search_roster(self, index: RosterIndex, text: str):
+        """Run a roster search and print the matching characters."""
+        try:
+            query = parse_query(text)
+            filters = query["filters"]
+            if query["group_by"]:
+                groups = index.group_by(query["group_by"], query["order_by"], query["descending"], **filters)
+            else:
+                names = index.find(query["order_by"], query["descending"], query["limit"], **filters)
+                groups = {None: names}
+        except (ValueError, TypeError) as e:
+            print(f"Invalid search: {e}")
+            return
+        
+        fields = ["race", "character_class", "level", "subclass"]
+        total = 0
+        for group, names in groups.items():
+            if group is not None:
+                print(f"\n{group or '(none)'}: {len(names)}")
+            for row, name in zip(index.select(names, fields), names):
+                subclass = f" ({row['subclass']})" if row["subclass"] else ""
+                print(f"  • {name} - {row['race']} {row['character_class']} {row['level']}{subclass}")
+            total += len(names)
+        print(f"{total} match(es).")
     
     def delete_character(self):
         """Delete a character."""
@@ -528,6 +1018,380 @@ class CharacterMakerCLI:
         except ValueError:
             print("Please enter a valid number.")
     
+    def select_party(self) -> List[str]:
+        """Pick party members from the roster by number."""
+        characters = self.manager.list_characters()
+        for i, name in enumerate(characters, 1):
+            print(f"{i}. {name}")
+        
+        selection = input("Party members (numbers separated by commas, Enter for all): ").strip()
+        try:
+            indexes = [int(part) - 1 for part in selection.split(",")] if selection else range(len(characters))
+            names = [characters[i] for i in indexes if 0 <= i < len(characters)]
+        except ValueError:
+            print("Please enter valid numbers.")
+            return []
+        if not names:
+            print("No party members selected.")
+        return names
+    
+    def simulate_encounter(self):
+        """Estimate how a party fares against a monster with Monte Carlo encounters."""
+        from combat_sim import Combatant, Monster, party_subsets, simulate_encounters, simulate_sweep
+        
+        print("\n--- SIMULATE ENCOUNTER ---")
+        names = self.select_party()
+        if not names:
+            return
+        
+        party = []
+        for name in names:
+            combatant = Combatant.from_character(self.manager.get_character(name))
+            damage = input(f"{name} damage per attack (default {combatant.damage}): ").strip()
+            if damage:
+                try:
+                    compile_dice(damage)
+                except ValueError as e:
+                    print(f"{e} - using {combatant.damage}")
+                else:
+                    combatant.damage = damage
+            party.append(combatant)
+        
+        print("\nMonster stat block:")
+        try:
+            monster = Monster(
+                name=input("Name: ").strip() or "Monster",
+                armor_class=int(input("Armor Class: ")),
+                hit_points=int(input("Hit Points: ")),
+                attack_bonus=int(input("Attack bonus: ")),
+                damage=input("Damage per attack (e.g. 2d8+4): ").strip() or "1d6",
+                attacks=int(input("Attacks per round (default 1): ") or 1)
+            )
+            compile_dice(monster.damage)
+            encounters = int(input("Encounters to simulate (default 10000): ") or 10000)
+        except ValueError as e:
+            print(f"Invalid input: {e}")
+            return
+        
+        result = simulate_encounters(party, monster, encounters)
+        print(f"\n{', '.join(names)} vs {monster.name} ({result.encounters} encounters)")
+        print(f"  Win rate: {result.win_rate:.1%}  (losses {result.losses}, unresolved {result.draws})")
+        print(f"  Expected rounds: {result.expected_rounds:.2f}  (to win {result.expected_rounds_to_win:.2f})")
+        print(f"  Party members down per fight: {result.average_party_downed:.2f}")
+        
+        if len(party) > 1:
+            size = input(f"\nCompare every party of N members (1-{len(party) - 1}, Enter to skip): ").strip()
+            if size.isdigit() and 1 <= int(size) < len(party):
+                results = simulate_sweep(party_subsets(party, int(size)), monster, encounters)
+                print()
+                for party_name, sweep in sorted(results.items(), key=lambda item: -item[1].win_rate):
+                    print(f"  {party_name}: {sweep.win_rate:.1%} win, {sweep.expected_rounds:.2f} rounds")
+    
+    def run_encounter(self):
+        """Track initiative, rounds and timed conditions for a fight."""
+        from encounter import Encounter
+        
+        print("\n--- RUN ENCOUNTER ---")
+        names = self.select_party()
+        if not names:
+            return
+        
+        encounter = Encounter(self.dice)
+        auto_roll = input("Roll initiative for the party automatically? (Y/n): ").strip().lower() != 'n'
+        for name in names:
+            initiative = None
+            if not auto_roll:
+                try:
+                    initiative = int(input(f"{name} initiative roll total: "))
+                except ValueError:
+                    print("Invalid number - rolling instead.")
+            encounter.add_character(self.manager.get_character(name), initiative)
+        
+        print("\nAdd monsters (blank name when done):")
+        while self.add_encounter_monster(encounter):
+            pass
+        
+        expired = encounter.start()
+        while True:
+            self.show_encounter(encounter, expired)
+            print("\nEnter. Next turn | c. Add condition | d. Damage/heal | m. Add monster | r. Remove combatant | 0. End encounter")
+            choice = input("Select: ").strip().lower()
+            expired = []
+            
+            if choice in ("", "n"):
+                expired = encounter.next_turn()
+            elif choice == "c":
+                target = self.choose_participant(encounter, "Condition on")
+                condition = input("Condition: ").strip() if target else ""
+                if condition:
+                    rounds = input("Lasts how many rounds (blank until removed): ").strip()
+                    if rounds.isdigit() and int(rounds) > 0:
+                        effect = encounter.add_effect(target.name, condition, int(rounds))
+                        print(f"Added {effect.describe()}")
+                    else:
+                        target.conditions.append(condition)
+                        print(f"Added condition: {condition}")
+                    if not target.is_monster:
+                        self.manager.record_event(target.character, "condition_added",
+                                                  condition=condition, round=encounter.round)
+            elif choice == "d":
+                target = self.choose_participant(encounter, "Target")
+                if target:
+                    try:
+                        amount = self.read_amount("Damage (negative to heal): ")
+                    except ValueError:
+                        print("Invalid damage value.")
+                        continue
+                    if target.is_monster:
+                        target.hit_points = max(0, min(target.max_hit_points, target.hit_points - amount))
+                    elif amount >= 0:
+                        target.character.take_damage(amount)
+                        self.manager.record_event(target.character, "damage", amount=amount, round=encounter.round)
+                    else:
+                        target.character.heal(-amount)
+                        self.manager.record_event(target.character, "heal", amount=-amount, round=encounter.round)
+                    print(f"{target.name}: {target.current_hit_points}/{target.max_hit_points} HP")
+                    if (target.is_monster and target.hit_points == 0
+                            and input(f"Remove {target.name}? (Y/n): ").strip().lower() != 'n'):
+                        encounter.remove_participant(target.name)
+            elif choice == "m":
+                self.add_encounter_monster(encounter)
+            elif choice == "r":
+                target = self.choose_participant(encounter, "Remove")
+                if target:
+                    encounter.remove_participant(target.name)
+                    print(f"{target.name} removed from the encounter.")
+            elif choice == "0":
+                break
+            else:
+                print("Invalid choice.")
+            
+            if not encounter.participants:
+                print("No combatants left.")
+                break
+            if encounter.current is None:
+                expired += encounter.next_turn()
+            for effect in expired:
+                participant = encounter.participants.get(effect.target)
+                if participant and not participant.is_monster:
+                    self.manager.record_event(participant.character, "condition_removed",
+                                              condition=effect.condition, round=encounter.round)
+        
+        print(f"Encounter ended after {encounter.round} round(s).")
+    
+    def add_encounter_monster(self, encounter: 'Encounter') -> bool:
+        """Prompt for a monster (or group) and add it to the encounter."""
+        name = input("Monster name: ").strip()
+        if not name:
+            return False
+        try:
+            count = int(input("How many (default 1): ") or 1)
+            bonus = int(input("Initiative bonus (default 0): ") or 0)
+            hit_points = int(input("Hit points: "))
+            armor_class = int(input("Armor Class (default 10): ") or 10)
+        except ValueError:
+            print("Please enter valid numbers.")
+            return True
+        for _ in range(count):
+            monster = encounter.add_monster(name, bonus, hit_points, armor_class)
+            print(f"Added {monster.name} (initiative {monster.initiative})")
+        return True
+    
+    def choose_participant(self, encounter: 'Encounter', prompt: str):
+        """Pick a combatant by turn-order number."""
+        order = encounter.turn_order()
+        try:
+            index = int(input(f"{prompt} (number): ")) - 1
+        except ValueError:
+            print("Please enter a valid number.")
+            return None
+        if 0 <= index < len(order):
+            return order[index]
+        print("Invalid selection.")
+        return None
+    
+    def show_encounter(self, encounter: 'Encounter', expired: list):
+        """Print the turn order with HP and conditions."""
+        print(f"\n{'='*50}")
+        print(f"ROUND {encounter.round} - {encounter.current.name}'s turn")
+        print(f"{'='*50}")
+        for effect in expired:
+            print(f"Expired: {effect.condition} on {effect.target}")
+        for i, participant in enumerate(encounter.turn_order(), 1):
+            marker = ">" if participant is encounter.current else " "
+            conditions = f" [{', '.join(participant.conditions)}]" if participant.conditions else ""
+            print(f"{marker}{i:2d}. {participant.name:<20} Init {participant.initiative:3d}  "
+                  f"AC {participant.armor_class:2d}  HP {participant.current_hit_points}/{participant.max_hit_points}{conditions}")
+    
+    def party_operations(self):
+        """Rests and HP/slot changes applied to several characters with one save."""
+        while True:
+            print("\n--- PARTY OPERATIONS ---")
+            print("1. Long Rest")
+            print("2. Short Rest (spend hit dice)")
+            print("3. Area Damage")
+            print("4. Heal")
+            print("5. Refresh Spell Slots")
+            print("6. Level Up")
+            print("7. Saves & Skills Overview")
+            print("0. Back")
+            
+            choice = input("\nSelect: ").strip()
+            if choice == "0":
+                break
+            if choice not in ("1", "2", "3", "4", "5", "6", "7"):
+                print("Invalid choice.")
+                continue
+            
+            names = self.select_party()
+            if not names:
+                continue
+            
+            try:
+                if choice == "1":
+                    rested = self.manager.long_rest(names)
+                    print(f"Long rest complete for {len(rested)} character(s).")
+                
+                elif choice == "2":
+                    hit_dice = {}
+                    for name in names:
+                        char = self.manager.get_character(name)
+                        available = char.get_hit_dice_remaining()
+                        spend = input(f"{name} - hit dice to spend (0-{available}, "
+                                      f"HP {char.current_hit_points}/{char.hit_point_maximum}): ").strip()
+                        hit_dice[name] = int(spend) if spend else 0
+                    healed = self.manager.short_rest(hit_dice, self.dice)
+                    for name, amount in healed.items():
+                        char = self.manager.get_character(name)
+                        print(f"  {name}: +{amount} HP ({char.current_hit_points}/{char.hit_point_maximum}), "
+                              f"{char.get_hit_dice_remaining()} hit dice left")
+                
+                elif choice == "3":
+                    damage = self.read_amount("Damage (number or dice, rolled once for all targets): ")
+                    save_ability = input("Saving throw for half (str/dex/con/int/wis/cha, blank for none): ").strip().lower()
+                    abilities = {ability[:3]: ability for ability in
+                                 ["strength", "dexterity", "constitution", "intelligence", "wisdom", "charisma"]}
+                    save_ability = abilities.get(save_ability[:3]) if save_ability else None
+                    save_dc = int(input("Save DC: ")) if save_ability else None
+                    results = self.manager.apply_area_damage(names, damage, save_ability, save_dc, self.dice)
+                    for name, (hp_lost, saved) in results.items():
+                        char = self.manager.get_character(name)
+                        status = " - UNCONSCIOUS!" if char.current_hit_points == 0 else ""
+                        print(f"  {name}: {'saved, ' if saved else ''}-{hp_lost} HP "
+                              f"({char.current_hit_points}/{char.hit_point_maximum}){status}")
+                
+                elif choice == "4":
+                    healing = self.read_amount("Healing (number or dice): ")
+                    for name, amount in self.manager.heal_party(names, healing).items():
+                        char = self.manager.get_character(name)
+                        print(f"  {name}: +{amount} HP ({char.current_hit_points}/{char.hit_point_maximum})")
+                
+                elif choice == "5":
+                    refreshed = self.manager.refresh_spell_slots(names)
+                    print(f"Spell slots recovered for {len(refreshed)} character(s).")
+                
+                elif choice == "6":
+                    levels = int(input("Levels to gain (default 1): ") or 1)
+                    if levels < 1:
+                        raise ValueError("levels to gain must be at least 1")
+                    for name, features in self.manager.level_up_characters(names, levels).items():
+                        char = self.manager.get_character(name)
+                        added = f" - new: {', '.join(features)}" if features else ""
+                        print(f"  {name}: level {char.level}, HP {char.hit_point_maximum}{added}")
+                    self.manager.save_characters()
+                
+                elif choice == "7":
+                    self.show_party_modifiers(names)
+            
+            except ValueError as e:
+                print(f"Invalid input: {e}")
+    
+    def show_party_modifiers(self, names: List[str]):
+        """DM screen: every selected character's saves and passives, and the party's best at each skill."""
+        characters = [self.manager.get_character(name) for name in names]
+        skills, saves = party_modifier_matrices(characters)
+        perception, insight, investigation = (SKILLS.index(skill) for skill in
+                                              ("perception", "insight", "investigation"))
+        
+        header = " ".join(f"{ability[:3].upper():>4}" for ability in ABILITIES)
+        print(f"\n{'Name':<20} {header}  PPer PIns PInv")
+        for char, skill_row, save_row in zip(characters, skills, saves):
+            save_text = " ".join(f"{int(mod):+4d}" for mod in save_row)
+            print(f"{char.name[:20]:<20} {save_text}  {10 + int(skill_row[perception]):4d} "
+                  f"{10 + int(skill_row[insight]):4d} {10 + int(skill_row[investigation]):4d}")
+        
+        print("\nBest in party:")
+        for column, skill in enumerate(SKILLS):
+            best = max(range(len(characters)), key=lambda row: skills[row][column])
+            print(f"  {skill.replace('_', ' ').title():<16} {characters[best].name} ({int(skills[best][column]):+d})")
+    
+    def generate_npcs(self):
+        """Generate a batch of NPCs from a template straight into the roster."""
+        from npc_generator import ABILITY_METHODS, HP_METHODS, NPCTemplate, add_npcs_to_roster
+        
+        print("\n--- GENERATE NPCs ---")
+        print(f"Classes: {', '.join(DND_CLASSES)}")
+        try:
+            name = input("Name prefix (default NPC): ").strip() or "NPC"
+            classes = [c.strip().title() for c in input("Classes (comma-separated, Enter for any): ").split(",") if c.strip()]
+            levels = input("Level or range, e.g. 3 or 1-5 (default 1): ").strip() or "1"
+            low, _, high = levels.partition("-")
+            races = [r.strip() for r in input("Races (comma-separated, default Human): ").split(",") if r.strip()]
+            ability_method = input(f"Ability scores ({'/'.join(ABILITY_METHODS)}, default 4d6): ").strip() or "4d6"
+            hp_method = input(f"Hit points ({'/'.join(HP_METHODS)}, default roll): ").strip() or "roll"
+            count = int(input("How many: "))
+            seed = input("Seed (optional, for repeatable results): ").strip()
+            
+            template = NPCTemplate.from_dict({
+                "name": name,
+                "classes": classes or list(DND_CLASSES),
+                "level_range": (int(low), int(high or low)),
+                "races": races or ["Human"],
+                "ability_method": ability_method,
+                "hp_method": hp_method
+            })
+            names = add_npcs_to_roster(self.manager, template, count, int(seed) if seed else None,
+                                       factory=Character.from_dict)
+        except ValueError as e:
+            print(f"Invalid input: {e}")
+            return
+        
+        if names:
+            print(f"Generated {len(names)} NPCs: {names[0]} to {names[-1]}")
+    
+    def combat_dashboard(self):
+        """Track HP, slots, conditions and checks for several characters on one full screen."""
+        from combat_dashboard import run_dashboard
+        
+        print("\n--- COMBAT DASHBOARD ---")
+        names = self.select_party()
+        if not names:
+            return
+        try:
+            changed = run_dashboard([self.manager.get_character(name) for name in names], self.dice,
+                                    self.manager.record_event)
+        except RuntimeError as e:
+            print(e)
+            return
+        if changed:
+            self.manager.save_characters()
+    
+    def export_character_sheets(self):
+        """Fill the fillable PDF character sheet for selected characters."""
+        from pdf_export import PDFError, export_character_sheets
+        
+        print("\n--- EXPORT CHARACTER SHEETS (PDF) ---")
+        names = self.select_party()
+        if not names:
+            return
+        output_dir = input("Output folder (default character_sheets): ").strip() or "character_sheets"
+        try:
+            paths = export_character_sheets([self.manager.get_character(name) for name in names], output_dir)
+        except (OSError, PDFError) as e:
+            print(f"Error exporting character sheets: {e}")
+            return
+        print(f"Wrote {len(paths)} character sheet(s) to {output_dir}")
+    
     def edit_character_menu(self):
         """Character editing menu."""
         while True:
@@ -540,6 +1404,7 @@ class CharacterMakerCLI:
             print("5. Spellcasting")
             print("6. Features & Traits")
             print("7. View Character Sheet")
+            print("8. Level Up")
             print("0. Return to Main Menu")
             
             choice = input("\nChoose section to edit: ").strip()
@@ -558,6 +1423,8 @@ class CharacterMakerCLI:
                 self.edit_features()
             elif choice == "7":
                 self.view_character_sheet()
+            elif choice == "8":
+                self.level_up_character()
             elif choice == "0":
                 break
             else:
@@ -766,8 +1633,16 @@ class CharacterMakerCLI:
         print(f"Spell save DC: {char.spell_save_dc}")
         print(f"Spell attack bonus: +{char.spell_attack_bonus}")
         
+        table_slots = get_spell_slots(char.spellcasting_class, char.level)
+        if table_slots is not None and table_slots != char.spell_slots:
+            response = input(f"Use {char.spellcasting_class} {char.level} spell slots from class table? (y/n): ").strip().lower()
+            if response.startswith('y'):
+                char.spell_slots = dict(table_slots)
+                for level in SPELL_SLOT_LEVELS:
+                    char.spell_slots_expended[level] = min(char.spell_slots_expended[level], table_slots[level])
+        
         print("\nSpell Slots:")
-        for level in ["1st", "2nd", "3rd", "4th", "5th", "6th", "7th", "8th", "9th"]:
+        for level in SPELL_SLOT_LEVELS:
             current = char.spell_slots[level]
             if current > 0 or level == "1st":
                 new_slots = input(f"  {level} level [{current}]: ").strip()
@@ -779,6 +1654,129 @@ class CharacterMakerCLI:
                         print(f"Invalid value for {level} level slots.")
         
         print("Spellcasting updated!")
+        
+        if input("Manage spells known and prepared? (y/n): ").strip().lower().startswith('y'):
+            self.manage_spells()
+    
+    def manage_spells(self):
+        """Add, remove and prepare spells with autocomplete from the spell compendium."""
+        from spells import get_spell_compendium
+        
+        char = self.current_character
+        compendium = get_spell_compendium()
+        
+        while True:
+            max_prepared = char.get_max_prepared_spells()
+            prepared_info = f"{len(char.spells_prepared)}/{max_prepared}" if max_prepared else str(len(char.spells_prepared))
+            print(f"\n--- SPELLS ---")
+            print(f"Known ({len(char.spells_known)}): {', '.join(char.spells_known) if char.spells_known else 'None'}")
+            print(f"Prepared ({prepared_info}): {', '.join(char.spells_prepared) if char.spells_prepared else 'None'}")
+            
+            print("\n1. Add Spell")
+            print("2. Remove Spell")
+            print("3. Prepare Spell")
+            print("4. Unprepare Spell")
+            print("5. Browse Class Spells by Level")
+            print("0. Back")
+            
+            choice = input("Choose: ").strip()
+            
+            if choice == "1":
+                spell_name = self.choose_spell_from_compendium(char)
+                if spell_name and spell_name not in char.spells_known:
+                    char.spells_known.append(spell_name)
+                    print(f"Added: {spell_name}")
+                elif spell_name:
+                    print(f"{spell_name} is already known.")
+            
+            elif choice == "2" and char.spells_known:
+                spell_name = self.choose_from_list(char.spells_known, "Spell number to remove: ")
+                if spell_name:
+                    char.spells_known.remove(spell_name)
+                    if spell_name in char.spells_prepared:
+                        char.spells_prepared.remove(spell_name)
+                    print(f"Removed: {spell_name}")
+            
+            elif choice == "3":
+                unprepared = [spell for spell in char.spells_known if spell not in char.spells_prepared]
+                if not unprepared:
+                    print("No unprepared spells known.")
+                    continue
+                if max_prepared and len(char.spells_prepared) >= max_prepared:
+                    print(f"Already preparing the maximum of {max_prepared} spells.")
+                    continue
+                spell_name = self.choose_from_list(unprepared, "Spell number to prepare: ")
+                if spell_name:
+                    char.spells_prepared.append(spell_name)
+                    print(f"Prepared: {spell_name}")
+            
+            elif choice == "4" and char.spells_prepared:
+                spell_name = self.choose_from_list(char.spells_prepared, "Spell number to unprepare: ")
+                if spell_name:
+                    char.spells_prepared.remove(spell_name)
+                    print(f"Unprepared: {spell_name}")
+            
+            elif choice == "5":
+                try:
+                    level = int(input("Spell level (0 for cantrips): ").strip())
+                except ValueError:
+                    print("Please enter a valid number.")
+                    continue
+                spells = compendium.find(level=level, class_name=char.spellcasting_class or None)
+                for spell in spells:
+                    marker = "*" if spell.name in char.spells_known else " "
+                    print(f" {marker} {spell.name} ({spell.school}{', concentration' if spell.concentration else ''})")
+                if not spells:
+                    print("No spells found.")
+            
+            elif choice == "0":
+                break
+    
+    def choose_spell_from_compendium(self, char: Character) -> Optional[str]:
+        """Prompt for a spell name with prefix autocomplete, allowing custom spells."""
+        from spells import get_spell_compendium
+        
+        compendium = get_spell_compendium()
+        class_name = char.spellcasting_class if char.spellcasting_class.lower() in compendium.by_class else None
+        
+        text = input("Spell name (or first letters): ").strip()
+        if not text:
+            return None
+        
+        spell = compendium.get(text)
+        if spell:
+            return spell.name
+        
+        matches = compendium.complete(text, limit=10, class_name=class_name)
+        if not matches and class_name:
+            matches = compendium.complete(text, limit=10)
+        
+        for i, match in enumerate(matches, 1):
+            print(f"  {i}. {match.name} ({match.level_label} {match.school})")
+        choice = input(f"Select number, or press Enter to add '{text}' as a custom spell: ").strip()
+        if not choice:
+            return text
+        try:
+            index = int(choice) - 1
+            if 0 <= index < len(matches):
+                return matches[index].name
+        except ValueError:
+            pass
+        print("Invalid selection.")
+        return None
+    
+    def choose_from_list(self, options: List[str], prompt: str) -> Optional[str]:
+        """Show a numbered list and return the chosen entry."""
+        for i, option in enumerate(options, 1):
+            print(f"  {i}. {option}")
+        try:
+            index = int(input(prompt)) - 1
+            if 0 <= index < len(options):
+                return options[index]
+            print("Invalid selection.")
+        except ValueError:
+            print("Please enter a valid number.")
+        return None
     
     def edit_features(self):
         """Edit features and traits."""
@@ -830,6 +1828,37 @@ class CharacterMakerCLI:
             except ValueError:
                 print("Please enter a valid number.")
     
+    def level_up_character(self):
+        """Level up the current character using the class progression table."""
+        char = self.current_character
+        print(f"\n--- LEVEL UP ---")
+        
+        if get_class_progression(char.character_class, char.level) is None:
+            print("Level up requires a standard class. Use Basic Information to set one.")
+            return
+        if char.level >= 20:
+            print(f"{char.name} is already level 20.")
+            return
+        
+        try:
+            levels = input(f"Levels to gain (1-{20 - char.level}) [1]: ").strip()
+            levels = int(levels) if levels else 1
+        except ValueError:
+            print("Please enter a valid number.")
+            return
+        if not 1 <= levels <= 20 - char.level:
+            print("Invalid number of levels.")
+            return
+        
+        features = char.level_up(levels)
+        print(f"{char.name} is now a level {char.level} {char.character_class}.")
+        print(f"HP: {char.current_hit_points}/{char.hit_point_maximum} | "
+              f"Proficiency: +{char.proficiency_bonus} | Hit Dice: {char.hit_dice}")
+        if features:
+            print("New features:")
+            for feature in features:
+                print(f"  • {feature}")
+    
     def view_character_sheet(self):
         """Display a formatted character sheet."""
         char = self.current_character
@@ -857,7 +1886,7 @@ class CharacterMakerCLI:
         print(f"Hit Points: {char.current_hit_points}/{char.hit_point_maximum}")
         if char.temporary_hit_points > 0:
             print(f"Temporary HP: {char.temporary_hit_points}")
-        print(f"Hit Dice: {char.hit_dice}")
+        print(f"Hit Dice: {char.hit_dice} ({char.get_hit_dice_remaining()} remaining)")
         print(f"Proficiency Bonus: +{char.proficiency_bonus}")
         
         # Saving throws
@@ -890,6 +1919,11 @@ class CharacterMakerCLI:
                 used = char.spell_slots_expended[level]
                 if total > 0:
                     print(f"  {level}: {total-used}/{total}")
+            
+            if char.spells_known:
+                print(f"Spells Known: {', '.join(char.spells_known)}")
+            if char.spells_prepared:
+                print(f"Spells Prepared: {', '.join(char.spells_prepared)}")
         
         # Features
         if char.features_and_traits:
@@ -914,23 +1948,21 @@ class CharacterMakerCLI:
         # Get level from new format or old format
         level = getattr(character, 'level', 1)
         if level == 1 and hasattr(character, 'class_level') and character.class_level:
-            import re
-            level_match = re.search(r'(\d+)', character.class_level)
+            level_match = LEGACY_LEVEL_PATTERN.search(character.class_level)
             if level_match:
                 level = int(level_match.group(1))
         
         character.proficiency_bonus = 2 + ((level - 1) // 4)
         character.initiative = character.get_ability_modifier(character.dexterity)
         
-        if hasattr(character, 'spellcasting_ability') and character.spellcasting_ability:
+        if get_class_progression(getattr(character, 'character_class', ''), level):
+            character.apply_class_progression()
+        elif hasattr(character, 'spellcasting_ability') and character.spellcasting_ability:
             self.recalculate_spell_stats(character)
     
     def recalculate_spell_stats(self, character: Character):
         """Recalculate spellcasting stats when ability scores change."""
-        if character.spellcasting_ability:
-            ability_mod = character.get_ability_modifier(getattr(character, character.spellcasting_ability))
-            character.spell_save_dc = 8 + character.proficiency_bonus + ability_mod
-            character.spell_attack_bonus = character.proficiency_bonus + ability_mod
+        character.recalculate_spell_stats()
     
     def combat_reference(self):
         """Quick combat reference for easy access during gameplay."""
@@ -957,6 +1989,9 @@ class CharacterMakerCLI:
             print("5. Spellcasting Quick Ref")
             print("6. Attack Calculations")
             print("7. Conditions & Notes")
+            print("8. Roll Dice")
+            print("9. Full-Screen Dashboard")
+            print("10. Combat History")
             print("0. Back to Main Menu")
             
             choice = input("\nSelect: ").strip()
@@ -975,6 +2010,17 @@ class CharacterMakerCLI:
                 self.attack_calculations()
             elif choice == "7":
                 self.conditions_notes()
+            elif choice == "8":
+                self.roll_dice()
+            elif choice == "9":
+                from combat_dashboard import run_dashboard
+                try:
+                    if run_dashboard([char], self.dice, self.manager.record_event):
+                        self.manager.save_characters()
+                except RuntimeError as e:
+                    print(e)
+            elif choice == "10":
+                self.combat_history()
             elif choice == "0":
                 break
             else:
@@ -1001,15 +2047,9 @@ class CharacterMakerCLI:
             
             if choice == "1":
                 try:
-                    damage = int(input("Damage taken: "))
-                    # Apply to temp HP first
-                    if char.temporary_hit_points > 0:
-                        temp_lost = min(damage, char.temporary_hit_points)
-                        char.temporary_hit_points -= temp_lost
-                        damage -= temp_lost
-                    
-                    # Apply remaining damage to current HP
-                    char.current_hit_points = max(0, char.current_hit_points - damage)
+                    damage = self.read_amount("Damage taken (number or dice, e.g. 2d6+3): ")
+                    char.take_damage(damage)
+                    self.manager.record_event(char, "damage", amount=damage)
                     print(f"HP after damage: {char.current_hit_points}/{char.hit_point_maximum}")
                     
                     if char.current_hit_points == 0:
@@ -1020,24 +2060,25 @@ class CharacterMakerCLI:
             
             elif choice == "2":
                 try:
-                    healing = int(input("Healing received: "))
-                    char.current_hit_points = min(char.hit_point_maximum, 
-                                                 char.current_hit_points + healing)
+                    healing = self.read_amount("Healing received (number or dice): ")
+                    char.heal(healing)
+                    self.manager.record_event(char, "heal", amount=healing)
                     print(f"HP after healing: {char.current_hit_points}/{char.hit_point_maximum}")
                 except ValueError:
                     print("Invalid healing value.")
             
             elif choice == "3":
                 try:
-                    temp_hp = int(input("Temporary HP gained: "))
-                    # Temp HP doesn't stack, take the higher value
-                    char.temporary_hit_points = max(char.temporary_hit_points, temp_hp)
+                    temp_hp = self.read_amount("Temporary HP gained (number or dice): ")
+                    char.add_temporary_hit_points(temp_hp)
+                    self.manager.record_event(char, "temp_hp", amount=temp_hp)
                     print(f"Temporary HP: {char.temporary_hit_points}")
                 except ValueError:
                     print("Invalid temporary HP value.")
             
             elif choice == "4":
                 char.temporary_hit_points = 0
+                self.manager.record_event(char, "temp_hp_removed")
                 print("Temporary HP removed.")
             
             elif choice == "5":
@@ -1045,6 +2086,7 @@ class CharacterMakerCLI:
                     new_hp = int(input(f"Set current HP (0-{char.hit_point_maximum}): "))
                     if 0 <= new_hp <= char.hit_point_maximum:
                         char.current_hit_points = new_hp
+                        self.manager.record_event(char, "set_hp", amount=new_hp)
                         print(f"HP set to: {char.current_hit_points}/{char.hit_point_maximum}")
                     else:
                         print(f"HP must be between 0 and {char.hit_point_maximum}")
@@ -1054,6 +2096,49 @@ class CharacterMakerCLI:
             elif choice == "0":
                 break
     
+    def combat_history(self, limit: int = 20):
+        """Show the latest logged HP, slot and condition changes for the current character."""
+        char = self.current_character
+        events = self.manager.events.history(char.name, limit)
+        print(f"\n--- COMBAT HISTORY: {char.name} ---")
+        if not events:
+            print("No combat changes logged yet.")
+        for event in events:
+            print(describe_event(event))
+        input("\nPress Enter to continue...")
+    
+    def read_amount(self, prompt: str) -> int:
+        """Read a number or a dice expression, rolling the expression if given.
+
+        A roll never comes out below zero, so 1d4-6 does not heal on a hit.
+        """
+        text = input(prompt).strip()
+        if text.lstrip('-').isdigit():
+            return int(text)
+        
+        expression = compile_dice(text)
+        total, details = expression.describe_roll(self.dice)
+        print(f"Rolled {expression}: {details} = {total}")
+        return max(0, total)
+    
+    def roll_dice(self):
+        """Roll dice expressions such as 8d6+4, 2d20kh1 or 4d6dl1."""
+        print(f"\n--- ROLL DICE ---")
+        print("Enter a dice expression (e.g. 1d20+5, 2d20kh1 for advantage, 4d6dl1). Blank to go back.")
+        
+        while True:
+            text = input("Roll: ").strip()
+            if not text:
+                break
+            try:
+                expression = compile_dice(text)
+            except ValueError as e:
+                print(e)
+                continue
+            total, details = expression.describe_roll(self.dice)
+            print(f"{details} = {total}")
+            print(f"  (average {expression.mean:g}, range {expression.minimum}-{expression.maximum})")
+    
     def view_ability_modifiers(self):
         """Quick view of ability scores and modifiers."""
         char = self.current_character
@@ -1158,6 +2243,7 @@ class CharacterMakerCLI:
                 if level in char.spell_slots and char.spell_slots[level] > 0:
                     if char.spell_slots_expended[level] < char.spell_slots[level]:
                         char.spell_slots_expended[level] += 1
+                        self.manager.record_event(char, "slot_used", level=level)
                         remaining = char.spell_slots[level] - char.spell_slots_expended[level]
                         print(f"{level} level slot used. {remaining} remaining.")
                     else:
@@ -1169,14 +2255,15 @@ class CharacterMakerCLI:
                 level = input("Spell level to recover (1st, 2nd, etc.): ").strip()
                 if level in char.spell_slots and char.spell_slots_expended[level] > 0:
                     char.spell_slots_expended[level] -= 1
+                    self.manager.record_event(char, "slot_recovered", level=level)
                     remaining = char.spell_slots[level] - char.spell_slots_expended[level]
                     print(f"{level} level slot recovered. {remaining} remaining.")
                 else:
                     print("Invalid spell level or no expended slots of that level.")
             
             elif choice == "3":
-                for level in char.spell_slots_expended:
-                    char.spell_slots_expended[level] = 0
+                char.recover_spell_slots()
+                self.manager.record_event(char, "slots_reset")
                 print("All spell slots recovered!")
             
             elif choice == "0":
@@ -1244,6 +2331,7 @@ class CharacterMakerCLI:
                 condition = input("Add condition: ").strip()
                 if condition:
                     char.conditions.append(condition)
+                    self.manager.record_event(char, "condition_added", condition=condition)
                     print(f"Added condition: {condition}")
             
             elif choice == "2" and char.conditions:
@@ -1251,6 +2339,7 @@ class CharacterMakerCLI:
                     index = int(input("Remove condition number: ")) - 1
                     if 0 <= index < len(char.conditions):
                         removed = char.conditions.pop(index)
+                        self.manager.record_event(char, "condition_removed", condition=removed)
                         print(f"Removed: {removed}")
                     else:
                         print("Invalid condition number.")
@@ -1277,6 +2366,7 @@ class CharacterMakerCLI:
             elif choice == "5":
                 char.conditions = []
                 char.combat_notes = []
+                self.manager.record_event(char, "conditions_cleared")
                 print("All conditions and notes cleared.")
             
             elif choice == "0":
@@ -1313,15 +2403,19 @@ class CharacterMakerCLI:
         # Get level (should already be set by select_level)
         level = getattr(character, 'level', 1)
         
+        progression = get_class_progression(getattr(character, 'character_class', ''), level)
+        
         # Calculate proficiency bonus
-        character.proficiency_bonus = 2 + ((level - 1) // 4)
+        if progression:
+            character.proficiency_bonus = progression["proficiency_bonus"]
+        else:
+            character.proficiency_bonus = 2 + ((level - 1) // 4)
         
         print(f"Proficiency bonus: +{character.proficiency_bonus}")
         
-        # Hit dice will be set based on character class during HP generation
-        if hasattr(character, 'character_class') and character.character_class in DND_CLASSES:
-            hit_die = DND_CLASSES[character.character_class]["hit_die"]
-            character.hit_dice = f"{level}d{hit_die}"
+        # Hit dice come from the class progression table
+        if progression:
+            character.hit_dice = progression["hit_dice"]
             print(f"Hit dice: {character.hit_dice}")
     
     def set_proficiencies(self, character: Character):
@@ -1393,13 +2487,24 @@ class CharacterMakerCLI:
         """Setup basic spellcasting information."""
         print("\n--- SPELLCASTING SETUP ---")
         
-        character.spellcasting_class = input("Spellcasting class: ").strip()
+        default_class = character.character_class if character.character_class in SPELLCASTING_PROGRESSION else ""
+        prompt = f"Spellcasting class [{default_class}]: " if default_class else "Spellcasting class: "
+        character.spellcasting_class = input(prompt).strip() or default_class
+        
+        default_ability = ""
+        if character.spellcasting_class in SPELLCASTING_PROGRESSION:
+            default_ability = SPELLCASTING_PROGRESSION[character.spellcasting_class][1]
         
         print("Spellcasting ability:")
         print("1. Intelligence  2. Wisdom  3. Charisma")
         while True:
-            choice = input("Choose (1-3): ").strip()
-            if choice == "1":
+            choice = input(f"Choose (1-3) [{default_ability.capitalize()}]: " if default_ability
+                           else "Choose (1-3): ").strip()
+            if not choice and default_ability:
+                character.spellcasting_ability = default_ability
+                ability_mod = character.get_ability_modifier(getattr(character, default_ability))
+                break
+            elif choice == "1":
                 character.spellcasting_ability = "intelligence"
                 ability_mod = character.get_ability_modifier(character.intelligence)
                 break
@@ -1418,17 +2523,23 @@ class CharacterMakerCLI:
         character.spell_save_dc = 8 + character.proficiency_bonus + ability_mod
         character.spell_attack_bonus = character.proficiency_bonus + ability_mod
         
-        # Set spell slots (simplified - just ask for total)
-        print("Enter number of spell slots per level (0 for none):")
-        for level in ["1st", "2nd", "3rd", "4th", "5th", "6th", "7th", "8th", "9th"]:
-            try:
-                slots = input(f"  {level} level slots: ").strip()
-                if slots:
-                    character.spell_slots[level] = int(slots)
-                else:
-                    break  # Stop at first empty entry
-            except ValueError:
-                print("Invalid number, skipping.")
+        # Spell slots come from the class progression table when available
+        table_slots = get_spell_slots(character.spellcasting_class, character.level)
+        if table_slots is not None:
+            character.spell_slots = dict(table_slots)
+            slot_summary = ", ".join(f"{level}: {count}" for level, count in table_slots.items() if count)
+            print(f"Spell slots ({character.spellcasting_class} {character.level}): {slot_summary or 'None yet'}")
+        else:
+            print("Enter number of spell slots per level (0 for none):")
+            for level in SPELL_SLOT_LEVELS:
+                try:
+                    slots = input(f"  {level} level slots: ").strip()
+                    if slots:
+                        character.spell_slots[level] = int(slots)
+                    else:
+                        break  # Stop at first empty entry
+                except ValueError:
+                    print("Invalid number, skipping.")
         
         print(f"Spell save DC: {character.spell_save_dc}")
         print(f"Spell attack bonus: +{character.spell_attack_bonus}")
@@ -1524,10 +2635,16 @@ class CharacterMakerCLI:
         print(f"Constitution Modifier: {con_mod:+d}")
         print(f"Level: {character.level}")
         
+        # Exact odds for rolled HP
+        rolled_odds = distribution_percentiles(hit_point_distribution(character.level, hit_die, con_mod))
+        odds_summary = " | ".join(f"{percent:g}%: {hp}" for percent, hp in rolled_odds.items())
+        
         print(f"\nHP Calculation Options:")
         print(f"1. Maximum HP: {max_hp}")
         print(f"2. Average HP: {avg_hp}")
         print(f"3. Roll for HP (random)")
+        if character.level > 1:
+            print(f"   Rolled HP percentiles - {odds_summary}")
         print(f"4. Enter custom HP")
         
         while True:
@@ -1571,106 +2688,34 @@ class CharacterMakerCLI:
         
         if character.level > 1:
             print(f"\nRolling HP for levels 2-{character.level}:")
-            for level in range(2, character.level + 1):
-                roll = random.randint(1, hit_die)
-                level_hp = roll + con_mod
+            gains = self.dice.roll_hit_points(character.level, hit_die, con_mod)
+            for level, level_hp in enumerate(gains, 2):
                 total_hp += level_hp
-                print(f"  Level {level}: d{hit_die} = {roll} + {con_mod} = {level_hp}")
+                print(f"  Level {level}: d{hit_die} = {level_hp - con_mod} + {con_mod} = {level_hp}")
         
         return total_hp
     
     def apply_class_benefits(self, character: Character):
         """Apply class-specific benefits and features."""
-        class_name = character.character_class
-        level = character.level
-        
-        # Add basic class features
-        features = []
-        
-        # Universal features
-        if class_name == "Barbarian":
-            features.extend(["Rage", "Unarmored Defense"])
-            if level >= 2:
-                features.append("Reckless Attack")
-                features.append("Danger Sense")
-        elif class_name == "Bard":
-            features.extend(["Bardic Inspiration", "Spellcasting"])
-            if level >= 2:
-                features.append("Jack of All Trades")
-                features.append("Song of Rest")
-        elif class_name == "Cleric":
-            features.extend(["Spellcasting", "Divine Domain"])
-            if level >= 2:
-                features.append("Channel Divinity")
-        elif class_name == "Druid":
-            features.extend(["Druidcraft", "Spellcasting"])
-            if level >= 2:
-                features.append("Wild Shape")
-                features.append("Druid Circle")
-        elif class_name == "Fighter":
-            features.extend(["Fighting Style", "Second Wind"])
-            if level >= 2:
-                features.append("Action Surge")
-        elif class_name == "Monk":
-            features.extend(["Unarmored Defense", "Martial Arts"])
-            if level >= 2:
-                features.append("Ki")
-                features.append("Unarmored Movement")
-        elif class_name == "Paladin":
-            features.extend(["Divine Sense", "Lay on Hands"])
-            if level >= 2:
-                features.append("Fighting Style")
-                features.append("Spellcasting")
-                features.append("Divine Smite")
-        elif class_name == "Ranger":
-            features.extend(["Favored Enemy", "Natural Explorer"])
-            if level >= 2:
-                features.append("Fighting Style")
-                features.append("Spellcasting")
-        elif class_name == "Rogue":
-            features.extend(["Expertise", "Sneak Attack", "Thieves' Cant"])
-            if level >= 2:
-                features.append("Cunning Action")
-        elif class_name == "Sorcerer":
-            features.extend(["Spellcasting", "Sorcerous Origin"])
-            if level >= 2:
-                features.append("Font of Magic")
-        elif class_name == "Warlock":
-            features.extend(["Otherworldly Patron", "Pact Magic"])
-            if level >= 2:
-                features.append("Eldritch Invocations")
-        elif class_name == "Wizard":
-            features.extend(["Spellcasting", "Arcane Recovery"])
-            if level >= 2:
-                features.append("Arcane Tradition")
-        elif class_name == "Artificer":
-            features.extend(["Magical Tinkering", "Spellcasting"])
-            if level >= 2:
-                features.append("Infuse Item")
-        
-        # Add subclass feature
-        features.append(f"{character.subclass} features")
-        
-        # Add to character (avoid duplicates)
-        for feature in features:
-            if feature not in character.features_and_traits:
-                character.features_and_traits.append(feature)
+        features = character.apply_class_progression()
         
-        print(f"\nApplied {class_name} features:")
+        print(f"\nApplied {character.character_class} features:")
         for feature in features:
             print(f"  • {feature}")
     
     def is_spellcaster_class(self, class_name: str) -> bool:
         """Check if a class is a spellcaster."""
-        spellcaster_classes = [
-            "Artificer", "Bard", "Cleric", "Druid", "Paladin", 
-            "Ranger", "Sorcerer", "Warlock", "Wizard"
-        ]
-        return class_name in spellcaster_classes
+        return class_name in SPELLCASTING_PROGRESSION
 
 
 def main():
-    """Main entry point."""
+    """Main entry point: the interactive menu, or a scripted command when arguments are given."""
+    argv = instrumentation.setup(sys.argv[1:], {CharacterManager: "op", CharacterMakerCLI: "menu"})
+    if argv:
+        from character_commands import CharacterManager as ScriptManager, main as run_command
+        # Run as a script this module is __main__, and the commands use their own import of it
+        instrumentation.instrument({ScriptManager: "op"})
+        sys.exit(run_command(argv))
     cli = CharacterMakerCLI()
     cli.main_menu()
 
@@ -0,0 +1,388 @@
+"""
+D&D 5E Character Server
+Local asyncio service sharing one in-memory roster between player devices and the DM screen.
+"""
+
+import asyncio
+import ipaddress
+import json
+import os
+import signal
+import socket
+import stat
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+from character_commands import OPERATIONS, CommandError
+from character_maker import CharacterManager
+from dice import DiceRoller
+from roster_sync import normalize_record
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 7420
+
+# Commands clients may run; ones that write files or start worker processes stay on the command line
+SERVER_OPERATIONS = ("create", "get", "patch", "level-up", "damage", "heal", "rest", "delete", "history")
+
+# Seconds between the first unsaved change and the save that writes it (and any after it)
+SAVE_DELAY = 1.0
+
+# Longest request line, and the most unsent output a client may fall behind by before it is dropped
+MAX_REQUEST = 1024 * 1024
+MAX_BACKLOG = 4 * 1024 * 1024
+
+
+class _Client:
+    """One connection and the characters it watches."""
+
+    def __init__(self, writer: asyncio.StreamWriter):
+        self.writer = writer
+        self.task = asyncio.current_task()
+        self.watch_all = False
+        self.watching = set()
+
+    def watches(self, name: str) -> bool:
+        return self.watch_all or name in self.watching
+
+    def send(self, message: Dict[str, Any]) -> bool:
+        """Queue a message without waiting; False (and the connection closed) if the client fell too far behind."""
+        if self.writer.is_closing():
+            return False
+        self.writer.write(json.dumps(message, separators=(",", ":")).encode("utf-8") + b"\n")
+        if self.writer.transport.get_write_buffer_size() > MAX_BACKLOG:
+            self.writer.close()
+            return False
+        return True
+
+
+def _check_loopback(host: str):
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        address = ipaddress.ip_address(socket.gethostbyname(host))
+    if not address.is_loopback:
+        raise ValueError(f"{host} is not a loopback address; the character server has no authentication")
+
+
+def _remove_stale_socket(path: str):
+    """Remove a socket file left by a server that did not shut down, refusing to touch anything else."""
+    try:
+        mode = os.stat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise OSError(f"{path} exists and is not a socket")
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except (ConnectionRefusedError, FileNotFoundError):
+        os.unlink(path)
+    else:
+        raise OSError(f"Another server is already listening on {path}")
+    finally:
+        probe.close()
+
+
+class CharacterServer:
+    """Serves one CharacterManager to many clients as newline-delimited JSON.
+
+    Each request is a JSON object with an "op" and an optional "id" echoed in
+    the reply. Ops are the roster commands in SERVER_OPERATIONS (same fields
+    as a batch file) plus "list" (versions by name), "subscribe" and
+    "unsubscribe" ("names", or every character when omitted).
+
+    Changing requests may give the "version" of their "name" (or "versions"
+    by name); if a character has changed since, nothing is applied and the
+    reply lists the current versions. Every change bumps the character's
+    version and is pushed to the other subscribers as just the changed fields.
+    Saves are batched: one runs save_delay seconds after the first unsaved
+    change. The roster is copied on the event loop and written on a worker
+    thread, so requests carry on meanwhile; characters they change keep their
+    new values and go in the next save, which waits for this one to finish.
+    """
+
+    def __init__(self, manager: CharacterManager, roller: Optional[DiceRoller] = None,
+                 save_delay: float = SAVE_DELAY):
+        self.manager = manager
+        self.roller = roller or DiceRoller()
+        self.save_delay = save_delay
+        self.clients = set()
+        self.dirty = False
+        self.address: Any = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._socket_path: Optional[str] = None
+        self._save_handle: Optional[asyncio.TimerHandle] = None
+        self._save_task: Optional[asyncio.Task] = None
+        self._save_lock: Optional[asyncio.Lock] = None
+        # Characters changed while a save is being written, or None when no save is
+        self._changed_while_saving: Optional[set] = None
+
+    async def start(self, path: Optional[str] = None, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT):
+        """Listen on a Unix socket at path, or on a loopback TCP host and port (0 picks a free port)."""
+        if path:
+            if not hasattr(socket, "AF_UNIX"):
+                raise OSError("Unix sockets are not available here; use a TCP port instead")
+            _remove_stale_socket(path)
+            self._server = await asyncio.start_unix_server(self._handle_client, path, limit=MAX_REQUEST)
+            self._socket_path = self.address = path
+        else:
+            _check_loopback(host)
+            self._server = await asyncio.start_server(self._handle_client, host, port, limit=MAX_REQUEST)
+            self.address = self._server.sockets[0].getsockname()[:2]
+
+    async def serve_forever(self):
+        await self._server.serve_forever()
+
+    async def close(self):
+        """Stop listening, disconnect clients and save anything unsaved."""
+        if self._server is not None:
+            self._server.close()
+            for client in list(self.clients):
+                client.writer.close()
+            # Let each connection see its end rather than be cancelled mid-read
+            tasks = [client.task for client in self.clients if client.task is not None]
+            if tasks:
+                await asyncio.wait(tasks, timeout=1.0)
+            await self._server.wait_closed()
+            self._server = None
+        if self._socket_path and os.path.exists(self._socket_path):
+            os.unlink(self._socket_path)
+        await self.flush()
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        client = _Client(writer)
+        self.clients.add(client)
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    client.send({"ok": False, "error": f"Request longer than {MAX_REQUEST} bytes"})
+                    break
+                if not line:
+                    break
+                if line.strip():
+                    client.send(self.handle_line(line, client))
+                    await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.clients.discard(client)
+            writer.close()
+
+    def handle_line(self, line: bytes, client: Optional[_Client] = None) -> Dict[str, Any]:
+        """Reply to one request line."""
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            return {"ok": False, "error": f"Invalid JSON: {e}"}
+        if not isinstance(request, dict):
+            return {"ok": False, "error": "A request must be a JSON object"}
+        reply = self.handle_request(request, client)
+        return {"id": request["id"], **reply} if "id" in request else reply
+
+    def handle_request(self, request: Dict[str, Any], client: Optional[_Client] = None) -> Dict[str, Any]:
+        """Apply one request from client (None for the server itself) and build the reply."""
+        op = request.get("op")
+        spec = {key: value for key, value in request.items() if key not in ("op", "id", "version", "versions")}
+        try:
+            if op == "list":
+                return {"ok": True, "result": {name: char.version for name, char in self.manager.characters.items()}}
+            if op in ("subscribe", "unsubscribe"):
+                return self._subscribe(client, spec, op == "subscribe")
+            if op not in SERVER_OPERATIONS:
+                raise CommandError(f"Unknown operation '{op}'")
+            handler, mutates = OPERATIONS[op]
+            if not mutates:
+                return {"ok": True, "result": handler(self.manager, spec, self.roller)}
+
+            stale = {name: self._version(name) for name, version in self._expected_versions(request).items()
+                     if self._version(name) != version}
+            if stale:
+                return {"ok": False, "error": "Changed since the version given; fetch it again", "versions": stale}
+            before = {name: self._record(name) for name in self._affected(spec)}
+            try:
+                result = handler(self.manager, spec, self.roller)
+            finally:
+                # Publish whatever changed, even if the command failed part way through
+                changed = self._commit(before, client, spec.get("rename") if op == "patch" else None)
+            return {"ok": True, "result": result, "versions": changed}
+        except (CommandError, ValueError, TypeError) as e:
+            return {"ok": False, "error": str(e)}
+        except Exception as e:
+            # A bug hit by one odd request must not cost the client its connection
+            print(f"Request {op!r} failed: {type(e).__name__}: {e}", file=sys.stderr)
+            return {"ok": False, "error": f"Internal error: {type(e).__name__}: {e}"}
+
+    def _version(self, name: str) -> Optional[int]:
+        character = self.manager.characters.get(name)
+        return character.version if character else None
+
+    def _record(self, name: str) -> Optional[Dict[str, Any]]:
+        character = self.manager.characters.get(name)
+        return normalize_record(character.to_dict()) if character else None
+
+    @staticmethod
+    def _expected_versions(request: Dict[str, Any]) -> Dict[str, Any]:
+        if "versions" in request:
+            if not isinstance(request["versions"], dict):
+                raise CommandError("versions must be an object of name: version")
+            return request["versions"]
+        if "version" in request:
+            if not request.get("name"):
+                raise CommandError("version needs a single \"name\"; use versions for several")
+            return {request["name"]: request["version"]}
+        return {}
+
+    def _affected(self, spec: Dict[str, Any]) -> List[str]:
+        """Characters a command may change, as named in its spec (all when it names none)."""
+        names = spec.get("names")
+        if names is None:
+            names = [spec["name"]] if spec.get("name") else list(self.manager.characters)
+        names = [name for name in names if isinstance(name, str)] if isinstance(names, list) else []
+        if isinstance(spec.get("rename"), str):
+            names.append(spec["rename"])
+        return names
+
+    def _commit(self, before: Dict[str, Optional[Dict[str, Any]]], origin: Optional[_Client],
+                rename: Optional[str] = None) -> Dict[str, Optional[int]]:
+        """Bump versions of characters that changed, notify watchers and schedule a save."""
+        changed = {}
+        for name, old in before.items():
+            new = self._record(name)
+            if new == old:
+                continue
+            if new is not None:
+                character = self.manager.characters[name]
+                character.version += 1
+                new["version"] = character.version
+            changed[name] = (old, new)
+        if not changed:
+            return {}
+
+        if rename in changed:
+            # Watchers of the old name follow the character to its new one
+            for old_name, (old, new) in changed.items():
+                if new is None:
+                    for client in self.clients:
+                        if old_name in client.watching:
+                            client.watching.add(rename)
+        self._publish(changed, origin)
+        if self._changed_while_saving is not None:
+            self._changed_while_saving.update(changed)
+        self.dirty = True
+        self._schedule_save()
+        return {name: new["version"] if new else None for name, (old, new) in changed.items()}
+
+    def _publish(self, changed: Dict[str, Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]],
+                 origin: Optional[_Client] = None):
+        """Push each change to the clients watching that character, other than the one that made it."""
+        for name, (old, new) in changed.items():
+            if new is None:
+                message = {"event": "deleted", "name": name}
+            elif old is None:
+                message = {"event": "created", "name": name, "version": new["version"], "record": new}
+            else:
+                message = {"event": "changed", "name": name, "version": new["version"],
+                           "changes": {field: value for field, value in new.items()
+                                       if field != "version" and old.get(field) != value}}
+            for client in list(self.clients):
+                if client is not origin and client.watches(name) and not client.send(message):
+                    self.clients.discard(client)
+
+    def _subscribe(self, client: Optional[_Client], spec: Dict[str, Any], subscribe: bool) -> Dict[str, Any]:
+        if client is None:
+            raise CommandError("Only connected clients can subscribe")
+        names = spec.get("names")
+        if names is not None and not (isinstance(names, list) and all(isinstance(name, str) for name in names)):
+            raise CommandError("names must be a list of character names")
+        if not subscribe:
+            if names is None:
+                client.watch_all = False
+                client.watching.clear()
+            else:
+                client.watching.difference_update(names)
+            return {"ok": True, "result": {}}
+
+        if names is None:
+            client.watch_all = True
+            names = list(self.manager.characters)
+        else:
+            missing = [name for name in names if name not in self.manager.characters]
+            if missing:
+                raise CommandError(f"Character(s) not found: {', '.join(missing)}")
+            client.watching.update(names)
+        # Current records, so the client starts from the state the pushed changes apply to
+        return {"ok": True, "result": {name: self._record(name) for name in names}}
+
+    def _schedule_save(self):
+        if self._save_handle is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # Not serving; flush() saves
+        self._save_handle = loop.call_later(self.save_delay, self._start_save)
+
+    def _start_save(self):
+        self._save_handle = None
+        self._save_task = asyncio.get_running_loop().create_task(self.flush())
+
+    async def flush(self) -> bool:
+        """Save now if anything changed, and push edits merged in from other sessions."""
+        if self._save_handle is not None:
+            self._save_handle.cancel()
+            self._save_handle = None
+        if self._save_lock is None:
+            self._save_lock = asyncio.Lock()  # Made here so it belongs to the running loop
+        async with self._save_lock:
+            if not self.dirty:
+                return True
+            before = self.manager.roster_records()
+            self.dirty = False
+            self._changed_while_saving = set()
+            try:
+                saved = await asyncio.get_running_loop().run_in_executor(None, self.manager.write_roster, before)
+            finally:
+                changed, self._changed_while_saving = self._changed_while_saving, None
+            if saved is None:
+                self.dirty = True
+                self._schedule_save()  # Try again after the next delay
+                return False
+            self.manager.apply_saved_roster(saved, keep=changed)
+            after = {name: self._record(name) for name in self.manager.characters if name not in changed}
+            merged = {name: (before.get(name), after.get(name)) for name in set(before) | set(after)
+                      if name not in changed and before.get(name) != after.get(name)}
+            if merged:
+                self._publish(merged)
+            return True
+
+
+def serve(manager: CharacterManager, path: Optional[str] = None, host: str = DEFAULT_HOST,
+          port: Optional[int] = None, roller: Optional[DiceRoller] = None,
+          save_delay: Optional[float] = None) -> int:
+    """Run a server until interrupted (Ctrl+C or SIGTERM), saving on the way out. Returns the exit code."""
+    server = CharacterServer(manager, roller, SAVE_DELAY if save_delay is None else save_delay)
+
+    async def run():
+        await server.start(path, host, DEFAULT_PORT if port is None else port)
+        task = asyncio.current_task()
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, task.cancel)
+        except (NotImplementedError, AttributeError):
+            pass  # Windows
+        print(f"Serving {len(manager.characters)} characters on {server.address} (Ctrl+C to stop)",
+              file=sys.stderr)
+        try:
+            await server.serve_forever()
+        finally:
+            await server.close()
+
+    try:
+        asyncio.run(run())
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
+    except (OSError, ValueError) as e:
+        print(f"Could not start the character server: {e}", file=sys.stderr)
+        return 1
+    return 0
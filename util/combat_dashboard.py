@@ -0,0 +1,392 @@
+"""
+D&D 5E Combat Dashboard
+Full-screen curses view of several characters with single-key commands, redrawing only the rows that change.
+"""
+
+from typing import Callable, List, NamedTuple, Optional, Sequence, Tuple
+
+try:
+    import curses
+except ImportError:  # curses is optional (e.g. Windows without windows-curses)
+    curses = None
+
+from dice import DiceRoller, compile_dice, get_default_roller
+from proficiencies import ABILITIES, SKILLS
+from roster import expand_ability
+
+SLOT_LEVELS = ["1st", "2nd", "3rd", "4th", "5th", "6th", "7th", "8th", "9th"]
+
+HELP = ("q quit | Tab/Up/Down select | d damage  h heal  t temp HP | 1-9 use slot  r recover  R reset | "
+        "c/x add/remove condition | k check")
+
+# Messages kept for the log panel
+LOG_SIZE = 50
+
+# A screen row: (text, style) where style is "normal", "title", "selected", "warning" or "dim"
+Row = Tuple[str, str]
+
+
+class Prompt(NamedTuple):
+    """A question for the user; the answer (possibly empty) is passed to on_answer."""
+    label: str
+    on_answer: Callable[[str], None]
+
+
+class Dashboard:
+    """Dashboard state and commands, independent of the terminal.
+
+    handle_key takes key names ("d", "tab", "up", ...) and may return a Prompt
+    that the view answers; render lays the dashboard out as rows for a given
+    screen size.
+    """
+
+    def __init__(self, characters: Sequence, roller: Optional[DiceRoller] = None,
+                 on_change: Optional[Callable[..., None]] = None):
+        if not characters:
+            raise ValueError("The dashboard needs at least one character")
+        self.characters = list(characters)
+        for char in self.characters:
+            if not hasattr(char, 'conditions'):
+                char.conditions = []
+        self.dice = roller or get_default_roller()
+        self.on_change = on_change
+        self.selected = 0
+        self.log: List[str] = []
+        self.changed = False
+        self.running = True
+
+    @property
+    def current(self):
+        return self.characters[self.selected]
+
+    def _changed(self, char, event_type: str, **details):
+        """Note a change to char, passing it to on_change (e.g. the combat log)."""
+        self.changed = True
+        if self.on_change:
+            self.on_change(char, event_type, **details)
+
+    def message(self, text: str):
+        self.log.append(text)
+        del self.log[:-LOG_SIZE]
+
+    # --- Commands ---------------------------------------------------------
+
+    def handle_key(self, key: str) -> Optional[Prompt]:
+        """Apply a single-key command, returning a Prompt if it needs more input."""
+        char = self.current
+        if key in ("tab", "down"):
+            self.selected = (self.selected + 1) % len(self.characters)
+        elif key in ("backtab", "up"):
+            self.selected = (self.selected - 1) % len(self.characters)
+        elif key == "q":
+            self.running = False
+        elif key == "d":
+            return Prompt(f"Damage to {char.name} (number or dice): ", self._damage)
+        elif key == "h":
+            return Prompt(f"Healing for {char.name} (number or dice): ", self._heal)
+        elif key == "t":
+            return Prompt(f"Temporary HP for {char.name} (number or dice): ", self._temporary_hit_points)
+        elif key.isdigit() and key != "0":
+            self.use_slot(SLOT_LEVELS[int(key) - 1])
+        elif key == "r":
+            return Prompt("Recover slot of level (1-9): ", self._recover_slot)
+        elif key == "R":
+            char.recover_spell_slots()
+            self._changed(char, "slots_reset")
+            self.message(f"{char.name} recovered all spell slots")
+        elif key == "c":
+            return Prompt(f"Condition on {char.name}: ", self._add_condition)
+        elif key == "x" and char.conditions:
+            if len(char.conditions) == 1:
+                self._remove_condition("1")
+            else:
+                return Prompt("Remove condition number: ", self._remove_condition)
+        elif key == "k":
+            return Prompt("Check (skill, ability or '<ability> save'; add adv/dis): ", self._check)
+        return None
+
+    def _amount(self, text: str) -> Optional[int]:
+        text = text.strip()
+        if not text:
+            return None
+        if text.lstrip('-').isdigit():
+            return int(text)
+        try:
+            expression = compile_dice(text)
+        except ValueError as e:
+            self.message(f"Invalid amount: {e}")
+            return None
+        total, details = expression.describe_roll(self.dice)
+        self.message(f"Rolled {expression}: {details} = {total}")
+        return max(0, total)
+
+    def _damage(self, text: str):
+        amount = self._amount(text)
+        if amount is None:
+            return
+        char = self.current
+        lost = char.take_damage(amount)
+        self._changed(char, "damage", amount=amount)
+        self.message(f"{char.name} takes {amount} damage ({lost} HP lost)"
+                     + (" - UNCONSCIOUS" if char.current_hit_points == 0 else ""))
+
+    def _heal(self, text: str):
+        amount = self._amount(text)
+        if amount is None:
+            return
+        char = self.current
+        healed = char.heal(amount)
+        self._changed(char, "heal", amount=amount)
+        self.message(f"{char.name} heals {healed} HP")
+
+    def _temporary_hit_points(self, text: str):
+        amount = self._amount(text)
+        if amount is None:
+            return
+        char = self.current
+        char.add_temporary_hit_points(amount)
+        self._changed(char, "temp_hp", amount=amount)
+        self.message(f"{char.name} has {char.temporary_hit_points} temporary HP")
+
+    def use_slot(self, level: str):
+        char = self.current
+        total = char.spell_slots.get(level, 0)
+        if not total:
+            self.message(f"{char.name} has no {level} level slots")
+        elif char.spell_slots_expended[level] >= total:
+            self.message(f"{char.name} has no {level} level slots remaining")
+        else:
+            char.spell_slots_expended[level] += 1
+            self._changed(char, "slot_used", level=level)
+            self.message(f"{char.name} used a {level} level slot ({total - char.spell_slots_expended[level]} left)")
+
+    def _recover_slot(self, text: str):
+        char = self.current
+        text = text.strip()
+        if not text.isdigit() or not 1 <= int(text) <= 9:
+            return
+        level = SLOT_LEVELS[int(text) - 1]
+        if char.spell_slots_expended.get(level, 0) > 0:
+            char.spell_slots_expended[level] -= 1
+            self._changed(char, "slot_recovered", level=level)
+            self.message(f"{char.name} recovered a {level} level slot")
+        else:
+            self.message(f"{char.name} has no expended {level} level slots")
+
+    def _add_condition(self, text: str):
+        condition = text.strip()
+        if condition:
+            self.current.conditions.append(condition)
+            self._changed(self.current, "condition_added", condition=condition)
+            self.message(f"{self.current.name} is {condition}")
+
+    def _remove_condition(self, text: str):
+        conditions = self.current.conditions
+        text = text.strip()
+        if text.isdigit() and 1 <= int(text) <= len(conditions):
+            removed = conditions.pop(int(text) - 1)
+            self._changed(self.current, "condition_removed", condition=removed)
+            self.message(f"{self.current.name} is no longer {removed}")
+
+    def _check(self, text: str):
+        words = text.strip().lower().split()
+        mode = None
+        for word in ("adv", "dis"):
+            if word in words:
+                words.remove(word)
+                mode = word
+        if not words:
+            return
+        char = self.current
+        save = "save" in words
+        if save:
+            words.remove("save")
+        name = "_".join(words)
+
+        skills = [skill for skill in SKILLS if skill.startswith(name)]
+        ability = expand_ability(name)
+        if save and ability in ABILITIES:
+            label, modifier = f"{ability.capitalize()} save", char.get_saving_throw_modifier(ability)
+        elif not save and ability in ABILITIES and not (len(skills) == 1 and skills[0] == name):
+            label, modifier = f"{ability.capitalize()} check", char.get_ability_modifier(getattr(char, ability))
+        elif not save and len(skills) == 1:
+            label, modifier = skills[0].replace("_", " ").title(), char.get_skill_modifier(skills[0])
+        else:
+            self.message(f"Unknown check '{text.strip()}'" if not skills else
+                         f"Be more specific: {', '.join(skill.replace('_', ' ') for skill in skills)}")
+            return
+
+        dice = {"adv": "2d20kh1", "dis": "2d20kl1"}.get(mode, "1d20")
+        expression = compile_dice(f"{dice}{modifier:+d}" if modifier else dice)
+        total, details = expression.describe_roll(self.dice)
+        self.message(f"{char.name} {label}{' (' + mode + ')' if mode else ''}: {details} = {total}")
+
+    # --- Layout -------------------------------------------------------------
+
+    @staticmethod
+    def _slots(char) -> str:
+        return " ".join(f"{level} {char.spell_slots[level] - char.spell_slots_expended[level]}/{char.spell_slots[level]}"
+                        for level in SLOT_LEVELS if char.spell_slots.get(level))
+
+    def _party_row(self, index: int, char) -> Row:
+        hit_points = f"{char.current_hit_points}/{char.hit_point_maximum}"
+        if char.temporary_hit_points:
+            hit_points += f"+{char.temporary_hit_points}"
+        text = (f"{'>' if index == self.selected else ' '} {char.name[:18]:<18} HP {hit_points:<11} "
+                f"AC {char.armor_class:<3} Init {char.initiative:+d}  {self._slots(char)}")
+        if char.conditions:
+            text += f"  [{', '.join(char.conditions)}]"
+        if index == self.selected:
+            style = "selected"
+        elif char.current_hit_points == 0:
+            style = "warning"
+        else:
+            style = "normal"
+        return text.rstrip(), style
+
+    def _detail_rows(self) -> List[Row]:
+        char = self.current
+        class_info = " ".join(str(part) for part in (char.character_class, char.level) if part)
+        spells = (f" | Spell DC {char.spell_save_dc}  Spell Atk {char.spell_attack_bonus:+d}"
+                  if char.spellcasting_class else "")
+        rows = [(f"{char.name} - {class_info} | Prof +{char.proficiency_bonus}{spells}", "title")]
+
+        left = []
+        for ability in ABILITIES:
+            score = getattr(char, ability)
+            mark = "*" if char.saving_throws[ability] else " "
+            left.append(f"{ability[:3].upper()} {score:>2} {char.get_ability_modifier(score):+d}  "
+                        f"Save {char.get_saving_throw_modifier(ability):+d}{mark}")
+        left.append(f"Passive Perception {10 + char.get_skill_modifier('perception')}")
+
+        skills = [f"{skill.replace('_', ' ').title()[:15]:<15} {char.get_skill_modifier(skill):+d}"
+                  f"{'*' if char.skills[skill] else ' '}" for skill in SKILLS]
+        half = (len(skills) + 1) // 2
+        for i in range(half):
+            first = skills[i]
+            second = skills[i + half] if i + half < len(skills) else ""
+            rows.append((f"{left[i] if i < len(left) else '':<24}  {first:<21}{second}", "normal"))
+
+        rows.append((f"Conditions: {', '.join(f'{i}. {c}' for i, c in enumerate(char.conditions, 1)) or 'none'}",
+                     "warning" if char.conditions else "normal"))
+        return rows
+
+    def render(self, height: int, width: int) -> List[Row]:
+        """Lay out the whole screen as exactly height rows of at most width - 1 characters."""
+        rows: List[Row] = [(f" COMBAT DASHBOARD - {len(self.characters)} character(s)", "title")]
+        rows.extend(self._party_row(i, char) for i, char in enumerate(self.characters))
+        rows.append(("", "normal"))
+        rows.extend(self._detail_rows())
+        rows.append(("-" * (width - 1), "dim"))
+
+        log_space = height - len(rows) - 1
+        if log_space > 0:
+            recent = self.log[-log_space:]
+            rows.extend((line, "normal") for line in recent)
+            rows.extend(("", "normal") for _ in range(log_space - len(recent)))
+        rows = rows[:height - 1]
+        rows.append((HELP, "dim"))
+        return [(text[:width - 1], style) for text, style in rows]
+
+
+# --- Terminal view ----------------------------------------------------------
+
+_KEY_NAMES = {"\t": "tab", "\n": "enter", "\r": "enter", "\x1b": "escape"}
+
+
+class _Screen:
+    """Writes rendered rows to a curses window, touching only rows that changed."""
+
+    def __init__(self, window):
+        self.window = window
+        self.rows: List[Optional[Row]] = []
+        self.styles = {
+            "normal": curses.A_NORMAL,
+            "title": curses.A_BOLD,
+            "selected": curses.A_REVERSE,
+            "warning": curses.A_BOLD,
+            "dim": curses.A_DIM
+        }
+        if curses.has_colors():
+            curses.use_default_colors()
+            curses.init_pair(1, curses.COLOR_RED, -1)
+            self.styles["warning"] = curses.color_pair(1) | curses.A_BOLD
+
+    def invalidate(self):
+        self.rows = []
+
+    def draw(self, rows: List[Row]):
+        if len(self.rows) != len(rows):
+            self.window.erase()
+            self.rows = [None] * len(rows)
+        for y, row in enumerate(rows):
+            if self.rows[y] != row:
+                self.window.move(y, 0)
+                self.window.clrtoeol()
+                self.window.addstr(y, 0, row[0], self.styles[row[1]])
+                self.rows[y] = row
+        self.window.noutrefresh()
+        curses.doupdate()
+
+    def ask(self, label: str) -> str:
+        height, width = self.window.getmaxyx()
+        y = height - 1
+        self.window.move(y, 0)
+        self.window.clrtoeol()
+        self.window.addstr(y, 0, label[:width - 1], curses.A_BOLD)
+        self.rows[y] = None
+        curses.echo()
+        try:
+            curses.curs_set(1)
+        except curses.error:
+            pass
+        try:
+            answer = self.window.getstr(y, min(len(label), width - 2), max(1, width - len(label) - 1))
+        finally:
+            curses.noecho()
+            try:
+                curses.curs_set(0)
+            except curses.error:
+                pass
+        return answer.decode(errors="replace")
+
+
+def _key_name(key) -> str:
+    """Name a key from get_wch: characters as themselves, special keys by name."""
+    if isinstance(key, str):
+        return _KEY_NAMES.get(key, key)
+    return {curses.KEY_UP: "up", curses.KEY_DOWN: "down", curses.KEY_BTAB: "backtab",
+            curses.KEY_RESIZE: "resize"}.get(key, "")
+
+
+def _run(window, dashboard: Dashboard):
+    try:
+        curses.curs_set(0)
+    except curses.error:
+        pass
+    screen = _Screen(window)
+    while dashboard.running:
+        height, width = window.getmaxyx()
+        screen.draw(dashboard.render(height, width))
+        key = _key_name(window.get_wch())
+        if key == "resize":
+            screen.invalidate()
+            continue
+        prompt = dashboard.handle_key(key)
+        if prompt:
+            prompt.on_answer(screen.ask(prompt.label))
+
+
+def run_dashboard(characters: Sequence, roller: Optional[DiceRoller] = None,
+                  on_change: Optional[Callable[..., None]] = None) -> bool:
+    """Run the full-screen dashboard until q is pressed. Returns True if anything changed.
+
+    on_change(character, event_type, **details) is called after each change.
+
+    Raises RuntimeError when curses is not available.
+    """
+    if curses is None:
+        raise RuntimeError("The dashboard needs the curses module (on Windows: pip install windows-curses)")
+    dashboard = Dashboard(characters, roller, on_change)
+    curses.wrapper(_run, dashboard)
+    return dashboard.changed
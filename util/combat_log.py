@@ -0,0 +1,263 @@
+"""
+D&D 5E Combat Log
+Append-only, fsynced event log of in-combat changes, replayed on load and checkpointed by full saves.
+"""
+
+import json
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Mapping, Optional
+
+from roster_sync import FileLock
+
+# Fields every event records the after-value of; replay restores these
+TRACKED_FIELDS = ("current_hit_points", "temporary_hit_points", "spell_slots_expended", "conditions")
+
+# Events between automatic snapshots (full saves of the roster)
+SNAPSHOT_INTERVAL = 200
+
+# Log size at which a snapshot starts a new file, keeping the old one as the archive (<log>.1)
+ROTATE_SIZE = 4 * 1024 * 1024
+
+_SNAPSHOT_PREFIX = b'{"snapshot":'
+_READ_BLOCK = 64 * 1024
+
+_sync = getattr(os, "fdatasync", os.fsync)
+
+
+def event_log_path(data_file: str) -> str:
+    """The log kept next to a roster file: characters.json -> characters.events.jsonl."""
+    base, extension = os.path.splitext(data_file)
+    return f"{base if extension == '.json' else data_file}.events.jsonl"
+
+
+def character_state(character) -> Dict[str, Any]:
+    """The tracked fields of a character, copied."""
+    return {
+        "current_hit_points": character.current_hit_points,
+        "temporary_hit_points": character.temporary_hit_points,
+        "spell_slots_expended": dict(character.spell_slots_expended),
+        "conditions": list(getattr(character, 'conditions', []))
+    }
+
+
+def apply_state(character, state: Mapping[str, Any]):
+    """Restore tracked fields from an event's state."""
+    for field in TRACKED_FIELDS:
+        if field in state:
+            value = state[field]
+            setattr(character, field, dict(value) if isinstance(value, dict) else
+                    list(value) if isinstance(value, list) else value)
+
+
+def latest_states(events: List[Dict[str, Any]], records: Mapping[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """The last logged state per character, from events made against each record's current version.
+
+    records maps names to characters or their saved dictionaries. Events
+    written against another version came from a session that loaded an older
+    copy; its save merges those changes instead.
+    """
+    latest = {}
+    for event in events:
+        record = records.get(event.get("character"))
+        if record is None:
+            continue
+        version = record.get("version", 0) if isinstance(record, dict) else getattr(record, "version", 0)
+        if event.get("version", 0) == version:
+            latest[event["character"]] = event["state"]
+    return latest
+
+
+class CombatLog:
+    """One JSON object per line: events, and snapshot markers written after each full save.
+
+    Every event stores the character's tracked fields after the change, so
+    replaying is idempotent: a crash between a save and its snapshot marker
+    only replays values the save already holds. Events before the last marker
+    are history; the file is only read from the end on load. With lock_path,
+    appends take the roster's shared lock so they never interleave with a save.
+    Once the log reaches rotate_size, the next snapshot moves it to the archive
+    (replacing the previous one) and starts a new file, so history stays bounded.
+    """
+
+    def __init__(self, path: str, sync: bool = True, lock_path: Optional[str] = None,
+                 rotate_size: int = ROTATE_SIZE):
+        self.path = path
+        self.archive_path = f"{path}.1"
+        self.sync = sync
+        self.lock_path = lock_path
+        self.rotate_size = rotate_size
+        self.since_snapshot = 0
+        self._file = None
+        self._seq: Optional[int] = None
+
+    def _read_tail(self) -> List[bytes]:
+        """Lines after the last snapshot marker (the marker included), reading backwards."""
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            position = f.tell()
+            buffer = b""
+            while position > 0:
+                step = min(_READ_BLOCK, position)
+                position -= step
+                f.seek(position)
+                buffer = f.read(step) + buffer
+                start = buffer.rfind(b"\n" + _SNAPSHOT_PREFIX)
+                if start >= 0:
+                    return buffer[start + 1:].splitlines()
+            return buffer.splitlines()
+
+    @staticmethod
+    def _parse(lines: List[bytes]) -> List[Dict[str, Any]]:
+        records = []
+        for line in lines:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue  # Torn write from a crash
+        return records
+
+    def pending(self) -> List[Dict[str, Any]]:
+        """Events written since the last snapshot, oldest first."""
+        records = self._parse(self._read_tail())
+        if self._seq is None:
+            self._seq = max((record.get("seq", record.get("snapshot", 0)) for record in records), default=0)
+        events = [record for record in records if "snapshot" not in record]
+        self.since_snapshot = len(events)
+        return events
+
+    def replay(self, characters: Mapping[str, Any]) -> int:
+        """Apply events since the last snapshot to loaded characters. Returns how many applied."""
+        latest = latest_states(self.pending(), characters)
+        for name, state in latest.items():
+            apply_state(characters[name], state)
+        return len(latest)
+
+    def _open(self):
+        if self._file is None:
+            if self._seq is None:
+                self.pending()
+            if os.path.exists(self.path) and os.path.getsize(self.path):
+                with open(self.path, 'rb+') as f:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        # Drop a torn final line so new records start cleanly
+                        f.seek(0)
+                        f.truncate(f.read().rfind(b"\n") + 1)
+            self._file = open(self.path, 'ab')
+        return self._file
+
+    def _write(self, record: Dict[str, Any]):
+        f = self._open()
+        f.write(json.dumps(record, separators=(",", ":")).encode("utf-8") + b"\n")
+        f.flush()
+        if self.sync:
+            _sync(f.fileno())
+
+    def _reopen_if_rotated(self):
+        """Close the file if another session rotated the log, so the next write goes to the new one."""
+        if self._file is None:
+            return
+        try:
+            current = os.stat(self.path).st_ino
+        except FileNotFoundError:
+            current = None
+        if current != os.fstat(self._file.fileno()).st_ino:
+            self.close()
+
+    def _rotate(self, marker: Dict[str, Any]) -> bool:
+        """Archive the log and start a new one holding just marker. False if the files could not be swapped."""
+        temp_file = f"{self.path}.tmp"
+        try:
+            with open(temp_file, 'wb') as f:
+                f.write(json.dumps(marker, separators=(",", ":")).encode("utf-8") + b"\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self.close()
+            os.replace(self.path, self.archive_path)
+            os.replace(temp_file, self.path)
+        except OSError:
+            # Another session may hold the log open where that blocks renames (Windows); try next time
+            if os.path.exists(temp_file):
+                os.unlink(temp_file)
+            return False
+        return True
+
+    def append(self, character, event_type: str, **details) -> Dict[str, Any]:
+        """Record a change already made to character and make it durable."""
+        self._open()
+        self._seq += 1
+        event = {"seq": self._seq,
+                 "time": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                 "character": character.name, "version": getattr(character, "version", 0),
+                 "type": event_type}
+        event.update((key, value) for key, value in details.items() if value is not None)
+        event["state"] = character_state(character)
+        if self.lock_path:
+            with FileLock(self.lock_path, shared=True):
+                self._reopen_if_rotated()
+                self._write(event)
+        else:
+            self._reopen_if_rotated()
+            self._write(event)
+        self.since_snapshot += 1
+        return event
+
+    def mark_snapshot(self):
+        """Note that the roster file now holds every event so far, rotating the log if it has grown large.
+
+        Call with the roster's exclusive lock already held (as saves do).
+        """
+        if self._file is None and not os.path.exists(self.path):
+            return
+        self._reopen_if_rotated()
+        f = self._open()
+        marker = {"snapshot": self._seq, "time": datetime.now(timezone.utc).isoformat(timespec="seconds")}
+        if os.fstat(f.fileno()).st_size < self.rotate_size or not self._rotate(marker):
+            self._write(marker)
+        self.since_snapshot = 0
+
+    def history(self, character: Optional[str] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Past events, oldest first, optionally for one character and only the last limit."""
+        events = [event for event in self.read() if character is None or event.get("character") == character]
+        return events[-limit:] if limit else events
+
+    def read(self) -> Iterator[Dict[str, Any]]:
+        """Every event in the archive and the log, oldest first."""
+        for path in (self.archive_path, self.path):
+            if not os.path.exists(path):
+                continue
+            with open(path, 'rb') as f:
+                for line in f:
+                    if not line.startswith(_SNAPSHOT_PREFIX):
+                        yield from self._parse([line])
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def describe_event(event: Mapping[str, Any]) -> str:
+    """One-line description of an event for history listings."""
+    state = event.get("state", {})
+    when = f"Round {event['round']}" if "round" in event else event.get("time", "")[11:19]
+    kind = event.get("type", "")
+    detail = {
+        "damage": f"took {event.get('amount')} damage",
+        "heal": f"healed {event.get('amount')}",
+        "temp_hp": f"gained {event.get('amount')} temporary HP",
+        "temp_hp_removed": "lost temporary HP",
+        "set_hp": "HP set",
+        "slot_used": f"used a {event.get('level')} level slot",
+        "slot_recovered": f"recovered a {event.get('level')} level slot",
+        "slots_reset": "recovered all spell slots",
+        "condition_added": f"gained condition {event.get('condition')}",
+        "condition_removed": f"lost condition {event.get('condition')}",
+        "conditions_cleared": "cleared all conditions"
+    }.get(kind, kind)
+    return (f"{when:>8}  {event.get('character')} {detail} "
+            f"(HP {state.get('current_hit_points')}"
+            f"{'+' + str(state['temporary_hit_points']) if state.get('temporary_hit_points') else ''})")
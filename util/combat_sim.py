@@ -0,0 +1,279 @@
+"""
+D&D 5E Combat Simulator
+Monte Carlo party-vs-monster encounters built on character stats.
+
+Encounters run as one vectorized batch when NumPy is installed (otherwise one
+encounter at a time), and party sweeps fan out across a process pool.
+"""
+
+import os
+from dataclasses import dataclass, asdict
+from itertools import combinations
+from typing import Any, Dict, List, Optional, Sequence
+
+from dice import DiceRoller, compile_dice, numpy_module
+
+DEFAULT_MAX_ROUNDS = 50
+
+
+@dataclass
+class Combatant:
+    """A party member's combat profile."""
+    name: str
+    armor_class: int
+    hit_points: int
+    attack_bonus: int
+    damage: str = "1d8"
+    attacks: int = 1
+
+    @classmethod
+    def from_character(cls, character, damage: Optional[str] = None) -> 'Combatant':
+        """Build a combat profile from a Character.
+
+        Uses the better of a weapon attack (proficiency + STR/DEX) and a spell
+        attack; weapon damage defaults to 1d8 + ability modifier and spell damage
+        to a d10 cantrip that scales at levels 5, 11 and 17.
+        """
+        ability_mod = max(character.get_ability_modifier(character.strength),
+                          character.get_ability_modifier(character.dexterity))
+        weapon_bonus = character.proficiency_bonus + ability_mod
+        spell_bonus = character.spell_attack_bonus if character.spellcasting_ability else None
+        features = getattr(character, 'features_and_traits', [])
+        level = getattr(character, 'level', 1)
+
+        if spell_bonus is not None and spell_bonus > weapon_bonus:
+            attack_bonus = spell_bonus
+            cantrip_dice = 1 + (level >= 5) + (level >= 11) + (level >= 17)
+            default_damage = f"{cantrip_dice}d10"
+            attacks = 1
+        else:
+            attack_bonus = weapon_bonus
+            default_damage = f"1d8{ability_mod:+d}" if ability_mod else "1d8"
+            attacks = 1 + sum(feature in features for feature in
+                              ("Extra Attack", "Extra Attack (2)", "Extra Attack (3)"))
+
+        return cls(
+            name=character.name,
+            armor_class=character.armor_class,
+            hit_points=character.current_hit_points,
+            attack_bonus=attack_bonus,
+            damage=damage or default_damage,
+            attacks=attacks
+        )
+
+
+@dataclass
+class Monster:
+    """A monster stat block for simulation."""
+    name: str
+    armor_class: int
+    hit_points: int
+    attack_bonus: int
+    damage: str
+    attacks: int = 1
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Monster':
+        """Create monster from a stat block dictionary."""
+        return cls(**data)
+
+
+@dataclass
+class SimulationResult:
+    """Aggregate outcome of a batch of encounters."""
+    encounters: int
+    wins: int
+    losses: int
+    draws: int
+    total_rounds: int
+    winning_rounds: int
+    party_downed: int
+
+    @property
+    def win_rate(self) -> float:
+        return self.wins / self.encounters if self.encounters else 0.0
+
+    @property
+    def expected_rounds(self) -> float:
+        return self.total_rounds / self.encounters if self.encounters else 0.0
+
+    @property
+    def expected_rounds_to_win(self) -> float:
+        return self.winning_rounds / self.wins if self.wins else 0.0
+
+    @property
+    def average_party_downed(self) -> float:
+        return self.party_downed / self.encounters if self.encounters else 0.0
+
+    def merge(self, other: 'SimulationResult') -> 'SimulationResult':
+        """Combine results from two batches."""
+        return SimulationResult(*(a + b for a, b in zip(asdict(self).values(), asdict(other).values())))
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data.update(win_rate=self.win_rate, expected_rounds=self.expected_rounds,
+                    expected_rounds_to_win=self.expected_rounds_to_win,
+                    average_party_downed=self.average_party_downed)
+        return data
+
+
+def _attack_batch(roller: DiceRoller, count: int, attack_bonus: int, armor_class, damage: str):
+    """Resolve count attacks at once: natural 20s crit (dice twice), natural 1s miss."""
+    np = numpy_module()
+    expression = compile_dice(damage)
+    d20 = roller.rng.integers(1, 21, size=count)
+    hits = (d20 == 20) | ((d20 != 1) & (d20 + attack_bonus >= armor_class))
+    crit_dice = expression.roll_batch(count, roller) - expression.constant
+    totals = expression.roll_batch(count, roller) + np.where(d20 == 20, crit_dice, 0)
+    return np.where(hits, np.maximum(totals, 0), 0)
+
+
+def _attack_once(roller: DiceRoller, attack_bonus: int, armor_class: int, damage: str) -> int:
+    expression = compile_dice(damage)
+    d20 = roller.rng.randint(1, 20)
+    if d20 == 1 or (d20 != 20 and d20 + attack_bonus < armor_class):
+        return 0
+    total = expression.roll(roller)
+    if d20 == 20:
+        total += expression.roll(roller) - expression.constant
+    return max(total, 0)
+
+
+def _simulate_vectorized(party: Sequence[Combatant], monster: Monster, encounters: int,
+                         roller: DiceRoller, max_rounds: int) -> SimulationResult:
+    np = numpy_module()
+    rng = roller.rng
+    size = len(party)
+    rows = np.arange(encounters)
+    party_hp = np.tile(np.array([member.hit_points for member in party], dtype=np.int64), (encounters, 1))
+    party_ac = np.array([member.armor_class for member in party], dtype=np.int64)
+    monster_hp = np.full(encounters, monster.hit_points, dtype=np.int64)
+    rounds = np.zeros(encounters, dtype=np.int64)
+    outcome = np.zeros(encounters, dtype=np.int8)  # 1 win, -1 loss, 0 draw
+    finished = np.zeros(encounters, dtype=bool)
+
+    for round_number in range(1, max_rounds + 1):
+        active = ~finished
+        if not active.any():
+            break
+        rounds[active] = round_number
+
+        for index, member in enumerate(party):
+            attacking = active & (party_hp[:, index] > 0)
+            for _ in range(member.attacks):
+                damage = _attack_batch(roller, encounters, member.attack_bonus,
+                                       monster.armor_class, member.damage)
+                monster_hp -= np.where(attacking, damage, 0)
+
+        won = active & (monster_hp <= 0)
+        outcome[won] = 1
+        finished |= won
+        active = ~finished
+
+        for _ in range(monster.attacks):
+            alive = party_hp > 0
+            # Random living target per encounter
+            target = np.argmax(rng.random((encounters, size)) * alive, axis=1)
+            damage = _attack_batch(roller, encounters, monster.attack_bonus, party_ac[target], monster.damage)
+            party_hp[rows, target] -= np.where(active & alive.any(axis=1), damage, 0)
+
+        lost = active & ~(party_hp > 0).any(axis=1)
+        outcome[lost] = -1
+        finished |= lost
+
+    return SimulationResult(
+        encounters=encounters,
+        wins=int((outcome == 1).sum()),
+        losses=int((outcome == -1).sum()),
+        draws=int((outcome == 0).sum()),
+        total_rounds=int(rounds.sum()),
+        winning_rounds=int(rounds[outcome == 1].sum()),
+        party_downed=int((party_hp <= 0).sum())
+    )
+
+
+def _simulate_loop(party: Sequence[Combatant], monster: Monster, encounters: int,
+                   roller: DiceRoller, max_rounds: int) -> SimulationResult:
+    choice = roller.rng.choice
+    result = SimulationResult(encounters, 0, 0, 0, 0, 0, 0)
+
+    for _ in range(encounters):
+        party_hp = [member.hit_points for member in party]
+        monster_hp = monster.hit_points
+        outcome = 0
+        rounds = 0
+
+        for round_number in range(1, max_rounds + 1):
+            rounds = round_number
+            for index, member in enumerate(party):
+                if party_hp[index] > 0:
+                    for _ in range(member.attacks):
+                        monster_hp -= _attack_once(roller, member.attack_bonus,
+                                                   monster.armor_class, member.damage)
+            if monster_hp <= 0:
+                outcome = 1
+                break
+
+            for _ in range(monster.attacks):
+                alive = [index for index, hp in enumerate(party_hp) if hp > 0]
+                if not alive:
+                    break
+                target = choice(alive)
+                party_hp[target] -= _attack_once(roller, monster.attack_bonus,
+                                                 party[target].armor_class, monster.damage)
+            if all(hp <= 0 for hp in party_hp):
+                outcome = -1
+                break
+
+        result.wins += outcome == 1
+        result.losses += outcome == -1
+        result.draws += outcome == 0
+        result.total_rounds += rounds
+        result.winning_rounds += rounds if outcome == 1 else 0
+        result.party_downed += sum(hp <= 0 for hp in party_hp)
+    return result
+
+
+def simulate_encounters(party: Sequence[Combatant], monster: Monster, encounters: int = 10000,
+                        seed: Optional[int] = None, max_rounds: int = DEFAULT_MAX_ROUNDS,
+                        use_numpy: Optional[bool] = None) -> SimulationResult:
+    """Run many independent encounters of the party against one monster."""
+    if not party:
+        raise ValueError("Party must have at least one combatant")
+    roller = DiceRoller(seed, use_numpy=use_numpy)
+    if roller.use_numpy:
+        return _simulate_vectorized(party, monster, encounters, roller, max_rounds)
+    return _simulate_loop(party, monster, encounters, roller, max_rounds)
+
+
+def _simulate_job(job) -> SimulationResult:
+    """Process pool entry point."""
+    party, monster, encounters, seed, max_rounds = job
+    return simulate_encounters(party, monster, encounters, seed, max_rounds)
+
+
+def simulate_sweep(parties: Dict[str, Sequence[Combatant]], monster: Monster, encounters: int = 10000,
+                   seed: Optional[int] = None, max_rounds: int = DEFAULT_MAX_ROUNDS,
+                   workers: Optional[int] = None) -> Dict[str, SimulationResult]:
+    """Simulate several party configurations against one monster across a process pool.
+
+    Each configuration gets its own seed derived from seed, so results do not
+    depend on the number of workers.
+    """
+    names = list(parties)
+    jobs = [(list(parties[name]), monster, encounters, job_seed, max_rounds)
+            for name, job_seed in zip(names, DiceRoller.spawn_seeds(seed, len(names)))]
+
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(jobs) <= 1:
+        return {name: _simulate_job(job) for name, job in zip(names, jobs)}
+    # Imported here: concurrent.futures pulls in multiprocessing, which is slow to import
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as executor:
+        return dict(zip(names, executor.map(_simulate_job, jobs)))
+
+
+def party_subsets(party: Sequence[Combatant], size: int) -> Dict[str, List[Combatant]]:
+    """Every party of the given size drawn from the roster, keyed by member names."""
+    return {" + ".join(member.name for member in group): list(group)
+            for group in combinations(party, size)}
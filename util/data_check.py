@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+D&D 5E Data Integrity Checks
+Checks every record in roster and inventory files across a process pool, and repairs them by fixing or quarantining bad records.
+
+    python3 data_check.py characters.json character_inventory.json
+    python3 data_check.py characters.json --repair
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from itertools import chain, islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from dnd_inventory import Rarity, item_problems
+from proficiencies import ABILITIES
+from roster_codecs import CodecError, encode, read_file
+from roster_stream import validate_record
+from roster_sync import FileLock, lock_path
+
+DEFAULT_FILES = ("characters.json", "character_inventory.json")
+RARITIES = {rarity.value for rarity in Rarity}
+# Records per task handed to a worker process
+SHARD_SIZE = 1000
+
+
+def quarantine_path(data_file: str) -> str:
+    """Where records removed from a data file go: characters.json -> characters.quarantine.jsonl."""
+    base, extension = os.path.splitext(data_file)
+    return f"{base if extension == '.json' else data_file}.quarantine.jsonl"
+
+
+def _clamp(record: Dict[str, Any], fixes: List[str], field: str, low: int, high: Optional[int] = None,
+           label: Optional[str] = None, container: Optional[Dict[str, Any]] = None):
+    """Pull container[field] (the record's own field by default) into low..high, noting the fix."""
+    container = record if container is None else container
+    value = container.get(field)
+    if type(value) is not int:
+        return
+    fixed = max(low, value if high is None else min(value, high))
+    if fixed != value:
+        fixes.append(f"{label or field} {value} is {'below' if value < low else 'above'} "
+                     f"{low if value < low else high}; set to {fixed}")
+        container[field] = fixed
+
+
+def check_character(key: Any, record: Any) -> Dict[str, Any]:
+    """Check one roster entry against the schema and the rules between its fields.
+
+    Returns errors (the record cannot be used and is quarantined by a repair),
+    fixes (inconsistencies a repair corrects, applied to a copy under
+    "record") and warnings (reported only).
+    """
+    finding: Dict[str, Any] = {"errors": validate_record(record), "fixes": [], "warnings": []}
+    if finding["errors"]:
+        return finding
+    if record.get("hit_point_maximum", 1) < 1:
+        finding["errors"].append(f"hit_point_maximum {record['hit_point_maximum']} is below 1")
+        return finding
+
+    fixed = dict(record)
+    for field in ("spell_slots", "spell_slots_expended"):
+        if field in fixed:
+            fixed[field] = dict(fixed[field])
+    fixes = finding["fixes"]
+    if fixed["name"] != key:
+        fixes.append(f"name {fixed['name']!r} differs from its roster key; renamed to {key!r}")
+        fixed["name"] = key
+    if "hit_point_maximum" in fixed:
+        _clamp(fixed, fixes, "current_hit_points", 0, fixed["hit_point_maximum"])
+    _clamp(fixed, fixes, "temporary_hit_points", 0)
+    if "level" in fixed:
+        _clamp(fixed, fixes, "hit_dice_used", 0, fixed["level"])
+    slots = fixed.get("spell_slots", {})
+    for slot in slots:
+        _clamp(fixed, fixes, slot, 0, label=f"spell_slots.{slot}", container=slots)
+    expended = fixed.get("spell_slots_expended", {})
+    for slot in expended:
+        _clamp(fixed, fixes, slot, 0, slots.get(slot, 0), f"spell_slots_expended.{slot}", expended)
+    if fixes:
+        finding["record"] = fixed
+
+    missing = [field for field in ("level", "hit_point_maximum", "current_hit_points", *ABILITIES) if field not in record]
+    if missing:
+        finding["warnings"].append(f"Missing {', '.join(missing)}; defaults are used")
+    return finding
+
+
+def check_item(key: Any, record: Any) -> Dict[str, Any]:
+    """Check one inventory item; returns errors, fixes and warnings as check_character does."""
+    finding: Dict[str, Any] = {"errors": item_problems(record), "fixes": [], "warnings": []}
+    if finding["errors"]:
+        return finding
+    if record.get("value_gp", 0) < 0:
+        finding["warnings"].append(f"value_gp {record['value_gp']} is negative")
+    if record["rarity"] not in RARITIES:
+        finding["warnings"].append(f"Unknown rarity {record['rarity']!r}")
+    if record.get("attuned") and not record.get("magical"):
+        finding["warnings"].append("Attuned to an item that is not magical")
+    return finding
+
+
+CHECKS: Dict[str, Callable[[Any, Any], Dict[str, Any]]] = {"roster": check_character, "inventory": check_item}
+
+
+def _check_shard(job: Tuple[str, List[Tuple[Any, Any]]]) -> List[Dict[str, Any]]:
+    """Process pool entry point: findings for the records of one shard that have any."""
+    kind, entries = job
+    check = CHECKS[kind]
+    findings = []
+    for key, record in entries:
+        finding = check(key, record)
+        if finding["errors"] or finding["fixes"] or finding["warnings"]:
+            findings.append({"at": key, **finding})
+    return findings
+
+
+def _shards(entries: Iterable[Tuple[Any, Any]], size: int) -> Iterator[List[Tuple[Any, Any]]]:
+    entries = iter(entries)
+    while True:
+        shard = list(islice(entries, size))
+        if not shard:
+            return
+        yield shard
+
+
+def check_records(kind: str, entries: Iterable[Tuple[Any, Any]], workers: Optional[int] = None,
+                  shard_size: int = SHARD_SIZE) -> Iterator[Dict[str, Any]]:
+    """Check (key, record) pairs in shards across worker processes, yielding findings in order."""
+    shards = _shards(entries, shard_size)
+    first = list(islice(shards, 2))
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(first) <= 1:
+        for shard in chain(first, shards):
+            yield from _check_shard((kind, shard))
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # A few shards in flight per worker keeps them busy without copying the whole file at once
+        pending = deque()
+        for shard in chain(first, shards):
+            pending.append(executor.submit(_check_shard, (kind, shard)))
+            if len(pending) >= workers * 2:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+class CheckError(ValueError):
+    """A file whose overall structure is broken, so its records cannot be checked one by one."""
+
+
+def _read(path: str) -> Tuple[str, Any, str]:
+    """Read a data file, returning its kind ("roster" or "inventory"), data and storage format."""
+    data, storage_format = read_file(path)
+    if not isinstance(data, dict):
+        raise CheckError("Neither a roster (characters by name) nor an inventory (character_name and items)")
+    if "character_name" in data or "items" in data:
+        # Inventory keys never name characters, so a broken inventory is not mistaken for a roster
+        if not isinstance(data.get("items"), list):
+            raise CheckError(f"Inventory 'items' is {type(data.get('items')).__name__}, not a list")
+        if not isinstance(data.get("character_name", ""), str):
+            raise CheckError("Inventory 'character_name' is not text")
+        return "inventory", data, storage_format
+    return "roster", data, storage_format
+
+
+def _quarantine(path: str, entries: Sequence[Tuple[Any, Dict[str, Any], Any]]) -> str:
+    """Append removed records, with what was wrong with them, to the data file's quarantine file."""
+    target = quarantine_path(path)
+    stamp = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    with open(target, 'a', encoding='utf-8') as f:
+        for key, finding, record in entries:
+            f.write(json.dumps({"file": path, "at": key, "quarantined": stamp, "errors": finding["errors"],
+                                "record": record}, ensure_ascii=False, default=repr) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    return target
+
+
+def _replace_file(path: str, content: bytes):
+    """Swap new content in through a temporary file, so a crash never leaves half a file."""
+    temp_file = f"{path}.tmp"
+    with open(temp_file, 'wb') as f:
+        f.write(content)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_file, path)
+
+
+def check_file(path: str, repair: bool = False, workers: Optional[int] = None) -> Dict[str, Any]:
+    """Check a roster or inventory file, and with repair rewrite it without its problems.
+
+    A repair applies every fix, moves records with errors to the quarantine
+    file (see quarantine_path) and keeps the file's storage format. Rosters are
+    repaired under the roster lock, so running sessions' saves wait for it.
+    When every record has errors the file is left alone and "refused" says
+    why. Returns the findings and counts, plus what a repair did. Raises
+    CheckError for a file that is not a roster or inventory at all.
+    """
+    with FileLock(lock_path(path)) if repair else contextlib.nullcontext():
+        kind, data, storage_format = _read(path)
+        entries = data.items() if kind == "roster" else enumerate(data["items"])
+        findings = list(check_records(kind, entries, workers))
+        report: Dict[str, Any] = {
+            "file": path, "kind": kind, "format": storage_format,
+            "records": len(data) if kind == "roster" else len(data["items"]),
+            "errors": sum(1 for finding in findings if finding["errors"]),
+            "fixable": sum(1 for finding in findings if finding["fixes"] and not finding["errors"]),
+            "warnings": sum(1 for finding in findings if finding["warnings"]),
+            "findings": [{key: value for key, value in finding.items() if key != "record"} for finding in findings]
+        }
+        if not repair or not (report["errors"] or report["fixable"]):
+            return report
+
+        bad = {finding["at"]: finding for finding in findings if finding["errors"]}
+        if bad and len(bad) == report["records"]:
+            # More likely a file of another kind or layout than one where nothing is salvageable
+            report["refused"] = "every record has errors, so nothing was quarantined or rewritten"
+            return report
+        fixed = {finding["at"]: finding["record"] for finding in findings if "record" in finding}
+        if bad:
+            records = data if kind == "roster" else dict(enumerate(data["items"]))
+            report["quarantine"] = _quarantine(path, [(key, finding, records[key]) for key, finding in bad.items()])
+        if kind == "roster":
+            repaired = {key: fixed.get(key, record) for key, record in data.items() if key not in bad}
+        else:
+            items = [fixed.get(index, item) for index, item in enumerate(data["items"]) if index not in bad]
+            repaired = {**data, "items": items}
+        if kind == "inventory" and storage_format == "json":
+            # Laid out as save_inventory writes it
+            content = json.dumps(repaired, indent=2, ensure_ascii=False).encode("utf-8")
+        else:
+            content = encode(repaired, storage_format)
+        _replace_file(path, content)
+        report.update(quarantined=len(bad), repaired=len(fixed))
+        return report
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    lines = [f"{report['file']} ({report['kind']}, {report['records']} records, {report['format']}): "
+             f"{report['errors']} with errors, {report['fixable']} fixable, {report['warnings']} with warnings"]
+    for finding in report["findings"]:
+        where = repr(finding["at"]) if report["kind"] == "roster" else f"item {finding['at']}"
+        for label, key in (("error", "errors"), ("fixable", "fixes"), ("warning", "warnings")):
+            lines.extend(f"  {where}: {label}: {problem}" for problem in finding[key])
+    if "refused" in report:
+        lines.append(f"  Not repaired: {report['refused']}")
+    if "quarantined" in report:
+        lines.append(f"  Repaired {report['repaired']} record(s) and quarantined {report['quarantined']}"
+                     + (f" to {report['quarantine']}" if report.get("quarantine") else ""))
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Check character rosters and inventories record by record, and repair them.")
+    parser.add_argument("files", nargs="*", help=f"data files (default: {' and '.join(DEFAULT_FILES)} if present)")
+    parser.add_argument("--repair", action="store_true",
+                        help="fix inconsistent records and move broken ones to a .quarantine.jsonl file")
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per CPU)")
+    parser.add_argument("--json", action="store_true", help="print the reports as JSON")
+    args = parser.parse_args(argv)
+
+    files = args.files or [path for path in DEFAULT_FILES if os.path.exists(path)]
+    if not files:
+        parser.error("no data files given or found")
+    reports, failed = [], False
+    for path in files:
+        try:
+            report = check_file(path, args.repair, args.workers)
+        except (OSError, CodecError, CheckError) as e:
+            report = {"file": path, "error": str(e)}
+            failed = True
+        else:
+            # Left over problems fail the check; warnings and repaired files do not
+            failed = failed or ("quarantined" not in report and bool(report["errors"] or report["fixable"]))
+        reports.append(report)
+        if not args.json:
+            print(format_report(report) if "error" not in report else f"{path}: cannot check: {report['error']}")
+    if args.json:
+        json.dump(reports, sys.stdout, indent=2, default=repr)
+        print()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
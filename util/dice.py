@@ -0,0 +1,467 @@
+"""
+D&D 5E Dice Engine
+Batch dice rolling with seedable independent streams, exact roll distributions and
+compiled dice expressions ("8d6+4", "2d20kh1", "4d6dl1").
+
+NumPy is used for batch rolls when it is installed; otherwise everything runs on
+the standard library.
+"""
+
+import hashlib
+import random
+import re
+from functools import lru_cache
+from math import comb, exp, lgamma, log, log1p
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+
+@lru_cache(maxsize=None)
+def numpy_module():
+    """NumPy if it is installed, else None; imported on first use since it dominates start-up time."""
+    try:
+        import numpy
+    except ImportError:  # NumPy is optional
+        return None
+    return numpy
+
+
+IntOrSequence = Union[int, Sequence[int]]
+
+# Guard rails for expressions typed at the prompt
+MAX_DICE_PER_TERM = 1000
+MAX_DIE_SIDES = 1000
+# Rough step count above which a term's exact distribution is refused (a second or so of work)
+MAX_DISTRIBUTION_WORK = 4_000_000
+
+
+def _as_list(value: IntOrSequence, count: int) -> List[int]:
+    """Broadcast a scalar or per-row sequence to a list of length count."""
+    if isinstance(value, int):
+        return [value] * count
+    values = [int(v) for v in value]
+    if len(values) != count:
+        raise ValueError(f"Expected {count} values, got {len(values)}")
+    return values
+
+
+class DiceRoller:
+    """A single, seedable stream of dice rolls."""
+
+    def __init__(self, seed: Optional[int] = None, use_numpy: Optional[bool] = None):
+        np = numpy_module() if use_numpy is not False else None
+        self.use_numpy = np is not None
+        if self.use_numpy:
+            self.rng = np.random.default_rng(seed)
+        else:
+            self.rng = random.Random(seed)
+
+    @classmethod
+    def spawn(cls, seed: Optional[int], count: int,
+              use_numpy: Optional[bool] = None) -> List['DiceRoller']:
+        """Create count independent streams derived deterministically from one seed."""
+        np = numpy_module() if use_numpy is not False else None
+        if np is not None:
+            streams = []
+            for child in np.random.SeedSequence(seed).spawn(count):
+                roller = cls.__new__(cls)
+                roller.use_numpy = True
+                roller.rng = np.random.default_rng(child)
+                streams.append(roller)
+            return streams
+
+        if seed is None:
+            seed = random.SystemRandom().getrandbits(128)
+        return [cls(_derive_seed(seed, index), use_numpy=False) for index in range(count)]
+
+    @classmethod
+    def spawn_seeds(cls, seed: Optional[int], count: int) -> List[int]:
+        """Derive count independent integer seeds from one seed, e.g. for worker processes."""
+        return [int(roller.rng.integers(0, 2 ** 63)) if roller.use_numpy else roller.rng.getrandbits(63)
+                for roller in cls.spawn(seed, count)]
+
+    def roll(self, count: int, sides: int) -> List[int]:
+        """Roll count dice with the given number of sides."""
+        if self.use_numpy:
+            return self.rng.integers(1, sides + 1, size=count).tolist()
+        randint = self.rng.randint
+        return [randint(1, sides) for _ in range(count)]
+
+    def roll_matrix(self, rows: int, cols: int, sides: IntOrSequence):
+        """Roll a rows x cols block of dice; sides may differ per row.
+
+        Returns a NumPy array when NumPy is in use, otherwise a list of lists.
+        """
+        if self.use_numpy:
+            if isinstance(sides, int):
+                high = sides + 1
+            else:
+                np = numpy_module()
+                high = np.asarray(sides, dtype=np.int64).reshape(-1, 1) + 1
+            return self.rng.integers(1, high, size=(rows, cols))
+        randint = self.rng.randint
+        return [[randint(1, row_sides) for _ in range(cols)] for row_sides in _as_list(sides, rows)]
+
+    def roll_hit_points(self, level: int, hit_die: int, con_mod: int) -> List[int]:
+        """Roll hit point gains for levels 2 and up (1st level is always maximum)."""
+        if level <= 1:
+            return []
+        return [roll + con_mod for roll in self.roll(level - 1, hit_die)]
+
+    def roll_hit_points_batch(self, levels: IntOrSequence, hit_dice: IntOrSequence,
+                              con_mods: IntOrSequence, count: Optional[int] = None) -> List[int]:
+        """Roll total hit points for many characters in one batch.
+
+        levels, hit_dice and con_mods are either one value for every character
+        or one value per character; count is needed when all three are scalars.
+        """
+        if count is None:
+            sizes = [len(v) for v in (levels, hit_dice, con_mods) if not isinstance(v, int)]
+            if not sizes:
+                raise ValueError("count is required when every argument is a single value")
+            count = sizes[0]
+        levels = _as_list(levels, count)
+        hit_dice = _as_list(hit_dice, count)
+        con_mods = _as_list(con_mods, count)
+        max_rolls = max(levels, default=1) - 1
+
+        if max_rolls <= 0:
+            return [die + mod for die, mod in zip(hit_dice, con_mods)]
+
+        if self.use_numpy:
+            np = numpy_module()
+            level_arr = np.asarray(levels, dtype=np.int64)
+            die_arr = np.asarray(hit_dice, dtype=np.int64)
+            mod_arr = np.asarray(con_mods, dtype=np.int64)
+            rolls = self.rng.integers(1, die_arr.reshape(-1, 1) + 1, size=(count, max_rolls))
+            # Only the first (level - 1) columns of each row count
+            mask = np.arange(max_rolls) < (level_arr - 1).reshape(-1, 1)
+            totals = die_arr + mod_arr * level_arr + (rolls * mask).sum(axis=1)
+            return totals.tolist()
+
+        randint = self.rng.randint
+        totals = []
+        for level, die, mod in zip(levels, hit_dice, con_mods):
+            total = die + mod
+            for _ in range(level - 1):
+                total += randint(1, die) + mod
+            totals.append(total)
+        return totals
+
+
+def _derive_seed(seed: int, index: int) -> int:
+    """Derive an independent child seed for the standard library generator."""
+    digest = hashlib.sha256(f"{seed}:{index}".encode('ascii')).digest()
+    return int.from_bytes(digest[:16], 'big')
+
+
+def die_distribution(sides: int) -> Dict[int, int]:
+    """Outcome counts for a single die."""
+    return {face: 1 for face in range(1, sides + 1)}
+
+
+def convolve(first: Dict[int, int], second: Dict[int, int]) -> Dict[int, int]:
+    """Combine two independent outcome-count distributions into the distribution of their sum."""
+    result: Dict[int, int] = {}
+    for a, count_a in first.items():
+        for b, count_b in second.items():
+            result[a + b] = result.get(a + b, 0) + count_a * count_b
+    return result
+
+
+def dice_sum_distribution(count: int, sides: int) -> Dict[int, int]:
+    """Exact outcome counts for the sum of count dice (counts are integers, totals sides**count)."""
+    distribution = {0: 1}
+    single = die_distribution(sides)
+    for _ in range(count):
+        distribution = convolve(distribution, single)
+    return distribution
+
+
+def hit_point_distribution(level: int, hit_die: int, con_mod: int) -> Dict[int, float]:
+    """Exact probability of each hit point total when rolling for levels 2 and up."""
+    counts = dice_sum_distribution(max(0, level - 1), hit_die)
+    total = sum(counts.values())
+    base = hit_die + con_mod * level
+    return {base + outcome: count / total for outcome, count in sorted(counts.items())}
+
+
+def distribution_percentiles(distribution: Dict[int, float],
+                             percents: Sequence[float] = (10, 25, 50, 75, 90)) -> Dict[float, int]:
+    """Smallest outcome whose cumulative probability reaches each percent."""
+    outcomes = sorted(distribution)
+    results = {}
+    for percent in percents:
+        target = percent / 100.0
+        cumulative = 0.0
+        value = outcomes[-1]
+        for outcome in outcomes:
+            cumulative += distribution[outcome]
+            if cumulative >= target - 1e-12:
+                value = outcome
+                break
+        results[percent] = value
+    return results
+
+
+def distribution_mean(distribution: Dict[int, float]) -> float:
+    """Expected value of a probability distribution."""
+    return sum(outcome * probability for outcome, probability in distribution.items())
+
+
+def keep_distribution(count: int, sides: int, keep: int, highest: bool = True) -> Dict[int, int]:
+    """Exact outcome counts for the sum of the highest (or lowest) keep of count dice.
+
+    Works through faces from best to worst, tracking how many dice have been
+    assigned and the sum of those kept, so it never enumerates sides**count rolls.
+    """
+    keep = max(0, min(keep, count))
+    faces = range(sides, 0, -1) if highest else range(1, sides + 1)
+    states: Dict[Tuple[int, int], int] = {(0, 0): 1}
+    for face in faces:
+        next_states: Dict[Tuple[int, int], int] = {}
+        for (assigned, total), ways in states.items():
+            remaining = count - assigned
+            open_slots = keep - min(assigned, keep)
+            for showing in range(remaining + 1):
+                key = (assigned + showing, total + min(showing, open_slots) * face)
+                next_states[key] = next_states.get(key, 0) + ways * comb(remaining, showing)
+        states = next_states
+    return {total: ways for (assigned, total), ways in states.items() if assigned == count}
+
+
+def _binomial_pmf(count: int, p: float, log_factorials: Sequence[float]) -> List[float]:
+    """Probability of exactly 0..count successes in count trials of probability p."""
+    if p >= 1:
+        return [0.0] * count + [1.0]
+    log_p, log_q = log(p), log1p(-p)
+    return [exp(log_factorials[count] - log_factorials[j] - log_factorials[count - j]
+                + j * log_p + (count - j) * log_q) for j in range(count + 1)]
+
+
+def keep_mean(count: int, sides: int, keep: int, highest: bool = True) -> float:
+    """Expected sum of the highest (or lowest) keep of count dice, without building the distribution.
+
+    The kept sum is, over each face value v, how many kept dice show v or
+    more; that number follows from how many of all the dice do, which is
+    binomial. Costs sides * count steps however large the distribution is.
+    """
+    keep = max(0, min(keep, count))
+    log_factorials = [lgamma(n + 1) for n in range(count + 1)]
+    total = 0.0
+    for face in range(1, sides + 1):
+        pmf = _binomial_pmf(count, (sides - face + 1) / sides, log_factorials)
+        if highest:
+            total += sum(min(keep, showing) * p for showing, p in enumerate(pmf))
+        else:
+            total += sum(max(0, showing - (count - keep)) * p for showing, p in enumerate(pmf))
+    return total
+
+
+class DiceExpressionError(ValueError):
+    """Raised when a dice expression cannot be parsed."""
+
+
+class DiceTerm(NamedTuple):
+    """One signed term of a dice expression; sides == 0 marks a constant."""
+    sign: int
+    count: int
+    sides: int = 0
+    keep: Optional[int] = None
+    keep_highest: bool = True
+
+    @property
+    def kept(self) -> int:
+        return self.count if self.keep is None else self.keep
+
+    def describe(self) -> str:
+        if not self.sides:
+            return str(self.count)
+        text = f"{self.count}d{self.sides}"
+        if self.keep is not None:
+            text += f"{'kh' if self.keep_highest else 'kl'}{self.keep}"
+        return text
+
+    def counts(self) -> Dict[int, int]:
+        """Exact outcome counts for this term (before the sign is applied).
+
+        Raises DiceExpressionError when the term is too large to work out exactly.
+        """
+        if not self.sides:
+            return {self.count: 1}
+        work = (self.count * self.sides) ** 2 * (1 if self.keep is None else max(1, self.keep)) // 2
+        if work > MAX_DISTRIBUTION_WORK:
+            raise DiceExpressionError(f"{self.describe()} has too many outcomes for an exact distribution")
+        if self.keep is None:
+            return dice_sum_distribution(self.count, self.sides)
+        return keep_distribution(self.count, self.sides, self.keep, self.keep_highest)
+
+
+_TERM_PATTERN = re.compile(
+    r'\s*([+-])?\s*(?:(\d*)d(\d+|%)(?:(kh|kl|dh|dl|k)(\d+))?|(\d+))\s*', re.IGNORECASE)
+
+
+def parse_dice_terms(expression: str) -> Tuple[DiceTerm, ...]:
+    """Parse a dice expression into signed terms.
+
+    Supports NdS, dS, d%, constants, + and -, and keep/drop modifiers:
+    kh/k (keep highest), kl (keep lowest), dh (drop highest), dl (drop lowest).
+    """
+    text = expression.strip()
+    if not text:
+        raise DiceExpressionError("Empty dice expression")
+
+    terms = []
+    position = 0
+    while position < len(text):
+        match = _TERM_PATTERN.match(text, position)
+        if not match or match.end() == position:
+            raise DiceExpressionError(f"Invalid dice expression: {expression!r}")
+        sign_text, count_text, sides_text, modifier, modifier_value, constant = match.groups()
+        if terms and not sign_text:
+            raise DiceExpressionError(f"Missing + or - in dice expression: {expression!r}")
+        sign = -1 if sign_text == '-' else 1
+
+        if constant is not None:
+            terms.append(DiceTerm(sign, int(constant)))
+        else:
+            count = int(count_text) if count_text else 1
+            sides = 100 if sides_text == '%' else int(sides_text)
+            if not 1 <= count <= MAX_DICE_PER_TERM or not 1 <= sides <= MAX_DIE_SIDES:
+                raise DiceExpressionError(f"Dice out of range in {expression!r}")
+
+            keep, keep_highest = None, True
+            if modifier:
+                amount = int(modifier_value)
+                modifier = modifier.lower()
+                if modifier in ('k', 'kh'):
+                    keep = amount
+                elif modifier == 'kl':
+                    keep, keep_highest = amount, False
+                elif modifier == 'dl':
+                    keep = count - amount
+                else:
+                    keep, keep_highest = count - amount, False
+                if not 0 <= keep <= count:
+                    raise DiceExpressionError(f"Cannot keep {keep} of {count} dice in {expression!r}")
+            terms.append(DiceTerm(sign, count, sides, keep, keep_highest))
+        position = match.end()
+    return tuple(terms)
+
+
+class DiceExpression:
+    """A compiled dice expression that can be rolled repeatedly without re-parsing."""
+
+    def __init__(self, expression: str):
+        self.expression = expression.strip()
+        self.terms = parse_dice_terms(expression)
+        self.constant = sum(term.sign * term.count for term in self.terms if not term.sides)
+        self.dice_terms = tuple(term for term in self.terms if term.sides)
+        self.minimum = self.constant + sum(
+            term.kept * (1 if term.sign > 0 else term.sides) * term.sign for term in self.dice_terms)
+        self.maximum = self.constant + sum(
+            term.kept * (term.sides if term.sign > 0 else 1) * term.sign for term in self.dice_terms)
+        self._mean: Optional[float] = None
+
+    def __repr__(self) -> str:
+        return f"DiceExpression({self.expression!r})"
+
+    def __str__(self) -> str:
+        parts = []
+        for term in self.terms:
+            text = term.describe()
+            parts.append(text if not parts and term.sign > 0 else f"{'+' if term.sign > 0 else '-'}{text}")
+        return "".join(parts)
+
+    @property
+    def mean(self) -> float:
+        """Expected value (keep/drop terms use their order statistics, see keep_mean)."""
+        if self._mean is None:
+            total = float(self.constant)
+            for term in self.dice_terms:
+                if term.keep is None:
+                    total += term.sign * term.count * (term.sides + 1) / 2
+                else:
+                    total += term.sign * keep_mean(term.count, term.sides, term.keep, term.keep_highest)
+            self._mean = total
+        return self._mean
+
+    def distribution(self) -> Dict[int, float]:
+        """Exact probability of each total; DiceExpressionError for terms too large (see DiceTerm.counts)."""
+        counts: Dict[int, int] = {self.constant: 1}
+        for term in self.dice_terms:
+            term_counts = {term.sign * value: ways for value, ways in term.counts().items()}
+            counts = convolve(counts, term_counts)
+        outcomes = sum(counts.values())
+        return {total: ways / outcomes for total, ways in sorted(counts.items())}
+
+    def roll_terms(self, roller: Optional[DiceRoller] = None) -> List[Tuple[DiceTerm, List[int], List[int]]]:
+        """Roll every dice term, returning (term, all rolls, indexes of kept rolls)."""
+        roller = roller or get_default_roller()
+        results = []
+        for term in self.dice_terms:
+            rolls = roller.roll(term.count, term.sides)
+            kept = list(range(term.count))
+            if term.keep is not None:
+                ordered = sorted(kept, key=rolls.__getitem__, reverse=term.keep_highest)
+                kept = sorted(ordered[:term.keep])
+            results.append((term, rolls, kept))
+        return results
+
+    def roll(self, roller: Optional[DiceRoller] = None) -> int:
+        """Roll the expression once."""
+        return self.constant + sum(term.sign * sum(rolls[i] for i in kept)
+                                   for term, rolls, kept in self.roll_terms(roller))
+
+    def roll_batch(self, count: int, roller: Optional[DiceRoller] = None):
+        """Roll the expression count times in one batch.
+
+        Returns a NumPy array when the roller uses NumPy, otherwise a list.
+        """
+        roller = roller or get_default_roller()
+        if roller.use_numpy:
+            np = numpy_module()
+            totals = np.full(count, self.constant, dtype=np.int64)
+            for term in self.dice_terms:
+                rolls = roller.rng.integers(1, term.sides + 1, size=(count, term.count))
+                if term.keep is not None:
+                    rolls.sort(axis=1)
+                    rolls = rolls[:, term.count - term.keep:] if term.keep_highest else rolls[:, :term.keep]
+                totals += term.sign * rolls.sum(axis=1)
+            return totals
+        return [self.roll(roller) for _ in range(count)]
+
+    def describe_roll(self, roller: Optional[DiceRoller] = None) -> Tuple[int, str]:
+        """Roll once and describe the dice, e.g. (17, "2d6 [4, 6] +7"); dropped dice show as ~N."""
+        total = self.constant
+        parts = []
+        for term, rolls, kept in self.roll_terms(roller):
+            total += term.sign * sum(rolls[i] for i in kept)
+            sign = "-" if term.sign < 0 else ("+" if parts else "")
+            shown = [str(roll) if i in kept else f"~{roll}" for i, roll in enumerate(rolls)]
+            parts.append(f"{sign}{term.describe()} [{', '.join(shown)}]")
+        if self.constant or not parts:
+            sign = "-" if self.constant < 0 else ("+" if parts else "")
+            parts.append(f"{sign}{abs(self.constant)}")
+        return total, " ".join(parts)
+
+
+@lru_cache(maxsize=1024)
+def compile_dice(expression: str) -> DiceExpression:
+    """Compile a dice expression once; repeated calls return the cached evaluator."""
+    return DiceExpression(expression)
+
+
+def roll_expression(expression: str, roller: Optional[DiceRoller] = None) -> int:
+    """Roll a dice expression (or plain number) once."""
+    return compile_dice(expression).roll(roller)
+
+
+_default_roller: Optional[DiceRoller] = None
+
+
+def get_default_roller() -> DiceRoller:
+    """Shared roller for one-off rolls."""
+    global _default_roller
+    if _default_roller is None:
+        _default_roller = DiceRoller()
+    return _default_roller
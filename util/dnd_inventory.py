@@ -6,11 +6,14 @@ Interactive command-line tool for managing player character inventories.
 
 import json
 import os
-from fractions import Fraction
+import sys
 from typing import List, Dict, Any, Optional
-from dataclasses import dataclass, asdict
+from dataclasses import MISSING, dataclass, asdict, fields
 from enum import Enum
 
+import instrumentation
+from game_data import load_snapshot, store_snapshot
+
 class Rarity(Enum):
     """Standard D&D 5e item rarities"""
     COMMON = "Common"
@@ -56,25 +59,88 @@ class InventoryItem:
         """Create item from dictionary"""
         return cls(**data)
 
+# Saved item fields and their types; a float field also accepts whole numbers
+ITEM_FIELD_TYPES = {field.name: field.type for field in fields(InventoryItem)}
+REQUIRED_ITEM_FIELDS = [field.name for field in fields(InventoryItem) if field.default is MISSING]
+
+def item_problems(data: Any) -> List[str]:
+    """List everything wrong with a saved item record (empty when it is fine)"""
+    if not isinstance(data, dict):
+        return [f"Expected an object, not {type(data).__name__}"]
+    problems = [f"Missing '{name}'" for name in REQUIRED_ITEM_FIELDS if name not in data]
+    for key, value in data.items():
+        expected = ITEM_FIELD_TYPES.get(key)
+        if expected is None:
+            problems.append(f"Unknown field '{key}'")
+        elif type(value) is not expected and not (expected is float and type(value) is int):
+            problems.append(f"'{key}' should be {expected.__name__}, not {type(value).__name__}")
+    if problems:
+        return problems
+    # The same rules InventoryItem enforces when built
+    if not data['name'].strip():
+        problems.append("Item name cannot be empty")
+    if data['weight'] < 0:
+        problems.append("Weight cannot be negative")
+    if data.get('quantity', 1) < 1:
+        problems.append("Quantity must be at least 1")
+    return problems
+
 class InventoryManager:
     """Manages the character's inventory"""
     
-    def __init__(self, filename: str = "character_inventory.json"):
+    def __init__(self, filename: str = "character_inventory.json", lazy: bool = False):
         self.filename = filename
-        self.items: List[InventoryItem] = []
-        self.character_name: str = "Unknown Adventurer"
-        self.load_inventory()
+        # None until the file is read; with lazy=True that waits for the first use of items or the name
+        self._items: Optional[List[InventoryItem]] = None
+        self._character_name: str = "Unknown Adventurer"
+        # Saved items that could not be loaded; saves write them back untouched
+        self.invalid_items: List[Any] = []
+        if not lazy:
+            self.load_inventory()
+    
+    @property
+    def items(self) -> List[InventoryItem]:
+        if self._items is None:
+            self.load_inventory()
+        return self._items
+    
+    @items.setter
+    def items(self, items: List[InventoryItem]) -> None:
+        self._items = items
+    
+    @property
+    def character_name(self) -> str:
+        if self._items is None:
+            self.load_inventory()
+        return self._character_name
+    
+    @character_name.setter
+    def character_name(self, name: str) -> None:
+        self._character_name = name
     
     def load_inventory(self) -> None:
-        """Load inventory from file"""
+        """Load inventory from file (or its snapshot, while the file is unchanged)"""
+        self._items = []
+        self.invalid_items = []
         if os.path.exists(self.filename):
             try:
-                with open(self.filename, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    self.character_name = data.get('character_name', 'Unknown Adventurer')
-                    self.items = [InventoryItem.from_dict(item_data) 
-                                for item_data in data.get('items', [])]
+                if not self._load_snapshot():
+                    with open(self.filename, 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                        self.character_name = data.get('character_name', 'Unknown Adventurer')
+                        items = []
+                        for item_data in data.get('items', []):
+                            try:
+                                items.append(InventoryItem.from_dict(item_data))
+                            except (AttributeError, TypeError, ValueError):
+                                # One bad item should not cost the rest of the inventory
+                                self.invalid_items.append(item_data)
+                        self.items = items
+                    self._store_snapshot()
                 print(f"✓ Loaded inventory for {self.character_name}")
+                if self.invalid_items:
+                    print(f"⚠ Skipped {len(self.invalid_items)} unreadable item(s); they stay in {self.filename} "
+                          f"until `python3 data_check.py {self.filename} --repair` quarantines them.")
             except (json.JSONDecodeError, KeyError, ValueError) as e:
                 print(f"⚠ Error loading inventory: {e}")
                 print("Starting with empty inventory.")
@@ -82,15 +148,48 @@ class InventoryManager:
         else:
             print("No existing inventory file found. Starting fresh!")
     
+    @staticmethod
+    def _snapshot_version() -> tuple:
+        """Snapshots hold item fields as built, so changing the fields invalidates them"""
+        return tuple(field.name for field in fields(InventoryItem))
+    
+    def _load_snapshot(self) -> bool:
+        """Load the inventory from its snapshot if the file has not changed since it was taken"""
+        snapshot = load_snapshot(self.filename, self._snapshot_version())
+        if not (isinstance(snapshot, dict) and isinstance(snapshot.get('character_name'), str)
+                and isinstance(snapshot.get('items'), list)):
+            return False  # None, or a damaged snapshot: parse the file instead
+        items = []
+        for state in snapshot['items']:
+            if not (isinstance(state, dict) and state.keys() == ITEM_FIELD_TYPES.keys()):
+                return False
+            # Field dicts, validated when first built, rather than objects that may belong to __main__
+            item = InventoryItem.__new__(InventoryItem)
+            item.__dict__.update(state)
+            items.append(item)
+        self.character_name = snapshot['character_name']
+        self.items = items
+        return True
+    
+    def _store_snapshot(self) -> None:
+        """Snapshot the inventory as just loaded from, or saved to, the file"""
+        if self.invalid_items:
+            return  # Loading the file again must find the items it skipped
+        store_snapshot(self.filename, {
+            'character_name': self.character_name,
+            'items': [item.__dict__ for item in self.items]
+        }, self._snapshot_version())
+    
     def save_inventory(self) -> None:
         """Save inventory to file"""
         try:
             data = {
                 'character_name': self.character_name,
-                'items': [item.to_dict() for item in self.items]
+                'items': [item.to_dict() for item in self.items] + self.invalid_items
             }
             with open(self.filename, 'w', encoding='utf-8') as f:
                 json.dump(data, f, indent=2, ensure_ascii=False)
+            self._store_snapshot()
             print(f"✓ Inventory saved for {self.character_name}")
         except Exception as e:
             print(f"✗ Error saving inventory: {e}")
@@ -208,6 +307,7 @@ class InventoryManager:
 
 def parse_weight(weight_str: str) -> float:
     """Parse weight string, handling fractions"""
+    from fractions import Fraction  # Only needed once an item is typed in
     try:
         return float(Fraction(weight_str))
     except (ValueError, ZeroDivisionError):
@@ -287,19 +387,31 @@ def create_item_interactive() -> Optional[InventoryItem]:
         print("\n⚠ Item creation cancelled.")
         return None
 
+# Menu choices as named in instrumentation traces
+MENU_ACTIONS = {"1": "view", "2": "add", "3": "remove", "4": "search", "5": "sort",
+                "6": "summary", "7": "save_and_exit", "8": "exit"}
+
+def ask_character_name(inventory: InventoryManager) -> None:
+    """Set character name if not already set"""
+    if inventory.character_name == "Unknown Adventurer":
+        name = get_user_input("\nCharacter name: ", required=False)
+        if name:
+            inventory.character_name = name
+
 def main():
     """Main program loop"""
+    instrumentation.setup(sys.argv[1:], {InventoryManager: "op"})
     print("🎲 D&D 5e Character Inventory Manager ��")
     print("=======================================")
     
-    # Initialize inventory manager
-    inventory = InventoryManager()
+    # Initialize inventory manager; a saved inventory is read on first use so the menu shows at once
+    inventory = InventoryManager(lazy=True)
     
-    # Set character name if not already set
-    if inventory.character_name == "Unknown Adventurer":
-        name = get_user_input("\nCharacter name: ", required=False)
-        if name:
-            inventory.character_name = name
+    # Nothing to read for a new inventory, so name it now; a saved one without a name is asked on saving
+    name_on_save = os.path.exists(inventory.filename)
+    if not name_on_save:
+        inventory.load_inventory()
+        ask_character_name(inventory)
     
     while True:
         print("\n📋 MAIN MENU")
@@ -314,76 +426,79 @@ def main():
         
         choice = get_user_input("\nChoose option (1-8): ", required=False)
         
-        if choice == "1":
-            inventory.display_inventory()
+        with instrumentation.span("menu", MENU_ACTIONS.get(choice, "invalid")):
+            if choice == "1":
+                inventory.display_inventory()
             
-        elif choice == "2":
-            item = create_item_interactive()
-            if item:
-                inventory.add_item(item)
+            elif choice == "2":
+                item = create_item_interactive()
+                if item:
+                    inventory.add_item(item)
                 
-        elif choice == "3":
-            if not inventory.items:
-                print("📦 Inventory is empty!")
-                continue
+            elif choice == "3":
+                if not inventory.items:
+                    print("📦 Inventory is empty!")
+                    continue
             
-            inventory.display_inventory()
-            item_name = get_user_input("\nItem name to remove: ", required=False)
-            if item_name:
-                item = inventory.find_item_by_name(item_name)
-                if item:
-                    max_qty = item.quantity
-                    qty = get_user_input(f"Quantity to remove (1-{max_qty}): ", 
-                                       int, default=1,
-                                       validation_func=lambda x: 1 <= x <= max_qty)
-                    inventory.remove_item(item_name, qty)
-                else:
-                    print(f"✗ Item '{item_name}' not found.")
+                inventory.display_inventory()
+                item_name = get_user_input("\nItem name to remove: ", required=False)
+                if item_name:
+                    item = inventory.find_item_by_name(item_name)
+                    if item:
+                        max_qty = item.quantity
+                        qty = get_user_input(f"Quantity to remove (1-{max_qty}): ", 
+                                           int, default=1,
+                                           validation_func=lambda x: 1 <= x <= max_qty)
+                        inventory.remove_item(item_name, qty)
+                    else:
+                        print(f"✗ Item '{item_name}' not found.")
                     
-        elif choice == "4":
-            query = get_user_input("\nSearch for: ", required=False)
-            if query:
-                results = inventory.search_items(query)
-                if results:
-                    print(f"\n🔍 Search results for '{query}':")
-                    inventory.display_inventory(results)
-                else:
-                    print(f"No items found matching '{query}'")
+            elif choice == "4":
+                query = get_user_input("\nSearch for: ", required=False)
+                if query:
+                    results = inventory.search_items(query)
+                    if results:
+                        print(f"\n🔍 Search results for '{query}':")
+                        inventory.display_inventory(results)
+                    else:
+                        print(f"No items found matching '{query}'")
                     
-        elif choice == "5":
-            if not inventory.items:
-                print("📦 Inventory is empty!")
-                continue
+            elif choice == "5":
+                if not inventory.items:
+                    print("📦 Inventory is empty!")
+                    continue
                 
-            print("\nSort options: name, weight, rarity, quantity, value, type, total_weight")
-            sort_by = get_user_input("Sort by: ", default="name")
-            reverse = get_user_input("Reverse order? (y/n): ", bool, default=False)
-            inventory.display_inventory(sort_by=sort_by, reverse=reverse)
-            
-        elif choice == "6":
-            print(f"\n🎭 Character: {inventory.character_name}")
-            print(f"📦 Total Items: {len(inventory.items)}")
-            print(f"⚖️  Total Weight: {inventory.get_total_weight():g} lbs")
-            print(f"💰 Total Value: {inventory.get_total_value():g} gp")
+                print("\nSort options: name, weight, rarity, quantity, value, type, total_weight")
+                sort_by = get_user_input("Sort by: ", default="name")
+                reverse = get_user_input("Reverse order? (y/n): ", bool, default=False)
+                inventory.display_inventory(sort_by=sort_by, reverse=reverse)
             
-            magical_items = [item for item in inventory.items if item.magical]
-            attuned_items = [item for item in inventory.items if item.attuned]
-            print(f"✨ Magical Items: {len(magical_items)}")
-            print(f"🔗 Attuned Items: {len(attuned_items)}")
+            elif choice == "6":
+                print(f"\n🎭 Character: {inventory.character_name}")
+                print(f"📦 Total Items: {len(inventory.items)}")
+                print(f"⚖️  Total Weight: {inventory.get_total_weight():g} lbs")
+                print(f"💰 Total Value: {inventory.get_total_value():g} gp")
             
-        elif choice == "7":
-            inventory.save_inventory()
-            print("👋 Farewell, adventurer!")
-            break
+                magical_items = [item for item in inventory.items if item.magical]
+                attuned_items = [item for item in inventory.items if item.attuned]
+                print(f"✨ Magical Items: {len(magical_items)}")
+                print(f"🔗 Attuned Items: {len(attuned_items)}")
             
-        elif choice == "8":
-            confirm = get_user_input("Exit without saving? (y/n): ", bool, default=False)
-            if confirm:
+            elif choice == "7":
+                if name_on_save:
+                    ask_character_name(inventory)
+                inventory.save_inventory()
                 print("👋 Farewell, adventurer!")
                 break
+            
+            elif choice == "8":
+                confirm = get_user_input("Exit without saving? (y/n): ", bool, default=False)
+                if confirm:
+                    print("👋 Farewell, adventurer!")
+                    break
                 
-        else:
-            print("Invalid option. Please choose 1-8.")
+            else:
+                print("Invalid option. Please choose 1-8.")
 
 if __name__ == "__main__":
     try:
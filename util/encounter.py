@@ -0,0 +1,219 @@
+"""
+D&D 5E Encounter Tracker
+Initiative order, rounds and timed conditions for a fight with many combatants.
+"""
+
+import heapq
+import itertools
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from dice import DiceRoller
+
+# Turn keys sort by (round, -initiative, -initiative bonus, join order), so a
+# min-heap pops combatants in initiative order and the same key marks when a
+# timed effect should expire.
+TurnKey = Tuple[int, int, int, int]
+
+START_OF_TURN = 0
+END_OF_TURN = 1
+
+# Sorts ahead of every combatant's initiative
+_TOP_OF_ROUND = -10 ** 9
+
+
+@dataclass
+class Participant:
+    """A combatant in the encounter: a party character or an ad-hoc monster."""
+    name: str
+    initiative: int
+    initiative_bonus: int = 0
+    armor_class: int = 10
+    hit_points: int = 0
+    max_hit_points: int = 0
+    character: Any = None
+    order: int = 0
+    conditions: List[str] = field(default_factory=list)
+
+    @property
+    def is_monster(self) -> bool:
+        return self.character is None
+
+    @property
+    def current_hit_points(self) -> int:
+        """Live hit points; characters are read from their sheet."""
+        return self.character.current_hit_points if self.character is not None else self.hit_points
+
+    def sort_key(self, round_number: int) -> TurnKey:
+        return (round_number, -self.initiative, -self.initiative_bonus, self.order)
+
+
+@dataclass
+class Effect:
+    """A condition on a participant that expires at a set point in the turn order."""
+    target: str
+    condition: str
+    expires: Tuple[TurnKey, int]
+    source: Optional[str] = None
+
+    def describe(self) -> str:
+        round_number = self.expires[0][0]
+        when = "start" if self.expires[1] == START_OF_TURN else "end"
+        source = f" ({self.source}'s turn)" if self.source else ""
+        return f"{self.condition} on {self.target} until {when} of round {round_number}{source}"
+
+
+class Encounter:
+    """Initiative tracker with a turn heap and a timer heap for effects.
+
+    Advancing a turn and expiring an effect are both heap pops, so large fights
+    stay O(log n) per step. Removed combatants and effects are dropped lazily
+    when they reach the top of their heap.
+    """
+
+    def __init__(self, roller: Optional[DiceRoller] = None):
+        self.dice = roller or DiceRoller()
+        self.participants: Dict[str, Participant] = {}
+        self.round = 0
+        self.current: Optional[Participant] = None
+        self._turn_key: Optional[TurnKey] = None
+        self._turns: List[Tuple[TurnKey, str]] = []
+        self._timers: List[Tuple[Tuple[TurnKey, int], int, Effect]] = []
+        self._order = itertools.count()
+        self._effect_ids = itertools.count()
+
+    def roll_initiative(self, bonus: int) -> int:
+        return self.dice.roll(1, 20)[0] + bonus
+
+    def _unique_name(self, name: str) -> str:
+        if name not in self.participants:
+            return name
+        for number in itertools.count(2):
+            candidate = f"{name} {number}"
+            if candidate not in self.participants:
+                return candidate
+
+    def _add(self, participant: Participant) -> Participant:
+        participant.order = next(self._order)
+        self.participants[participant.name] = participant
+        if self.round:
+            # Joiners act this round if their initiative has not come up yet
+            key = participant.sort_key(self.round)
+            if self._turn_key and key <= self._turn_key:
+                key = participant.sort_key(self.round + 1)
+            heapq.heappush(self._turns, (key, participant.name))
+        return participant
+
+    def add_character(self, character, initiative: Optional[int] = None) -> Participant:
+        """Add a party character; its conditions list is shared with the character."""
+        if not hasattr(character, 'conditions'):
+            character.conditions = []
+        bonus = character.initiative
+        return self._add(Participant(
+            name=self._unique_name(character.name),
+            initiative=self.roll_initiative(bonus) if initiative is None else initiative,
+            initiative_bonus=bonus,
+            armor_class=character.armor_class,
+            max_hit_points=character.hit_point_maximum,
+            character=character,
+            conditions=character.conditions
+        ))
+
+    def add_monster(self, name: str, initiative_bonus: int = 0, hit_points: int = 0,
+                    armor_class: int = 10, initiative: Optional[int] = None) -> Participant:
+        """Add a monster; duplicate names are numbered ("Goblin 2")."""
+        return self._add(Participant(
+            name=self._unique_name(name),
+            initiative=self.roll_initiative(initiative_bonus) if initiative is None else initiative,
+            initiative_bonus=initiative_bonus,
+            armor_class=armor_class,
+            hit_points=hit_points,
+            max_hit_points=hit_points
+        ))
+
+    def remove_participant(self, name: str) -> Optional[Participant]:
+        """Take a combatant out of the fight; its queued turn is skipped."""
+        participant = self.participants.pop(name, None)
+        if participant and self.current is participant:
+            self.current = None
+        return participant
+
+    def start(self) -> List[Effect]:
+        """Begin round 1 and give the first combatant their turn."""
+        if not self.participants:
+            raise ValueError("Encounter has no participants")
+        self.round = 1
+        self._turns = [(p.sort_key(1), p.name) for p in self.participants.values()]
+        heapq.heapify(self._turns)
+        return self.next_turn()
+
+    def next_turn(self) -> List[Effect]:
+        """End the current turn and start the next one, returning effects that expired."""
+        expired = []
+        if self.current is not None:
+            key = self.current.sort_key(self.round)
+            expired.extend(self._expire((key, END_OF_TURN)))
+            heapq.heappush(self._turns, (self.current.sort_key(self.round + 1), self.current.name))
+            self.current = None
+
+        while self._turns:
+            key, name = heapq.heappop(self._turns)
+            participant = self.participants.get(name)
+            if participant is None or participant.sort_key(key[0]) != key:
+                continue  # Removed combatant
+            self.round = key[0]
+            self.current = participant
+            self._turn_key = key
+            expired.extend(self._expire((key, START_OF_TURN)))
+            break
+        return expired
+
+    def add_effect(self, target: str, condition: str, rounds: int,
+                   source: Optional[str] = None, ends: int = START_OF_TURN) -> Effect:
+        """Apply a condition that lasts a number of rounds.
+
+        The effect expires at the start (or end) of the source's turn that many
+        rounds later; without a source it is timed from the current turn, or
+        from the top of the round before the encounter starts.
+        """
+        participant = self.participants[target]
+        anchor = self.participants.get(source) if source else self.current
+        if anchor is None:
+            expires = ((max(self.round, 1) + rounds, _TOP_OF_ROUND, 0, 0), ends)
+        else:
+            expires = (anchor.sort_key(max(self.round, 1) + rounds), ends)
+
+        effect = Effect(target=target, condition=condition, expires=expires,
+                        source=anchor.name if anchor else None)
+        participant.conditions.append(condition)
+        heapq.heappush(self._timers, (expires, next(self._effect_ids), effect))
+        return effect
+
+    def _expire(self, point: Tuple[TurnKey, int]) -> List[Effect]:
+        expired = []
+        while self._timers and self._timers[0][0] <= point:
+            _, _, effect = heapq.heappop(self._timers)
+            participant = self.participants.get(effect.target)
+            if participant and effect.condition in participant.conditions:
+                participant.conditions.remove(effect.condition)
+                expired.append(effect)
+        return expired
+
+    def active_effects(self) -> List[Effect]:
+        """Pending timed effects, soonest first."""
+        return [effect for _, _, effect in sorted(self._timers)
+                if effect.target in self.participants
+                and effect.condition in self.participants[effect.target].conditions]
+
+    def turn_order(self) -> List[Participant]:
+        """Combatants in initiative order for display."""
+        return sorted(self.participants.values(), key=lambda p: p.sort_key(0))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Summary of the encounter state."""
+        return {
+            "round": self.round,
+            "current": self.current.name if self.current else None,
+            "order": [(p.name, p.initiative) for p in self.turn_order()],
+            "effects": [effect.describe() for effect in self.active_effects()]
+        }
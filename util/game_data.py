@@ -0,0 +1,227 @@
+"""
+D&D 5E Game Data Loader
+Loads game data files on first use, merges homebrew packs and caches the compiled result.
+Also keeps parsed snapshots of roster and inventory files for fast reloads.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+HOMEBREW_DIR = os.path.join(DATA_DIR, "homebrew")
+CACHE_DIR = os.path.join(DATA_DIR, ".cache")
+CACHE_FORMAT = 1
+# Classes a roster or inventory snapshot may contain besides plain data
+SNAPSHOT_CLASSES = {("proficiencies", "ProficiencySet")}
+
+
+class LazyMapping(Mapping):
+    """Read-only mapping whose contents are loaded on first access."""
+
+    def __init__(self, loader: Callable[[], Mapping]):
+        self._loader = loader
+        self._data: Optional[Mapping] = None
+
+    def _load(self) -> Mapping:
+        if self._data is None:
+            self._data = self._loader()
+        return self._data
+
+    def __getitem__(self, key):
+        return self._load()[key]
+
+    def __iter__(self) -> Iterator:
+        return iter(self._load())
+
+    def __len__(self) -> int:
+        return len(self._load())
+
+    def __contains__(self, key) -> bool:
+        return key in self._load()
+
+    def __repr__(self) -> str:
+        if self._data is None:
+            return f"{self.__class__.__name__}(<not loaded>)"
+        return f"{self.__class__.__name__}({self._data!r})"
+
+
+def get_homebrew_packs(homebrew_dir: str = HOMEBREW_DIR) -> List[str]:
+    """Get homebrew pack files in the order they are merged."""
+    if not os.path.isdir(homebrew_dir):
+        return []
+    return [os.path.join(homebrew_dir, filename)
+            for filename in sorted(os.listdir(homebrew_dir))
+            if filename.endswith(".json")]
+
+
+def merge_data(base: Any, override: Any) -> Any:
+    """Merge override into base; dictionaries merge recursively, other values replace."""
+    if isinstance(base, dict) and isinstance(override, dict):
+        merged = dict(base)
+        for key, value in override.items():
+            merged[key] = merge_data(base[key], value) if key in base else value
+        return merged
+    return override
+
+
+def load_data_file(section: str, data_dir: str = DATA_DIR,
+                   homebrew_dir: str = HOMEBREW_DIR) -> Any:
+    """Load a base data file and merge in that section from every homebrew pack.
+
+    Base files are named after their section (data/classes.json); homebrew packs
+    hold any number of sections keyed by name ({"classes": {...}}).
+    """
+    with open(os.path.join(data_dir, f"{section}.json"), 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    for pack_path in get_homebrew_packs(homebrew_dir):
+        try:
+            with open(pack_path, 'r', encoding='utf-8') as f:
+                pack = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Skipping homebrew pack {os.path.basename(pack_path)}: {e}")
+            continue
+        if isinstance(pack, dict) and section in pack:
+            data = merge_data(data, pack[section])
+    return data
+
+
+def _source_fingerprint(paths: List[str]) -> List[Tuple[str, int, int]]:
+    """Cheap fingerprint of source files from their size and modification time."""
+    fingerprint = []
+    for path in paths:
+        stat = os.stat(path)
+        fingerprint.append((path, stat.st_size, stat.st_mtime_ns))
+    return fingerprint
+
+
+def _source_hash(paths: List[str]) -> str:
+    """Content hash of source files, used when the cheap fingerprint changes."""
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(os.path.basename(path).encode('utf-8'))
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+class _SnapshotUnpickler(pickle.Unpickler):
+    """Unpickler for snapshots, which sit beside user data: it refuses every class not in SNAPSHOT_CLASSES,
+    so a planted snapshot cannot run code."""
+
+    def find_class(self, module: str, name: str):
+        if (module, name) not in SNAPSHOT_CLASSES:
+            raise pickle.UnpicklingError(f"Snapshot refers to {module}.{name}, which snapshots never hold")
+        return super().find_class(module, name)
+
+
+def _read_cache(cache_path: str, unpickler: type = pickle.Unpickler) -> Optional[Dict[str, Any]]:
+    try:
+        with open(cache_path, 'rb') as f:
+            cached = unpickler(f).load()
+    except Exception:
+        # A damaged pickle can fail in many ways (bad protocol, bad text, huge lengths); all are a miss
+        return None
+    if (not isinstance(cached, dict) or cached.get("format") != CACHE_FORMAT
+            or not {"version", "fingerprint", "hash", "data"} <= cached.keys()):
+        return None
+    return cached
+
+
+def _write_cache(cache_path: str, cached: Dict[str, Any]) -> None:
+    try:
+        os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+        temp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as f:
+            pickle.dump(cached, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, cache_path)
+    except OSError:
+        pass  # Caching is an optimization; a read-only data directory is fine
+
+
+def load_compiled(name: str, sections: List[str], compile_func: Callable[[Dict[str, Any]], Any],
+                  version: int = 1, data_dir: str = DATA_DIR,
+                  homebrew_dir: str = HOMEBREW_DIR, cache_dir: str = CACHE_DIR) -> Any:
+    """Load data sections and compile them, reusing a cached result when sources are unchanged.
+
+    The cache is keyed on the size and mtime of every source file, falling back to
+    a content hash so touched-but-identical files do not trigger a rebuild. Bump
+    version when compile_func changes shape.
+    """
+    sources = [os.path.join(data_dir, f"{section}.json") for section in sections]
+    sources.extend(get_homebrew_packs(homebrew_dir))
+    fingerprint = _source_fingerprint(sources)
+    cache_path = os.path.join(cache_dir, f"{name}.pickle")
+
+    cached = _read_cache(cache_path)
+    if cached and cached.get("version") == version:
+        if cached["fingerprint"] == fingerprint:
+            return cached["data"]
+        source_hash = _source_hash(sources)
+        if cached["hash"] == source_hash:
+            cached["fingerprint"] = fingerprint
+            _write_cache(cache_path, cached)
+            return cached["data"]
+    else:
+        source_hash = _source_hash(sources)
+
+    raw = {section: load_data_file(section, data_dir, homebrew_dir) for section in sections}
+    data = compile_func(raw)
+    _write_cache(cache_path, {
+        "format": CACHE_FORMAT,
+        "version": version,
+        "fingerprint": fingerprint,
+        "hash": source_hash,
+        "data": data
+    })
+    return data
+
+
+def snapshot_path(data_file: str) -> str:
+    """The snapshot kept next to a data file: characters.json -> characters.snapshot.pickle."""
+    base, extension = os.path.splitext(data_file)
+    return f"{base if extension == '.json' else data_file}.snapshot.pickle"
+
+
+def load_snapshot(data_file: str, version: Any = 1) -> Optional[Any]:
+    """What store_snapshot last stored for data_file, or None if the file has changed since.
+
+    As with load_compiled, size and mtime are checked first and the content
+    hash only when they differ, so a touched-but-identical file keeps its
+    snapshot. version must match the one stored with it. A snapshot holding
+    anything but plain data and SNAPSHOT_CLASSES is ignored unread.
+    """
+    cache_path = snapshot_path(data_file)
+    cached = _read_cache(cache_path, _SnapshotUnpickler)
+    if not cached or cached.get("version") != version:
+        return None
+    try:
+        fingerprint = _source_fingerprint([data_file])
+        if cached["fingerprint"] != fingerprint:
+            if cached["hash"] != _source_hash([data_file]):
+                return None
+            cached["fingerprint"] = fingerprint
+            _write_cache(cache_path, cached)
+    except OSError:
+        return None
+    return cached["data"]
+
+
+def store_snapshot(data_file: str, data: Any, version: Any = 1) -> None:
+    """Keep data, built from data_file as it is now, for load_snapshot to return until the file changes."""
+    try:
+        fingerprint = _source_fingerprint([data_file])
+        source_hash = _source_hash([data_file])
+    except OSError:
+        return
+    _write_cache(snapshot_path(data_file), {
+        "format": CACHE_FORMAT,
+        "version": version,
+        "fingerprint": fingerprint,
+        "hash": source_hash,
+        "data": data
+    })
@@ -0,0 +1,302 @@
+"""
+D&D 5E Instrumentation
+Opt-in timing, file I/O counting and profiling for the character and inventory tools.
+
+Set DND_TRACE=trace.jsonl (or pass --trace[=FILE]) to trace a session, and
+DND_PROFILE=cprofile,tracemalloc (or --profile[=...]) to profile it as well.
+"""
+
+import atexit
+import builtins
+import functools
+import json
+import os
+import sys
+import time
+import types
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional
+
+TRACE_ENV = "DND_TRACE"
+PROFILE_ENV = "DND_PROFILE"
+DEFAULT_TRACE = "dnd_trace.jsonl"
+PROFILERS = ("cprofile", "tracemalloc")
+
+# Latency histogram bucket upper bounds, in milliseconds (the last bucket is everything slower)
+BUCKETS_MS = (0.1, 1, 10, 100, 1000)
+# Allocation sites listed in the tracemalloc summary
+TOP_ALLOCATIONS = 10
+
+IO_FIELDS = ("opens", "read_calls", "read_bytes", "write_calls", "write_bytes")
+
+_tracer: Optional['Tracer'] = None
+
+
+class _CountingFile:
+    """Wraps a file object, counting reads and writes into the tracer's I/O totals."""
+
+    def __init__(self, file, counters: Dict[str, int]):
+        self._file = file
+        self._counters = counters
+
+    def _read(self, data):
+        self._counters["read_calls"] += 1
+        self._counters["read_bytes"] += len(data)
+        return data
+
+    def read(self, *args):
+        return self._read(self._file.read(*args))
+
+    def readline(self, *args):
+        return self._read(self._file.readline(*args))
+
+    def readlines(self, *args):
+        lines = self._file.readlines(*args)
+        self._counters["read_calls"] += 1
+        self._counters["read_bytes"] += sum(map(len, lines))
+        return lines
+
+    def readinto(self, buffer):
+        count = self._file.readinto(buffer)
+        self._counters["read_calls"] += 1
+        self._counters["read_bytes"] += count or 0
+        return count
+
+    def write(self, data):
+        self._counters["write_calls"] += 1
+        self._counters["write_bytes"] += len(data)
+        return self._file.write(data)
+
+    def writelines(self, lines):
+        lines = list(lines)
+        self._counters["write_calls"] += 1
+        self._counters["write_bytes"] += sum(map(len, lines))
+        return self._file.writelines(lines)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        line = next(self._file)
+        self._read(line)
+        return line
+
+    def __enter__(self):
+        self._file.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        return self._file.__exit__(*exc_info)
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+
+class Tracer:
+    """Records timed spans to a JSON Lines file and summarises them when finished.
+
+    Each span line holds its kind ("op" for manager methods, "menu" for menu
+    actions, "command" for scripted commands), name, time in milliseconds
+    excluding time spent waiting at an input() prompt (reported as wait_ms),
+    nesting depth, whether it raised, and the file I/O done inside it.
+    """
+
+    def __init__(self, path: str, profilers: List[str] = ()):
+        self.path = path
+        self.base = path[:-len(".jsonl")] if path.endswith(".jsonl") else path
+        self.profilers = list(profilers)
+        self.io = dict.fromkeys(IO_FIELDS, 0)
+        self.latencies: Dict[str, List[float]] = {}
+        self._stack: List[Dict[str, float]] = []
+        self._open = builtins.open
+        self._input = builtins.input
+        self._profile = None
+        self._pid = os.getpid()
+        self._start = time.perf_counter()
+        self._file = self._open(path, 'w', encoding='utf-8')
+
+    def start(self):
+        """Start counting file I/O and any profilers."""
+        builtins.open = self._counting_open
+        builtins.input = self._timed_input
+        if "tracemalloc" in self.profilers:
+            import tracemalloc
+            tracemalloc.start()
+        if "cprofile" in self.profilers:
+            import cProfile
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        self._emit({"kind": "session", "argv": sys.argv, "pid": os.getpid(), "profilers": self.profilers})
+
+    def _counting_open(self, *args, **kwargs):
+        self.io["opens"] += 1
+        return _CountingFile(self._open(*args, **kwargs), self.io)
+
+    def _timed_input(self, *args):
+        started = time.perf_counter()
+        try:
+            return self._input(*args)
+        finally:
+            waited = time.perf_counter() - started
+            for frame in self._stack:
+                frame["wait"] += waited
+
+    def _emit(self, record: Dict[str, Any]):
+        if os.getpid() != self._pid:
+            return  # A forked worker process; only the main process writes the trace
+        record = {"t": round(time.perf_counter() - self._start, 6), **record}
+        self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+    @contextmanager
+    def span(self, kind: str, name: str) -> Iterator[None]:
+        frame = {"wait": 0.0}
+        io_before = dict(self.io)
+        self._stack.append(frame)
+        started = time.perf_counter()
+        ok = True
+        try:
+            yield
+        except BaseException:
+            ok = False
+            raise
+        finally:
+            elapsed_ms = (time.perf_counter() - started - frame["wait"]) * 1000
+            self._stack.pop()
+            record = {"kind": kind, "name": name, "ms": round(elapsed_ms, 4), "depth": len(self._stack)}
+            if frame["wait"]:
+                record["wait_ms"] = round(frame["wait"] * 1000, 1)
+            if not ok:
+                record["ok"] = False
+            io = {field: self.io[field] - io_before[field] for field in IO_FIELDS if self.io[field] != io_before[field]}
+            if io:
+                record["io"] = io
+            self._emit(record)
+            self.latencies.setdefault(f"{kind}:{name}", []).append(elapsed_ms)
+
+    def wrap(self, function: Callable, kind: str, name: str) -> Callable:
+        @functools.wraps(function)
+        def traced(*args, **kwargs):
+            with self.span(kind, name):
+                return function(*args, **kwargs)
+        traced.__traced__ = True
+        return traced
+
+    def instrument(self, cls: type, kind: str):
+        """Trace every public method defined on cls."""
+        for attribute, value in list(vars(cls).items()):
+            if attribute.startswith("_") or not isinstance(value, types.FunctionType) or getattr(value, "__traced__", False):
+                continue
+            setattr(cls, attribute, self.wrap(value, kind, f"{cls.__name__}.{attribute}"))
+
+    def histogram(self) -> Dict[str, Dict[str, Any]]:
+        """Latency statistics and bucket counts per traced name."""
+        summary = {}
+        for name, values in sorted(self.latencies.items()):
+            ordered = sorted(values)
+            buckets = [0] * (len(BUCKETS_MS) + 1)
+            for value in ordered:
+                buckets[next((i for i, bound in enumerate(BUCKETS_MS) if value < bound), len(BUCKETS_MS))] += 1
+            summary[name] = {
+                "calls": len(ordered), "total_ms": round(sum(ordered), 3),
+                "mean_ms": round(sum(ordered) / len(ordered), 4),
+                "p50_ms": round(_percentile(ordered, 0.5), 4), "p90_ms": round(_percentile(ordered, 0.9), 4),
+                "p99_ms": round(_percentile(ordered, 0.99), 4), "max_ms": round(ordered[-1], 4),
+                "buckets": buckets
+            }
+        return summary
+
+    def finish(self):
+        """Stop profiling, write the summary line and profiler files, and print the histogram to stderr."""
+        builtins.open = self._open
+        builtins.input = self._input
+        summary: Dict[str, Any] = {"kind": "summary", "io": self.io, "latency": self.histogram()}
+        files = []
+        if self._profile is not None:
+            self._profile.disable()
+            self._profile.dump_stats(f"{self.base}.prof")
+            files.append(f"{self.base}.prof")
+        if "tracemalloc" in self.profilers:
+            import tracemalloc
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            snapshot.dump(f"{self.base}.tracemalloc")
+            files.append(f"{self.base}.tracemalloc")
+            summary["memory"] = {
+                "current_kb": current // 1024, "peak_kb": peak // 1024,
+                "top": [{"where": str(stat.traceback[0]), "kb": stat.size // 1024, "blocks": stat.count}
+                        for stat in snapshot.statistics("lineno")[:TOP_ALLOCATIONS]]}
+        self._emit(summary)
+        self._file.close()
+        print(format_histogram(summary["latency"]), file=sys.stderr)
+        print(f"Trace written to {self.path}" + "".join(f", {path}" for path in files), file=sys.stderr)
+
+
+def _percentile(ordered: List[float], fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def format_histogram(latency: Mapping[str, Mapping[str, Any]]) -> str:
+    bounds = [f"<{bound:g}ms" for bound in BUCKETS_MS] + [f">={BUCKETS_MS[-1]:g}ms"]
+    lines = ["", f"{'Latency':<44} {'calls':>7} {'mean':>9} {'p50':>9} {'p90':>9} {'p99':>9} {'max':>9}  "
+             + " ".join(f"{bound:>7}" for bound in bounds)]
+    for name, stats in sorted(latency.items(), key=lambda item: -item[1]["total_ms"]):
+        lines.append(f"{name[:44]:<44} {stats['calls']:>7} "
+                     + " ".join(f"{stats[key]:>9.3f}" for key in ("mean_ms", "p50_ms", "p90_ms", "p99_ms", "max_ms"))
+                     + "  " + " ".join(f"{count:>7}" for count in stats["buckets"]))
+    return "\n".join(lines)
+
+
+def enabled() -> bool:
+    return _tracer is not None
+
+
+@contextmanager
+def span(kind: str, name: str) -> Iterator[None]:
+    """Time a block as one span when tracing; does nothing otherwise."""
+    if _tracer is None:
+        yield
+    else:
+        with _tracer.span(kind, name):
+            yield
+
+
+def instrument(targets: Mapping[type, str]):
+    """Trace the public methods of targets (class -> span kind) if tracing is on."""
+    if _tracer is not None:
+        for cls, kind in targets.items():
+            _tracer.instrument(cls, kind)
+
+
+def setup(argv: List[str], targets: Optional[Mapping[type, str]] = None) -> List[str]:
+    """Start tracing if asked to, and trace the public methods of targets (class -> span kind).
+
+    Reads DND_TRACE/DND_PROFILE and removes --trace[=FILE]/--profile[=LIST]
+    from argv, returning the remaining arguments. Without either, nothing
+    is patched and the tools run exactly as before.
+    """
+    global _tracer
+    path = os.environ.get(TRACE_ENV) or None
+    profilers = os.environ.get(PROFILE_ENV, "")
+    remaining = []
+    for arg in argv:
+        if arg == "--trace" or arg.startswith("--trace="):
+            path = arg.partition("=")[2] or DEFAULT_TRACE
+        elif arg == "--profile" or arg.startswith("--profile="):
+            profilers = arg.partition("=")[2] or ",".join(PROFILERS)
+        else:
+            remaining.append(arg)
+    if path in ("1", "true", "yes") or (profilers and not path):
+        path = DEFAULT_TRACE
+
+    if path and _tracer is None:
+        chosen = [name.strip().lower() for name in profilers.split(",") if name.strip()]
+        unknown = [name for name in chosen if name not in PROFILERS]
+        if unknown:
+            print(f"Unknown profiler(s) {', '.join(unknown)}; choose from {', '.join(PROFILERS)}", file=sys.stderr)
+            chosen = [name for name in chosen if name in PROFILERS]
+        _tracer = Tracer(path, chosen)
+        _tracer.start()
+        atexit.register(_tracer.finish)
+    instrument(targets or {})
+    return remaining
@@ -0,0 +1,215 @@
+"""
+D&D 5E NPC Generator
+Batch-generates fully derived characters from templates across a process pool.
+"""
+
+import os
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, fields
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from character_maker import Character, CharacterManager, DND_CLASSES
+from dice import DiceRoller, compile_dice
+from proficiencies import ABILITIES, SKILLS
+
+STANDARD_ARRAY = [15, 14, 13, 12, 10, 8]
+ABILITY_METHODS = {"standard_array": None, "4d6": "4d6dl1", "3d6": "3d6"}
+HP_METHODS = ("roll", "average", "max")
+
+# NPCs per task handed to a worker process
+DEFAULT_CHUNK_SIZE = 250
+
+
+@dataclass
+class NPCTemplate:
+    """Recipe for a batch of NPCs; each list is chosen from at random per NPC (levels, if given, instead of level_range)."""
+    name: str = "NPC"
+    classes: List[str] = field(default_factory=lambda: ["Fighter"])
+    level_range: Tuple[int, int] = (1, 1)
+    levels: List[int] = field(default_factory=list)
+    races: List[str] = field(default_factory=lambda: ["Human"])
+    ability_method: str = "4d6"
+    hp_method: str = "roll"
+    backgrounds: List[str] = field(default_factory=list)
+    alignments: List[str] = field(default_factory=list)
+    skill_count: int = 2
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'NPCTemplate':
+        """Create a template from a dictionary, validating it."""
+        known = {f.name for f in fields(cls)}
+        unknown = set(data) - known
+        if unknown:
+            raise ValueError(f"Unknown template field(s): {', '.join(sorted(unknown))}")
+        template = cls(**data)
+        template.level_range = tuple(template.level_range)
+        template.validate()
+        return template
+
+    def validate(self):
+        """Raise ValueError if the template cannot be generated."""
+        if not self.classes:
+            raise ValueError("Template needs at least one class")
+        unknown = [name for name in self.classes if name not in DND_CLASSES]
+        if unknown:
+            raise ValueError(f"Unknown class(es): {', '.join(unknown)}")
+        low, high = self.level_range
+        if not 1 <= low <= high <= 20:
+            raise ValueError("Level range must be within 1-20, low to high")
+        if any(not isinstance(level, int) or not 1 <= level <= 20 for level in self.levels):
+            raise ValueError("Levels must be whole numbers within 1-20")
+        if not self.races:
+            raise ValueError("Template needs at least one race")
+        if self.ability_method not in ABILITY_METHODS:
+            raise ValueError(f"Ability method must be one of: {', '.join(ABILITY_METHODS)}")
+        if self.hp_method not in HP_METHODS:
+            raise ValueError(f"HP method must be one of: {', '.join(HP_METHODS)}")
+        if not 0 <= self.skill_count <= len(SKILLS):
+            raise ValueError(f"skill_count must be between 0 and {len(SKILLS)}")
+
+
+def _choose(roller: DiceRoller, options: Sequence[Any]) -> Any:
+    return options[roller.roll(1, len(options))[0] - 1]
+
+
+def _shuffled(roller: DiceRoller, options: Sequence[Any]) -> List[Any]:
+    items = list(options)
+    for i in range(len(items) - 1, 0, -1):
+        j = roller.roll(1, i + 1)[0] - 1
+        items[i], items[j] = items[j], items[i]
+    return items
+
+
+def _roll_ability_scores(roller: DiceRoller, method: str, count: int) -> List[List[int]]:
+    """Six scores per NPC, highest first."""
+    expression = ABILITY_METHODS[method]
+    if expression is None:
+        return [list(STANDARD_ARRAY) for _ in range(count)]
+    rolls = [int(score) for score in compile_dice(expression).roll_batch(count * 6, roller)]
+    return [sorted(rolls[i * 6:(i + 1) * 6], reverse=True) for i in range(count)]
+
+
+def _build_npc(roller: DiceRoller, template: NPCTemplate, name: str, scores: List[int]) -> Character:
+    character = Character(name)
+    character.character_class = _choose(roller, template.classes)
+    if template.levels:
+        character.level = _choose(roller, template.levels)
+    else:
+        low, high = template.level_range
+        character.level = low + roller.roll(1, high - low + 1)[0] - 1
+    character.race = _choose(roller, template.races)
+    if template.backgrounds:
+        character.background = _choose(roller, template.backgrounds)
+    if template.alignments:
+        character.alignment = _choose(roller, template.alignments)
+
+    class_data = DND_CLASSES[character.character_class]
+    subclasses = list(class_data["subclasses"])
+    if subclasses and character.level >= class_data["subclass_level"]:
+        character.subclass = _choose(roller, subclasses)
+
+    # Best scores to the class's primary abilities, then CON, then the rest at random
+    priority = [ability.lower() for ability in class_data["primary_ability"]]
+    if "constitution" not in priority:
+        priority.append("constitution")
+    priority += _shuffled(roller, [ability for ability in ABILITIES if ability not in priority])
+    for ability, score in zip(priority, scores):
+        setattr(character, ability, score)
+
+    for save in class_data["saving_throws"]:
+        character.saving_throws[save.lower()] = True
+    for skill in _shuffled(roller, SKILLS)[:template.skill_count]:
+        character.skills[skill] = True
+
+    dex_mod = character.get_ability_modifier(character.dexterity)
+    character.initiative = dex_mod
+    character.armor_class = 10 + dex_mod
+    character.apply_class_progression()
+    return character
+
+
+def generate_chunk(template: NPCTemplate, start: int, count: int, seed: Optional[int]) -> List[Dict[str, Any]]:
+    """Generate NPCs numbered start..start+count-1 from one seeded dice stream.
+
+    Returns character records (as stored in characters.json) so results are cheap
+    to send back from a worker process.
+    """
+    roller = DiceRoller(seed)
+    scores = _roll_ability_scores(roller, template.ability_method, count)
+    npcs = [_build_npc(roller, template, f"{template.name} {start + i}", scores[i]) for i in range(count)]
+
+    hit_dice = [DND_CLASSES[npc.character_class]["hit_die"] for npc in npcs]
+    con_mods = [npc.get_ability_modifier(npc.constitution) for npc in npcs]
+    levels = [npc.level for npc in npcs]
+    if template.hp_method == "roll":
+        totals = roller.roll_hit_points_batch(levels, hit_dice, con_mods, count)
+    else:
+        per_level = (lambda die: die) if template.hp_method == "max" else (lambda die: die // 2 + 1)
+        totals = [die + mod + (level - 1) * (per_level(die) + mod)
+                  for level, die, mod in zip(levels, hit_dice, con_mods)]
+
+    records = []
+    for npc, total in zip(npcs, totals):
+        npc.hit_point_maximum = npc.current_hit_points = max(npc.level, int(total))
+        records.append(npc.to_dict())
+    return records
+
+
+def _generate_job(job) -> List[Dict[str, Any]]:
+    """Process pool entry point."""
+    return generate_chunk(*job)
+
+
+def generate_npcs(template: NPCTemplate, count: int, seed: Optional[int] = None, start: int = 1,
+                  workers: Optional[int] = None, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+    """Generate count NPCs as character records, yielded in order as chunks finish.
+
+    Each chunk gets its own seed derived from seed, so the same seed produces
+    the same NPCs whatever the number of workers.
+    """
+    template.validate()
+    chunks = [(offset, min(chunk_size, count - offset)) for offset in range(0, count, chunk_size)]
+    jobs = [(template, start + offset, size, chunk_seed)
+            for (offset, size), chunk_seed in zip(chunks, DiceRoller.spawn_seeds(seed, len(chunks)))]
+
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(jobs) <= 1:
+        for job in jobs:
+            yield from _generate_job(job)
+        return
+    workers = min(workers, len(jobs))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Keep only a few chunks in flight so a slow consumer never has the whole batch in memory
+        pending = deque(executor.submit(_generate_job, job) for job in jobs[:workers * 2])
+        for job in jobs[workers * 2:] + [None] * len(pending):
+            records = pending.popleft().result()
+            if job is not None:
+                pending.append(executor.submit(_generate_job, job))
+            yield from records
+
+
+def next_npc_number(manager: CharacterManager, prefix: str) -> int:
+    """First number after any existing "<prefix> <n>" characters."""
+    pattern = re.compile(rf"{re.escape(prefix)} (\d+)$")
+    numbers = [int(match.group(1)) for match in map(pattern.match, manager.characters) if match]
+    return max(numbers, default=0) + 1
+
+
+def add_npcs_to_roster(manager: CharacterManager, template: NPCTemplate, count: int,
+                       seed: Optional[int] = None, workers: Optional[int] = None,
+                       save: bool = True, *, factory: Callable[[Dict[str, Any]], Character]) -> List[str]:
+    """Generate NPCs straight into the roster, numbered after existing ones, saving once.
+
+    factory builds a character from a record; pass the from_dict of the Character
+    class the manager holds, which is __main__'s when character_maker runs as a script.
+    """
+    names = []
+    start = next_npc_number(manager, template.name)
+    for record in generate_npcs(template, count, seed, start, workers):
+        manager.add_character(factory(record))
+        names.append(record["name"])
+    if save and names:
+        manager.save_characters()
+    return names
@@ -0,0 +1,757 @@
+"""
+D&D 5E Character Sheet PDF Export
+Fills the official fillable character sheet PDF from character data, one sheet or a whole roster at a time.
+"""
+
+import os
+import re
+import zlib
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from roster import record_class_level
+
+TEMPLATE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "5E_CharacterSheet_Fillable.pdf")
+
+
+class PDFError(ValueError):
+    """The PDF could not be read or filled."""
+
+
+class PDFName(str):
+    """A PDF name object such as /Yes (stored without the slash)."""
+
+
+PDFRef = namedtuple("PDFRef", "num gen")
+
+
+# --- Object parsing -------------------------------------------------------
+
+_WHITESPACE = b"\x00\t\n\x0c\r "
+_TOKEN_END = re.compile(rb"[\x00\t\n\x0c\r ()<>\[\]{}/%]")
+_REFERENCE = re.compile(rb"\s*(\d+)\s+(\d+)\s+R(?![^\x00\t\n\x0c\r ()<>\[\]{}/%])")
+_ESCAPES = {ord("n"): b"\n", ord("r"): b"\r", ord("t"): b"\t", ord("b"): b"\b",
+            ord("f"): b"\f", ord("("): b"(", ord(")"): b")", ord("\\"): b"\\"}
+
+
+def _skip_whitespace(data: bytes, pos: int) -> int:
+    while pos < len(data):
+        if data[pos] in _WHITESPACE:
+            pos += 1
+        elif data[pos] == ord("%"):
+            end = data.find(b"\n", pos)
+            pos = len(data) if end < 0 else end + 1
+        else:
+            break
+    return pos
+
+
+def _parse_literal_string(data: bytes, pos: int) -> Tuple[bytes, int]:
+    result = bytearray()
+    depth = 1
+    pos += 1
+    while depth:
+        char = data[pos]
+        if char == ord("\\"):
+            pos += 1
+            char = data[pos]
+            if char in _ESCAPES:
+                result += _ESCAPES[char]
+            elif 48 <= char <= 55:
+                digits = re.match(rb"[0-7]{1,3}", data[pos:pos + 3]).group()
+                result.append(int(digits, 8) & 0xFF)
+                pos += len(digits) - 1
+            elif char == ord("\r"):
+                if data[pos + 1:pos + 2] == b"\n":
+                    pos += 1
+            elif char != ord("\n"):
+                result.append(char)
+        else:
+            if char == ord("("):
+                depth += 1
+            elif char == ord(")"):
+                depth -= 1
+            if depth:
+                result.append(char)
+        pos += 1
+    return bytes(result), pos
+
+
+def parse_object(data: bytes, pos: int = 0) -> Tuple[Any, int]:
+    """Parse one PDF object starting at pos, returning (object, end position).
+
+    Dictionaries become dicts keyed by name, arrays lists, strings bytes and
+    indirect references PDFRef.
+    """
+    pos = _skip_whitespace(data, pos)
+    if pos >= len(data):
+        raise PDFError("Unexpected end of data")
+    char = data[pos]
+
+    if data.startswith(b"<<", pos):
+        result = {}
+        pos += 2
+        while True:
+            pos = _skip_whitespace(data, pos)
+            if data.startswith(b">>", pos):
+                return result, pos + 2
+            key, pos = parse_object(data, pos)
+            if not isinstance(key, PDFName):
+                raise PDFError(f"Dictionary key is not a name at byte {pos}")
+            result[key], pos = parse_object(data, pos)
+    if char == ord("["):
+        result = []
+        pos += 1
+        while True:
+            pos = _skip_whitespace(data, pos)
+            if data[pos] == ord("]"):
+                return result, pos + 1
+            item, pos = parse_object(data, pos)
+            result.append(item)
+    if char == ord("/"):
+        match = _TOKEN_END.search(data, pos + 1)
+        end = match.start() if match else len(data)
+        raw = re.sub(rb"#([0-9A-Fa-f]{2})", lambda m: bytes([int(m.group(1), 16)]), data[pos + 1:end])
+        return PDFName(raw.decode("latin-1")), end
+    if char == ord("("):
+        return _parse_literal_string(data, pos)
+    if char == ord("<"):
+        end = data.index(b">", pos)
+        digits = re.sub(rb"\s", b"", data[pos + 1:end])
+        if len(digits) % 2:
+            digits += b"0"
+        return bytes.fromhex(digits.decode("ascii")), end + 1
+
+    match = _TOKEN_END.search(data, pos)
+    end = match.start() if match else len(data)
+    token = data[pos:end]
+    if token == b"true":
+        return True, end
+    if token == b"false":
+        return False, end
+    if token == b"null":
+        return None, end
+    try:
+        if b"." in token:
+            return float(token), end
+        number = int(token)
+    except ValueError:
+        raise PDFError(f"Unexpected token {token[:20]!r} at byte {pos}") from None
+    reference = _REFERENCE.match(data, pos)
+    if reference:
+        return PDFRef(int(reference.group(1)), int(reference.group(2))), reference.end()
+    return number, end
+
+
+def serialize(obj: Any) -> bytes:
+    """Write an object back out in PDF syntax."""
+    if isinstance(obj, bool):
+        return b"true" if obj else b"false"
+    if obj is None:
+        return b"null"
+    if isinstance(obj, PDFName):
+        return b"/" + re.sub(rb"[^!-~]|[()<>\[\]{}/%#]",
+                             lambda m: b"#%02X" % m.group()[0], obj.encode("latin-1"))
+    if isinstance(obj, PDFRef):
+        return b"%d %d R" % obj
+    if isinstance(obj, int):
+        return b"%d" % obj
+    if isinstance(obj, float):
+        return (b"%.6f" % obj).rstrip(b"0").rstrip(b".")
+    if isinstance(obj, (bytes, bytearray)):
+        return b"<" + bytes(obj).hex().upper().encode("ascii") + b">"
+    if isinstance(obj, str):
+        return serialize(encode_text(obj))
+    if isinstance(obj, list):
+        return b"[" + b" ".join(serialize(item) for item in obj) + b"]"
+    if isinstance(obj, dict):
+        return b"<<" + b"".join(serialize(PDFName(key)) + b" " + serialize(value)
+                                for key, value in obj.items()) + b">>"
+    raise PDFError(f"Cannot write {type(obj).__name__} to a PDF")
+
+
+def encode_text(text: str) -> bytes:
+    """Encode a text string: Latin-1 where possible, otherwise UTF-16 with a byte order mark."""
+    try:
+        return text.encode("latin-1")
+    except UnicodeEncodeError:
+        return b"\xfe\xff" + text.encode("utf-16-be")
+
+
+def decode_text(raw: bytes) -> str:
+    if raw.startswith(b"\xfe\xff"):
+        return raw[2:].decode("utf-16-be", errors="replace")
+    return raw.decode("latin-1")
+
+
+def _unpredict(data: bytes, params: Mapping[str, Any]) -> bytes:
+    """Undo PNG row predictors (Predictor 10-15), as used by cross-reference streams."""
+    predictor = params.get("Predictor", 1)
+    if predictor < 10:
+        if predictor != 1:
+            raise PDFError(f"Unsupported predictor {predictor}")
+        return data
+    columns = params.get("Columns", 1) * params.get("Colors", 1) * params.get("BitsPerComponent", 8) // 8
+    bpp = max(1, params.get("Colors", 1) * params.get("BitsPerComponent", 8) // 8)
+    output = bytearray()
+    previous = bytearray(columns)
+    for start in range(0, len(data), columns + 1):
+        kind = data[start]
+        row = bytearray(data[start + 1:start + 1 + columns])
+        for i in range(len(row)):
+            left = row[i - bpp] if i >= bpp else 0
+            up = previous[i]
+            if kind == 1:
+                row[i] = (row[i] + left) & 0xFF
+            elif kind == 2:
+                row[i] = (row[i] + up) & 0xFF
+            elif kind == 3:
+                row[i] = (row[i] + (left + up) // 2) & 0xFF
+            elif kind == 4:
+                upper_left = previous[i - bpp] if i >= bpp else 0
+                estimate = left + up - upper_left
+                pa, pb, pc = abs(estimate - left), abs(estimate - up), abs(estimate - upper_left)
+                row[i] = (row[i] + (left if pa <= pb and pa <= pc else up if pb <= pc else upper_left)) & 0xFF
+        output += row
+        previous = row
+    return bytes(output)
+
+
+def decode_stream(stream: Mapping[str, Any], raw: bytes) -> bytes:
+    """Decode a stream's data (FlateDecode with optional predictors only)."""
+    filters = stream.get("Filter") or []
+    params = stream.get("DecodeParms") or {}
+    if isinstance(filters, str):
+        filters, params = [filters], [params]
+    elif not isinstance(params, list):
+        params = [params]
+    data = raw
+    for index, name in enumerate(filters):
+        if name != "FlateDecode":
+            raise PDFError(f"Unsupported stream filter {name}")
+        data = zlib.decompress(data)
+        if index < len(params) and params[index]:
+            data = _unpredict(data, params[index])
+    return data
+
+
+# --- Document access ------------------------------------------------------
+
+class PDFDocument:
+    """Read-only access to the objects of a PDF file.
+
+    Supports classic cross-reference tables and cross-reference/object streams;
+    encrypted files are rejected.
+    """
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self._offsets: Dict[int, Tuple[int, ...]] = {}
+        self._cache: Dict[int, Any] = {}
+        self._object_streams: Dict[int, Dict[int, Any]] = {}
+
+        start = data.rfind(b"startxref")
+        if start < 0:
+            raise PDFError("Not a PDF file (no startxref)")
+        self.startxref = int(data[start + 9:].split()[0])
+        self.trailer: Dict[str, Any] = {}
+        self._read_xref_chain(self.startxref)
+        if "Encrypt" in self.trailer:
+            raise PDFError("Encrypted PDFs are not supported")
+
+    def _read_xref_chain(self, offset: Optional[int]):
+        seen = set()
+        while offset is not None and offset not in seen:
+            seen.add(offset)
+            if self.data.startswith(b"xref", _skip_whitespace(self.data, offset)):
+                trailer = self._read_xref_table(offset)
+            else:
+                trailer = self._read_xref_stream(offset)
+            for key, value in trailer.items():
+                self.trailer.setdefault(key, value)
+            if "XRefStm" in trailer:
+                self._read_xref_stream(trailer["XRefStm"])
+            offset = trailer.get("Prev")
+
+    def _read_xref_table(self, offset: int) -> Dict[str, Any]:
+        pos = _skip_whitespace(self.data, offset) + 4
+        while True:
+            pos = _skip_whitespace(self.data, pos)
+            if self.data.startswith(b"trailer", pos):
+                trailer, _ = parse_object(self.data, pos + 7)
+                return trailer
+            header = re.compile(rb"(\d+)\s+(\d+)").match(self.data, pos)
+            if not header:
+                raise PDFError(f"Bad cross-reference table at byte {pos}")
+            first, count = int(header.group(1)), int(header.group(2))
+            pos = _skip_whitespace(self.data, header.end())
+            for number in range(first, first + count):
+                entry = self.data[pos:pos + 20].split()
+                if entry[2] == b"n":
+                    self._offsets.setdefault(number, (1, int(entry[0])))
+                else:
+                    self._offsets.setdefault(number, (0,))
+                pos += 20
+
+    def _read_xref_stream(self, offset: int) -> Dict[str, Any]:
+        _, stream, payload = self._parse_indirect(offset)
+        if stream.get("Type") != "XRef":
+            raise PDFError(f"No cross-reference section at byte {offset}")
+        widths = stream["W"]
+        index = stream.get("Index", [0, stream["Size"]])
+        row_size = sum(widths)
+        pos = 0
+        for first, count in zip(index[::2], index[1::2]):
+            for number in range(first, first + count):
+                fields = []
+                for width in widths:
+                    fields.append(int.from_bytes(payload[pos:pos + width], "big") if width else None)
+                    pos += width
+                kind = 1 if fields[0] is None else fields[0]
+                if kind == 1:
+                    self._offsets.setdefault(number, (1, fields[1]))
+                elif kind == 2:
+                    self._offsets.setdefault(number, (2, fields[1], fields[2]))
+                else:
+                    self._offsets.setdefault(number, (0,))
+        if pos > len(payload) or len(payload) < row_size * sum(index[1::2]):
+            raise PDFError("Truncated cross-reference stream")
+        return stream
+
+    def _parse_indirect(self, offset: int) -> Tuple[int, Any, Optional[bytes]]:
+        """Parse "N G obj ... endobj" at offset, returning (N, object, decoded stream data)."""
+        header = re.compile(rb"\s*(\d+)\s+(\d+)\s+obj").match(self.data, offset)
+        if not header:
+            raise PDFError(f"No object at byte {offset}")
+        obj, pos = parse_object(self.data, header.end())
+        pos = _skip_whitespace(self.data, pos)
+        payload = None
+        if isinstance(obj, dict) and self.data.startswith(b"stream", pos):
+            pos += 6
+            if self.data.startswith(b"\r\n", pos):
+                pos += 2
+            elif self.data[pos:pos + 1] in (b"\n", b"\r"):
+                pos += 1
+            length = self.resolve(obj["Length"])
+            payload = decode_stream(obj, self.data[pos:pos + length])
+        return int(header.group(1)), obj, payload
+
+    def _object_stream(self, number: int) -> Dict[int, Any]:
+        if number not in self._object_streams:
+            _, stream, payload = self._parse_indirect(self._offsets[number][1])
+            header = payload[:stream["First"]].split()
+            objects = {}
+            for i in range(0, len(header), 2):
+                objects[int(header[i])], _ = parse_object(payload, stream["First"] + int(header[i + 1]))
+            self._object_streams[number] = objects
+        return self._object_streams[number]
+
+    def get(self, number: int) -> Any:
+        """Get an object by number (stream objects return their dictionary)."""
+        if number not in self._cache:
+            entry = self._offsets.get(number, (0,))
+            if entry[0] == 1:
+                self._cache[number] = self._parse_indirect(entry[1])[1]
+            elif entry[0] == 2:
+                self._cache[number] = self._object_stream(entry[1]).get(number)
+            else:
+                self._cache[number] = None
+        return self._cache[number]
+
+    def resolve(self, obj: Any) -> Any:
+        while isinstance(obj, PDFRef):
+            obj = self.get(obj.num)
+        return obj
+
+    @property
+    def size(self) -> int:
+        return max(self.trailer.get("Size", 0), max(self._offsets, default=0) + 1)
+
+
+# --- Form filling ---------------------------------------------------------
+
+class FormField:
+    """A terminal form field and the widget annotations that display it."""
+
+    __slots__ = ("name", "ref", "kind", "on_state", "widgets", "page", "rect")
+
+    def __init__(self, name: str, ref: PDFRef, kind: str, on_state: Optional[str],
+                 widgets: List[PDFRef], page: Optional[int], rect: List[float]):
+        self.name = name
+        self.ref = ref
+        self.kind = kind
+        self.on_state = on_state
+        self.widgets = widgets
+        self.page = page
+        self.rect = rect
+
+
+class SheetTemplate:
+    """A parsed fillable PDF: its form fields by name and everything needed to fill it.
+
+    Filling never rewrites the template. The filled copy is the original bytes
+    plus an incremental update holding only the changed field objects, the
+    AcroForm (with NeedAppearances set so viewers draw the new values) and a
+    cross-reference stream.
+    """
+
+    def __init__(self, data: bytes):
+        self.document = PDFDocument(data)
+        root = self.document.resolve(self.document.trailer["Root"])
+        if "AcroForm" not in root:
+            raise PDFError("PDF has no form fields")
+        self.acroform_ref = root["AcroForm"]
+        pages = self.document.resolve(root["Pages"])
+        self._page_numbers = {ref.num: index for index, ref in enumerate(self._page_refs(pages))}
+        self.fields: Dict[str, FormField] = {}
+        self._checkboxes_beside: Optional[Dict[str, str]] = None
+        self._serialized: Dict[PDFRef, Dict[str, bytes]] = {}
+        acroform = self.document.resolve(self.acroform_ref)
+        for ref in self.document.resolve(acroform.get("Fields", [])):
+            self._collect(ref, "", None)
+
+    @classmethod
+    def from_file(cls, path: str) -> 'SheetTemplate':
+        with open(path, 'rb') as f:
+            return cls(f.read())
+
+    def _page_refs(self, node: Mapping[str, Any]) -> List[PDFRef]:
+        refs = []
+        for kid in self.document.resolve(node.get("Kids", [])):
+            child = self.document.resolve(kid)
+            refs.extend(self._page_refs(child) if child.get("Type") == "Pages" else [kid])
+        return refs
+
+    def _collect(self, ref: PDFRef, prefix: str, inherited_kind: Optional[str]):
+        field = self.document.resolve(ref)
+        name = prefix
+        if "T" in field:
+            name = f"{prefix}.{decode_text(field['T'])}" if prefix else decode_text(field["T"])
+        kind = field.get("FT", inherited_kind)
+        kids = [kid for kid in self.document.resolve(field.get("Kids", []))]
+        if any("T" in self.document.resolve(kid) for kid in kids):
+            for kid in kids:
+                self._collect(kid, name, kind)
+            return
+
+        widgets = kids or [ref]
+        first = self.document.resolve(widgets[0])
+        on_state = None
+        if kind == "Btn":
+            for widget in widgets:
+                appearances = self.document.resolve(self.document.resolve(widget).get("AP", {}))
+                states = [state for state in self.document.resolve(appearances.get("N", {})) if state != "Off"]
+                if states:
+                    on_state = states[0]
+                    break
+        page = first.get("P")
+        self.fields[name] = FormField(
+            name=name, ref=ref, kind=kind, on_state=on_state, widgets=widgets,
+            page=self._page_numbers.get(page.num) if isinstance(page, PDFRef) else None,
+            rect=[float(x) for x in self.document.resolve(first.get("Rect", [0, 0, 0, 0]))])
+
+    def checkbox_beside(self, name: str) -> Optional[str]:
+        """Name of the checkbox drawn just left of a text field on the same line, if any."""
+        if self._checkboxes_beside is None:
+            boxes = [field for field in self.fields.values() if field.kind == "Btn" and field.on_state]
+            self._checkboxes_beside = {}
+            for field in self.fields.values():
+                if field.kind != "Tx":
+                    continue
+                middle = (field.rect[1] + field.rect[3]) / 2
+                beside = [box for box in boxes if box.page == field.page
+                          and abs((box.rect[1] + box.rect[3]) / 2 - middle) < 4
+                          and field.rect[0] - 12 < box.rect[2] <= field.rect[0] + 2]
+                if beside:
+                    self._checkboxes_beside[field.name] = max(beside, key=lambda box: box.rect[2]).name
+        return self._checkboxes_beside.get(name)
+
+    def fill(self, values: Mapping[str, Any]) -> bytes:
+        """Get a copy of the PDF with fields filled.
+
+        Text fields take any value (converted with str); checkboxes take a bool.
+        Unknown field names raise PDFError.
+        """
+        unknown = [name for name in values if name not in self.fields]
+        if unknown:
+            raise PDFError(f"Unknown form field(s): {', '.join(unknown)}")
+        # Per object, the entries to replace (None removes the entry)
+        changes: Dict[PDFRef, Dict[str, Any]] = {}
+        for name, value in values.items():
+            field = self.fields[name]
+            if field.kind == "Btn":
+                if field.on_state is None:
+                    continue  # Push buttons (image fields) have no value
+                state = PDFName(field.on_state if value else "Off")
+                changes.setdefault(field.ref, {})["V"] = state
+                for widget in field.widgets:
+                    changes.setdefault(widget, {})["AS"] = state
+            else:
+                changes.setdefault(field.ref, {})["V"] = "" if value is None else str(value)
+                for widget in field.widgets:
+                    # Let the viewer draw the new value instead of the template's blank appearance
+                    changes.setdefault(widget, {})["AP"] = None
+
+        if not isinstance(self.acroform_ref, PDFRef):
+            raise PDFError("Inline AcroForm dictionaries are not supported")
+        changes.setdefault(self.acroform_ref, {})["NeedAppearances"] = True
+        return self._incremental_update({ref: self._object_bytes(ref, entries) for ref, entries in changes.items()})
+
+    def _object_bytes(self, ref: PDFRef, changes: Mapping[str, Any]) -> bytes:
+        """Serialize a dictionary object with some entries replaced; the untouched
+        entries are serialized once and reused across fills."""
+        entries = self._serialized.get(ref)
+        if entries is None:
+            obj = self.document.resolve(ref)
+            if not isinstance(obj, dict):
+                raise PDFError(f"Object {ref.num} is not a dictionary")
+            entries = self._serialized[ref] = {key: serialize(PDFName(key)) + b" " + serialize(value)
+                                               for key, value in obj.items()}
+        return b"<<" + b"".join(entry for key, entry in entries.items() if key not in changes) + b"".join(
+            serialize(PDFName(key)) + b" " + serialize(value) for key, value in changes.items()
+            if value is not None) + b">>"
+
+    def _incremental_update(self, objects: Mapping[PDFRef, bytes]) -> bytes:
+        base = self.document.data
+        output = bytearray(base)
+        if not base.endswith((b"\n", b"\r")):
+            output += b"\n"
+        offsets = {}
+        for ref in sorted(objects):
+            offsets[ref.num] = (len(output), ref.gen)
+            output += b"%d %d obj\n" % ref + objects[ref] + b"\nendobj\n"
+
+        xref_number = self.document.size
+        offsets[xref_number] = (len(output), 0)
+        numbers = sorted(offsets)
+        index: List[int] = []
+        for number in numbers:
+            if index and index[-2] + index[-1] == number:
+                index[-1] += 1
+            else:
+                index += [number, 1]
+        rows = b"".join(b"\x01" + offsets[number][0].to_bytes(4, "big") + offsets[number][1].to_bytes(2, "big")
+                        for number in numbers)
+        payload = zlib.compress(rows)
+        trailer = {"Type": PDFName("XRef"), "Size": xref_number + 1, "Index": index,
+                   "W": [1, 4, 2], "Prev": self.document.startxref, "Filter": PDFName("FlateDecode"),
+                   "Length": len(payload)}
+        for key in ("Root", "Info", "ID"):
+            if key in self.document.trailer:
+                trailer[key] = self.document.trailer[key]
+        output += (b"%d 0 obj\n" % xref_number + serialize(trailer) + b"\nstream\n"
+                   + payload + b"\nendstream\nendobj\n")
+        output += b"startxref\n%d\n%%%%EOF\n" % offsets[xref_number][0]
+        return bytes(output)
+
+
+_templates: Dict[str, Tuple[Tuple[int, int], SheetTemplate]] = {}
+
+
+def load_template(path: str = TEMPLATE_PATH) -> SheetTemplate:
+    """Get the parsed template, reading and parsing the file only once per process
+    (again if the file changes)."""
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    key = (stat.st_size, stat.st_mtime_ns)
+    cached = _templates.get(path)
+    if cached is None or cached[0] != key:
+        cached = _templates[path] = (key, SheetTemplate.from_file(path))
+    return cached[1]
+
+
+# --- Character sheet field map ----------------------------------------------
+
+# Field names as they appear in 5E_CharacterSheet_Fillable.pdf, stray spaces included
+ABILITY_FIELDS = {
+    "strength": ("STR", "STRmod"), "dexterity": ("DEX", "DEXmod "),
+    "constitution": ("CON", "CONmod"), "intelligence": ("INT", "INTmod"),
+    "wisdom": ("WIS", "WISmod"), "charisma": ("CHA", "CHamod")
+}
+
+# (modifier field, proficiency checkbox)
+SAVE_FIELDS = {
+    "strength": ("ST Strength", "Check Box 11"), "dexterity": ("ST Dexterity", "Check Box 18"),
+    "constitution": ("ST Constitution", "Check Box 19"), "intelligence": ("ST Intelligence", "Check Box 20"),
+    "wisdom": ("ST Wisdom", "Check Box 21"), "charisma": ("ST Charisma", "Check Box 22")
+}
+
+SKILL_FIELDS = {
+    "acrobatics": ("Acrobatics", "Check Box 23"), "animal_handling": ("Animal", "Check Box 24"),
+    "arcana": ("Arcana", "Check Box 25"), "athletics": ("Athletics", "Check Box 26"),
+    "deception": ("Deception ", "Check Box 27"), "history": ("History ", "Check Box 28"),
+    "insight": ("Insight", "Check Box 29"), "intimidation": ("Intimidation", "Check Box 30"),
+    "investigation": ("Investigation ", "Check Box 31"), "medicine": ("Medicine", "Check Box 32"),
+    "nature": ("Nature", "Check Box 33"), "perception": ("Perception ", "Check Box 34"),
+    "performance": ("Performance", "Check Box 35"), "persuasion": ("Persuasion", "Check Box 36"),
+    "religion": ("Religion", "Check Box 37"), "sleight_of_hand": ("SleightofHand", "Check Box 38"),
+    "stealth": ("Stealth ", "Check Box 39"), "survival": ("Survival", "Check Box 40")
+}
+
+SLOT_LEVELS = ["1st", "2nd", "3rd", "4th", "5th", "6th", "7th", "8th", "9th"]
+
+# (total, remaining) fields for each spell slot level
+SLOT_FIELDS = {level: (f"SlotsTotal {19 + i}", f"SlotsRemaining {19 + i}") for i, level in enumerate(SLOT_LEVELS)}
+
+
+def _spell_lines(*numbers) -> List[str]:
+    lines = []
+    for number in numbers:
+        lines.extend(f"Spells {n}" for n in number) if isinstance(number, range) else lines.append(f"Spells {number}")
+    return lines
+
+
+# Spell name lines for cantrips and levels 1-9, top to bottom
+SPELL_LINES = [
+    _spell_lines(1014, range(1016, 1023)),
+    _spell_lines(1015, range(1023, 1034)),
+    _spell_lines(1046, range(1034, 1046)),
+    _spell_lines(1048, 1047, range(1049, 1060)),
+    _spell_lines(1061, 1060, range(1062, 1073)),
+    _spell_lines(1074, 1073, range(1075, 1082)),
+    _spell_lines(1083, 1082, range(1084, 1091)),
+    _spell_lines(1092, 1091, range(1093, 1100)),
+    _spell_lines(10101, 10100, range(10102, 10107)),
+    _spell_lines(10108, 10107, 10109, 101010, 101011, 101012, 101013)
+]
+
+
+def _spells_by_level(names: Iterable[str]) -> List[List[str]]:
+    """Group spell names by level; spells missing from the compendium count as 1st level."""
+    from spells import get_spell_compendium
+    compendium = get_spell_compendium()
+    levels: List[List[str]] = [[] for _ in SPELL_LINES]
+    for name in names:
+        spell = compendium.get(name)
+        levels[spell.level if spell else 1].append(spell.name if spell else name)
+    return levels
+
+
+def sheet_values(character, template: Optional[SheetTemplate] = None) -> Dict[str, Any]:
+    """Map a character onto the character sheet's form fields.
+
+    Spells that do not fit on their level's lines are left off; prepared spells
+    are ticked when the template has a checkbox beside the line.
+    """
+    def signed(value: int) -> str:
+        return f"{value:+d}"
+
+    character_class, level = character.character_class, character.level
+    if not character_class:
+        # Older records hold "Ranger 2" in class_level; their level attribute is only the default
+        character_class, level = record_class_level({"class_level": getattr(character, "class_level", "")})
+        level = level if character_class else character.level
+    values: Dict[str, Any] = {
+        "CharacterName": character.name,
+        "CharacterName 2": character.name,
+        "ClassLevel": " ".join(part for part in (character_class, character.subclass and f"({character.subclass})",
+                                                 str(level)) if part),
+        "Background": character.background,
+        "PlayerName": character.player_name,
+        "Race ": character.race,
+        "Alignment": character.alignment,
+        "XP": character.experience_points,
+        "ProfBonus": signed(character.proficiency_bonus),
+        "AC": character.armor_class,
+        "Initiative": signed(character.initiative),
+        "Speed": character.speed,
+        "HPMax": character.hit_point_maximum,
+        "HPCurrent": character.current_hit_points,
+        "HPTemp": character.temporary_hit_points or "",
+        "HDTotal": character.hit_dice,
+        "HD": f"{character.get_hit_dice_remaining()} left",
+        "Passive": 10 + character.get_skill_modifier("perception"),
+        "ProficienciesLang": "\n".join(filter(None, [
+            "Languages: " + ", ".join(character.languages) if character.languages else "",
+            ", ".join(character.other_proficiencies)])),
+        "Features and Traits": "\n".join(list(character.features_and_traits) + [
+            ability if isinstance(ability, str) else str(ability.get("name", ability))
+            for ability in character.custom_abilities])
+    }
+    for ability, (score_field, modifier_field) in ABILITY_FIELDS.items():
+        score = getattr(character, ability)
+        values[score_field] = score
+        values[modifier_field] = signed(character.get_ability_modifier(score))
+    for ability, (modifier_field, checkbox) in SAVE_FIELDS.items():
+        values[modifier_field] = signed(character.get_saving_throw_modifier(ability))
+        values[checkbox] = bool(character.saving_throws[ability])
+    for skill, (modifier_field, checkbox) in SKILL_FIELDS.items():
+        values[modifier_field] = signed(character.get_skill_modifier(skill))
+        values[checkbox] = bool(character.skills[skill])
+
+    if character.spellcasting_class:
+        values.update({
+            "Spellcasting Class 2": character.spellcasting_class,
+            "SpellcastingAbility 2": character.spellcasting_ability.capitalize(),
+            "SpellSaveDC  2": character.spell_save_dc,
+            "SpellAtkBonus 2": signed(character.spell_attack_bonus)
+        })
+        for level, (total_field, remaining_field) in SLOT_FIELDS.items():
+            total = character.spell_slots.get(level, 0)
+            if total:
+                values[total_field] = total
+                values[remaining_field] = total - character.spell_slots_expended.get(level, 0)
+
+        prepared = {name.lower() for name in character.spells_prepared}
+        known = list(character.spells_known) + [name for name in character.spells_prepared
+                                                if name not in character.spells_known]
+        for lines, names in zip(SPELL_LINES, _spells_by_level(known)):
+            for line, name in zip(lines, names):
+                values[line] = name
+                checkbox = template.checkbox_beside(line) if template else None
+                if checkbox and name.lower() in prepared:
+                    values[checkbox] = True
+    return values
+
+
+# --- Export -------------------------------------------------------------------
+
+def sheet_filename(name: str) -> str:
+    """A safe file name for a character's sheet."""
+    return (re.sub(r"[^\w\- ]+", "_", name).strip() or "character") + ".pdf"
+
+
+def write_sheet(values: Mapping[str, Any], path: str, template_path: str = TEMPLATE_PATH) -> str:
+    """Fill the template with field values and write it to path."""
+    data = load_template(template_path).fill(values)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return path
+
+
+def export_character_sheet(character, path: str, template_path: str = TEMPLATE_PATH) -> str:
+    """Write one character's filled sheet to path."""
+    return write_sheet(sheet_values(character, load_template(template_path)), path, template_path)
+
+
+def _write_job(job) -> str:
+    """Process pool entry point."""
+    return write_sheet(*job)
+
+
+def export_character_sheets(characters: Iterable[Any], output_dir: str, workers: Optional[int] = None,
+                            template_path: str = TEMPLATE_PATH) -> List[str]:
+    """Write a filled sheet per character into output_dir, returning the paths in order.
+
+    Field values are worked out here; filling and writing the PDFs is spread
+    over worker processes that each parse the template once.
+    """
+    template = load_template(template_path)
+    os.makedirs(output_dir, exist_ok=True)
+    jobs = []
+    used = set()
+    for character in characters:
+        filename = sheet_filename(character.name)
+        stem, number = filename[:-4], 2
+        while filename.lower() in used:
+            filename, number = f"{stem} {number}.pdf", number + 1
+        used.add(filename.lower())
+        jobs.append((sheet_values(character, template), os.path.join(output_dir, filename), template_path))
+
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(jobs) <= 1:
+        return [_write_job(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs)), initializer=load_template,
+                             initargs=(template_path,)) as executor:
+        return list(executor.map(_write_job, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
@@ -0,0 +1,129 @@
+"""
+D&D 5E Proficiencies
+Bitmask-backed skill and saving throw proficiencies, and party-wide modifier matrices.
+"""
+
+from collections.abc import MutableMapping
+from typing import Any, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+from dice import numpy_module
+
+ABILITIES = ("strength", "dexterity", "constitution", "intelligence", "wisdom", "charisma")
+
+SKILL_ABILITIES = {
+    "acrobatics": "dexterity", "animal_handling": "wisdom",
+    "arcana": "intelligence", "athletics": "strength",
+    "deception": "charisma", "history": "intelligence",
+    "insight": "wisdom", "intimidation": "charisma",
+    "investigation": "intelligence", "medicine": "wisdom",
+    "nature": "intelligence", "perception": "wisdom",
+    "performance": "charisma", "persuasion": "charisma",
+    "religion": "intelligence", "sleight_of_hand": "dexterity",
+    "stealth": "dexterity", "survival": "wisdom"
+}
+
+SKILLS = tuple(sorted(SKILL_ABILITIES))
+
+# Column of each skill's ability in an N x 6 ability matrix
+SKILL_ABILITY_INDEX = tuple(ABILITIES.index(SKILL_ABILITIES[skill]) for skill in SKILLS)
+
+
+class ProficiencySet(MutableMapping):
+    """Proficiency flags for a fixed set of names, stored as one integer bitmask.
+
+    Behaves like the {name: bool} dict it replaces, so existing lookups,
+    assignments and iteration keep working; mask exposes the raw bits.
+    """
+
+    __slots__ = ("names", "mask", "_bits")
+
+    def __init__(self, names: Sequence[str], mask: int = 0):
+        self.names = tuple(names)
+        self.mask = mask
+        self._bits = {name: 1 << i for i, name in enumerate(self.names)}
+
+    @classmethod
+    def from_dict(cls, names: Sequence[str], flags: Optional[Mapping[str, Any]]) -> 'ProficiencySet':
+        """Build from a {name: bool} mapping; unknown names are ignored."""
+        proficiencies = cls(names)
+        for name, proficient in (flags or {}).items():
+            if proficient and name in proficiencies._bits:
+                proficiencies.mask |= proficiencies._bits[name]
+        return proficiencies
+
+    def to_dict(self) -> dict:
+        return {name: bool(self.mask & bit) for name, bit in self._bits.items()}
+
+    def __getitem__(self, name: str) -> bool:
+        return bool(self.mask & self._bits[name])
+
+    def __setitem__(self, name: str, proficient: bool):
+        bit = self._bits[name]
+        self.mask = self.mask | bit if proficient else self.mask & ~bit
+
+    def __delitem__(self, name: str):
+        raise TypeError("Proficiency names are fixed")
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.names)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, name) -> bool:
+        return name in self._bits
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, ProficiencySet):
+            return self.names == other.names and self.mask == other.mask
+        return super().__eq__(other)
+
+    def __getstate__(self):
+        return (self.names, self.mask)
+
+    def __setstate__(self, state):
+        self.__init__(*state)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({[name for name in self.names if self[name]]})"
+
+
+def skill_proficiencies(flags: Optional[Mapping[str, Any]] = None) -> ProficiencySet:
+    return ProficiencySet.from_dict(SKILLS, flags)
+
+
+def save_proficiencies(flags: Optional[Mapping[str, Any]] = None) -> ProficiencySet:
+    return ProficiencySet.from_dict(ABILITIES, flags)
+
+
+def party_modifier_matrices(characters: Iterable[Any]) -> Tuple[Any, Any]:
+    """Compute skill (N x 18, columns in SKILLS order) and saving throw (N x 6)
+    modifiers for many characters at once.
+
+    Returns NumPy arrays when NumPy is installed, otherwise lists of rows.
+    """
+    characters = list(characters)
+    scores = [[getattr(char, ability) for ability in ABILITIES] for char in characters]
+    proficiency = [char.proficiency_bonus for char in characters]
+    skill_masks = [char.skills.mask for char in characters]
+    save_masks = [char.saving_throws.mask for char in characters]
+
+    np = numpy_module()
+    if np is not None:
+        modifiers = (np.array(scores, dtype=np.int64).reshape(len(characters), len(ABILITIES)) - 10) // 2
+        bonus = np.array(proficiency, dtype=np.int64)[:, None]
+        skill_bits = (np.array(skill_masks, dtype=np.int64)[:, None] >> np.arange(len(SKILLS))) & 1
+        save_bits = (np.array(save_masks, dtype=np.int64)[:, None] >> np.arange(len(ABILITIES))) & 1
+        skills = modifiers[:, list(SKILL_ABILITY_INDEX)] + skill_bits * bonus
+        saves = modifiers + save_bits * bonus
+        return skills, saves
+
+    skills: List[List[int]] = []
+    saves: List[List[int]] = []
+    for row, bonus, skill_mask, save_mask in zip(scores, proficiency, skill_masks, save_masks):
+        modifiers = [(score - 10) // 2 for score in row]
+        skills.append([modifiers[ability] + (bonus if skill_mask >> i & 1 else 0)
+                       for i, ability in enumerate(SKILL_ABILITY_INDEX)])
+        saves.append([modifiers[i] + (bonus if save_mask >> i & 1 else 0)
+                      for i in range(len(ABILITIES))])
+    return skills, saves
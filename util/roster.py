@@ -0,0 +1,306 @@
+"""
+D&D 5E Roster Queries
+Secondary and bitmap indexes over raw character records for filter, sort and group-by queries.
+"""
+
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+from proficiencies import ABILITIES, SKILLS
+from roster_codecs import read_file
+
+INDEXED_FIELDS = ("character_class", "subclass", "race", "spellcasting_ability", "level")
+
+# Short names accepted by parse_query
+FIELD_ALIASES = {
+    "class": "character_class", "sub": "subclass", "ability": "spellcasting_ability",
+    "casting": "spellcasting_ability", "lvl": "level"
+}
+
+
+def expand_ability(name: str) -> str:
+    """Expand an ability abbreviation ("wis" -> "wisdom"); unknown names pass through."""
+    name = name.strip().lower()
+    if len(name) >= 3:
+        for ability in ABILITIES:
+            if ability.startswith(name[:3]):
+                return ability
+    return name
+
+
+def record_class_level(record: Mapping[str, Any]) -> Tuple[str, int]:
+    """Get (class, level) from a record, falling back to the old "Ranger 2" class_level field."""
+    character_class = record.get("character_class")
+    level = record.get("level")
+    if not character_class and record.get("class_level"):
+        parts = str(record["class_level"]).rsplit(" ", 1)
+        character_class = parts[0]
+        if level is None and len(parts) == 2 and parts[1].isdigit():
+            level = int(parts[1])
+    return character_class or "", int(level) if level is not None else 1
+
+
+def record_values(record: Mapping[str, Any]) -> Dict[str, Any]:
+    """Get a record's indexed field values, with class and level resolved as record_class_level does."""
+    character_class, level = record_class_level(record)
+    return {
+        "character_class": character_class,
+        "subclass": record.get("subclass", ""),
+        "race": record.get("race", ""),
+        "spellcasting_ability": record.get("spellcasting_ability", ""),
+        "level": level
+    }
+
+
+def _key(value: Any) -> Any:
+    return value.strip().lower() if isinstance(value, str) else value
+
+
+def record_matches(record: Mapping[str, Any], character_class=None, subclass=None, race=None,
+                   spellcasting_ability=None, level=None, min_level: Optional[int] = None,
+                   max_level: Optional[int] = None, skills: Iterable[str] = (),
+                   saving_throws: Iterable[str] = ()) -> bool:
+    """Check one record against the same filters as RosterIndex.filter, for rosters streamed rather than indexed."""
+    values = record_values(record)
+    if spellcasting_ability is not None:
+        abilities = [spellcasting_ability] if isinstance(spellcasting_ability, str) else spellcasting_ability
+        spellcasting_ability = [expand_ability(a) for a in abilities]
+    for field, wanted in (("character_class", character_class), ("subclass", subclass), ("race", race),
+                          ("level", level), ("spellcasting_ability", spellcasting_ability)):
+        if wanted is None:
+            continue
+        if isinstance(wanted, (str, int)):
+            wanted = [wanted]
+        if values[field] in ("", None) or _key(values[field]) not in {_key(value) for value in wanted}:
+            return False
+    if min_level is not None and values["level"] < min_level:
+        return False
+    if max_level is not None and values["level"] > max_level:
+        return False
+    proficient = record.get("skills") or {}
+    if not all(proficient.get(skill.strip().lower().replace(" ", "_")) for skill in skills):
+        return False
+    saves = record.get("saving_throws") or {}
+    return all(saves.get(expand_ability(ability)) for ability in saving_throws)
+
+
+def _iter_bits(bitmap: int) -> Iterator[int]:
+    """Yield the row numbers set in a bitmap, lowest first."""
+    while bitmap:
+        low = bitmap & -bitmap
+        yield low.bit_length() - 1
+        bitmap ^= low
+
+
+class RosterIndex:
+    """Query index over character records (the dicts stored in characters.json).
+
+    Every indexed value maps to an integer bitmap with one bit per record, so
+    filters are a handful of AND/OR operations and only matching records are
+    ever touched. Removed records are cleared from the live bitmap and their
+    bits ignored.
+    """
+
+    def __init__(self, records: Optional[Mapping[str, Mapping[str, Any]]] = None):
+        self._names: List[str] = []
+        self._records: List[Mapping[str, Any]] = []
+        self._rows: Dict[str, int] = {}
+        self._live = 0
+        self._fields: Dict[str, Dict[Any, int]] = {field: {} for field in INDEXED_FIELDS}
+        self._labels: Dict[str, Dict[Any, Any]] = {field: {} for field in INDEXED_FIELDS}
+        self._skills: Dict[str, int] = {skill: 0 for skill in SKILLS}
+        self._saves: Dict[str, int] = {ability: 0 for ability in ABILITIES}
+        for name, record in (records or {}).items():
+            self.add(name, record)
+
+    @classmethod
+    def from_file(cls, data_file: str) -> 'RosterIndex':
+        """Index a roster file (in any roster_codecs format) without creating Character objects."""
+        return cls(read_file(data_file)[0])
+
+    def __len__(self) -> int:
+        return bin(self._live).count("1")
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._rows
+
+    _key = staticmethod(_key)
+    _values = staticmethod(record_values)
+
+    def add(self, name: str, record: Mapping[str, Any]) -> None:
+        """Index a record, replacing any existing record with the same name."""
+        self.remove(name)
+        row = len(self._names)
+        bit = 1 << row
+        self._names.append(name)
+        self._records.append(record)
+        self._rows[name] = row
+        self._live |= bit
+
+        for field, value in self._values(record).items():
+            if value in ("", None):
+                continue
+            key = self._key(value)
+            self._fields[field][key] = self._fields[field].get(key, 0) | bit
+            self._labels[field].setdefault(key, value)
+
+        for skill, proficient in (record.get("skills") or {}).items():
+            if proficient and skill in self._skills:
+                self._skills[skill] |= bit
+        for ability, proficient in (record.get("saving_throws") or {}).items():
+            if proficient and ability in self._saves:
+                self._saves[ability] |= bit
+
+    def remove(self, name: str) -> bool:
+        """Drop a record from query results."""
+        row = self._rows.pop(name, None)
+        if row is None:
+            return False
+        self._live &= ~(1 << row)
+        return True
+
+    def get(self, name: str) -> Optional[Mapping[str, Any]]:
+        row = self._rows.get(name)
+        return self._records[row] if row is not None else None
+
+    def _match(self, field: str, values) -> int:
+        if isinstance(values, (str, int)):
+            values = [values]
+        bitmap = 0
+        for value in values:
+            bitmap |= self._fields[field].get(self._key(value), 0)
+        return bitmap
+
+    def filter(self, character_class=None, subclass=None, race=None, spellcasting_ability=None,
+               level=None, min_level: Optional[int] = None, max_level: Optional[int] = None,
+               skills: Iterable[str] = (), saving_throws: Iterable[str] = ()) -> int:
+        """Get the bitmap of live records matching every given filter.
+
+        Categorical filters take one value or a list of alternatives (matched
+        case-insensitively); skills and saving_throws require proficiency in all
+        of those listed.
+        """
+        bitmap = self._live
+        for field, values in (("character_class", character_class), ("subclass", subclass),
+                              ("race", race), ("level", level)):
+            if values is not None:
+                bitmap &= self._match(field, values)
+        if spellcasting_ability is not None:
+            abilities = [spellcasting_ability] if isinstance(spellcasting_ability, str) else spellcasting_ability
+            bitmap &= self._match("spellcasting_ability", [expand_ability(a) for a in abilities])
+        if min_level is not None or max_level is not None:
+            low = min_level if min_level is not None else 1
+            high = max_level if max_level is not None else 20
+            levels = 0
+            for level_key, level_bitmap in self._fields["level"].items():
+                if low <= level_key <= high:
+                    levels |= level_bitmap
+            bitmap &= levels
+        for skill in skills:
+            bitmap &= self._skills.get(skill.strip().lower().replace(" ", "_"), 0)
+        for ability in saving_throws:
+            bitmap &= self._saves.get(expand_ability(ability), 0)
+        return bitmap
+
+    def _sort_value(self, row: int, field: str) -> Any:
+        if field == "name":
+            value = self._names[row]
+        elif field in ("character_class", "level"):
+            value = self._values(self._records[row])[field]
+        else:
+            value = self._records[row].get(field)
+        value = self._key(value)
+        return (value is None, value if value is not None else 0)
+
+    def find(self, order_by: Optional[str] = None, descending: bool = False,
+             limit: Optional[int] = None, **filters) -> List[str]:
+        """Get names of matching records, optionally sorted by a record field."""
+        rows = list(_iter_bits(self.filter(**filters)))
+        if order_by:
+            rows.sort(key=lambda row: (self._sort_value(row, order_by), self._names[row]), reverse=descending)
+        names = [self._names[row] for row in rows]
+        return names[:limit] if limit is not None else names
+
+    def count(self, **filters) -> int:
+        return bin(self.filter(**filters)).count("1")
+
+    def group_by(self, field: str, order_by: Optional[str] = None,
+                 descending: bool = False, **filters) -> Dict[Any, List[str]]:
+        """Group matching names by a field value; indexed fields are grouped from their bitmaps."""
+        selected = self.filter(**filters)
+        groups: Dict[Any, List[int]] = {}
+        if field in self._fields:
+            for key, bitmap in sorted(self._fields[field].items()):
+                rows = list(_iter_bits(bitmap & selected))
+                if rows:
+                    groups[self._labels[field][key]] = rows
+                    selected &= ~bitmap
+            if selected:
+                groups[""] = list(_iter_bits(selected))
+        else:
+            for row in _iter_bits(selected):
+                value = self._records[row].get(field, "")
+                groups.setdefault(value if isinstance(value, (str, int, float, bool)) else str(value), []).append(row)
+
+        result = {}
+        for value, rows in groups.items():
+            if order_by:
+                rows.sort(key=lambda row: (self._sort_value(row, order_by), self._names[row]), reverse=descending)
+            result[value] = [self._names[row] for row in rows]
+        return result
+
+    def select(self, names: Iterable[str], fields: Iterable[str]) -> List[Dict[str, Any]]:
+        """Project records down to a few fields for display."""
+        fields = list(fields)
+        rows = []
+        for name in names:
+            record = self.get(name)
+            if record is None:
+                continue
+            values = self._values(record)
+            rows.append({field: values[field] if field in values else record.get(field) for field in fields})
+        return rows
+
+
+def parse_query(text: str) -> Dict[str, Any]:
+    """Parse a roster search such as "class=cleric,druid level>=5 skill=perception sort=-level".
+
+    Supports class, subclass, race and ability (spellcasting) with comma-separated
+    alternatives, level=N, level>=N, level<=N, skill=..., save=..., sort=[-]field,
+    group=field and limit=N. Raises ValueError on anything else.
+    """
+    query: Dict[str, Any] = {"filters": {}, "order_by": None, "descending": False,
+                             "group_by": None, "limit": None}
+    filters = query["filters"]
+    for token in text.split():
+        for operator in (">=", "<=", "="):
+            if operator in token:
+                field, value = token.split(operator, 1)
+                break
+        else:
+            raise ValueError(f"Expected field=value, got '{token}'")
+        field = FIELD_ALIASES.get(field.strip().lower(), field.strip().lower())
+        if not value:
+            raise ValueError(f"Missing value for '{field}'")
+
+        if field == "level":
+            number = int(value)
+            key = {">=": "min_level", "<=": "max_level", "=": "level"}[operator]
+            filters[key] = number
+        elif operator != "=":
+            raise ValueError(f"'{operator}' only works with level")
+        elif field in ("character_class", "subclass", "race", "spellcasting_ability"):
+            filters[field] = value.replace("_", " ").split(",")
+        elif field in ("skill", "skills"):
+            filters.setdefault("skills", []).extend(value.split(","))
+        elif field in ("save", "saves", "saving_throw"):
+            filters.setdefault("saving_throws", []).extend(value.split(","))
+        elif field == "sort":
+            query["descending"] = value.startswith("-")
+            query["order_by"] = FIELD_ALIASES.get(value.lstrip("-"), value.lstrip("-"))
+        elif field == "group":
+            query["group_by"] = FIELD_ALIASES.get(value, value)
+        elif field == "limit":
+            query["limit"] = int(value)
+        else:
+            raise ValueError(f"Unknown search field '{field}'")
+    return query
@@ -0,0 +1,100 @@
+"""
+D&D 5E Roster Codecs
+Encodes rosters as readable or compact JSON or binary, optionally gzip or lzma compressed, and detects which on load.
+"""
+
+import gzip
+import io
+import json
+import lzma
+import pickle
+import zlib
+from typing import Any, Optional, Tuple
+
+# A format is an encoding, optionally followed by "+" and a compression: "json", "compact+gzip", "binary+lzma"
+ENCODINGS = ("json", "compact", "binary")
+COMPRESSIONS = ("gzip", "lzma")
+DEFAULT_FORMAT = "json"
+
+# Binary rosters are this header followed by a pickle of plain data (dicts, lists, strings and numbers)
+BINARY_MAGIC = b"DNDROSTER\x01"
+GZIP_MAGIC = b"\x1f\x8b"
+XZ_MAGIC = b"\xfd7zXZ\x00"
+# Pickle protocol 4 reads on every supported Python version
+BINARY_PROTOCOL = 4
+
+
+class CodecError(ValueError):
+    """An unknown format, or data that cannot be decoded."""
+
+
+def parse_format(storage_format: str) -> Tuple[str, Optional[str]]:
+    """Split a format such as "compact+gzip" into its encoding and compression (or None)."""
+    encoding, _, compression = storage_format.strip().lower().partition("+")
+    if encoding not in ENCODINGS or (compression and compression not in COMPRESSIONS):
+        raise CodecError(f"Unknown format '{storage_format}'; use one of {', '.join(ENCODINGS)}, "
+                         f"optionally with +{' or +'.join(COMPRESSIONS)}")
+    return encoding, compression or None
+
+
+def format_name(encoding: str, compression: Optional[str]) -> str:
+    return f"{encoding}+{compression}" if compression else encoding
+
+
+class _DataUnpickler(pickle.Unpickler):
+    """Unpickler for plain data only: it refuses every class and function, so loading cannot run code."""
+
+    def find_class(self, module: str, name: str):
+        raise CodecError(f"Binary roster refers to {module}.{name}; only plain data is allowed")
+
+
+def encode(data: Any, storage_format: str = DEFAULT_FORMAT) -> bytes:
+    """Encode JSON-shaped data in the given format."""
+    encoding, compression = parse_format(storage_format)
+    if encoding == "binary":
+        raw = BINARY_MAGIC + pickle.dumps(data, protocol=BINARY_PROTOCOL)
+    elif encoding == "compact":
+        raw = json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    else:
+        raw = json.dumps(data, indent=2).encode("utf-8")
+    if compression == "gzip":
+        # mtime=0 keeps the output identical for identical rosters
+        return gzip.compress(raw, compresslevel=6, mtime=0)
+    if compression == "lzma":
+        return lzma.compress(raw, preset=6)
+    return raw
+
+
+def decode(raw: bytes) -> Tuple[Any, str]:
+    """Decode data in any supported format, returning it with the format it was in."""
+    compression = "gzip" if raw.startswith(GZIP_MAGIC) else "lzma" if raw.startswith(XZ_MAGIC) else None
+    try:
+        if compression == "gzip":
+            raw = gzip.decompress(raw)
+        elif compression == "lzma":
+            raw = lzma.decompress(raw)
+    except (OSError, EOFError, zlib.error, lzma.LZMAError) as e:
+        raise CodecError(f"Corrupt {compression} data: {e}")
+
+    if raw.startswith(BINARY_MAGIC):
+        try:
+            data = _DataUnpickler(io.BytesIO(raw[len(BINARY_MAGIC):])).load()
+        except CodecError:
+            raise
+        except (pickle.UnpicklingError, EOFError, ValueError, TypeError, IndexError) as e:
+            raise CodecError(f"Corrupt binary roster: {e}")
+        return data, format_name("binary", compression)
+
+    try:
+        data = json.loads(raw)
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        raise CodecError(str(e))
+    # Readable JSON starts "{" then a newline (or is empty); compact JSON runs straight on
+    encoding = "compact" if raw.lstrip()[:2] == b'{"' else "json"
+    return data, format_name(encoding, compression)
+
+
+def read_file(path: str) -> Tuple[Any, str]:
+    """Read and decode a roster file, returning its data and format."""
+    with open(path, 'rb') as f:
+        return decode(f.read())
@@ -0,0 +1,336 @@
+"""
+D&D 5E Roster Streams
+Reads, filters, projects, validates and writes character records one at a time, as JSON Lines or roster files.
+"""
+
+import gzip
+import io
+import json
+import lzma
+import os
+from functools import lru_cache
+from typing import Any, Callable, Dict, FrozenSet, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+from proficiencies import ABILITIES
+from roster import parse_query, record_matches
+from roster_codecs import BINARY_MAGIC, GZIP_MAGIC, XZ_MAGIC, CodecError, read_file
+
+# Files with these endings hold one record per line; anything else is read as a roster
+JSONL_SUFFIXES = (".jsonl", ".ndjson", ".jsonl.gz", ".ndjson.gz", ".jsonl.xz", ".ndjson.xz")
+# Roster text is read this much at a time, and no single record may be larger than the limit
+CHUNK_SIZE = 64 * 1024
+MAX_RECORD_BYTES = 16 * 1024 * 1024
+# Invalid records reported in detail; the rest are only counted, so a bad archive cannot fill memory
+MAX_REPORTED_ERRORS = 20
+
+# Fields a Character only gains once the conditions tracker is used, or that older rosters carry
+OPTIONAL_FIELDS = {"conditions": [], "combat_notes": [], "class_level": ""}
+ABILITY_SCORE_RANGE = (1, 30)
+LEVEL_RANGE = (1, 20)
+
+
+class StreamError(ValueError):
+    """A file that cannot be streamed, or a filter or projection that cannot be applied."""
+
+
+def is_jsonl(path: str) -> bool:
+    return path.lower().endswith(JSONL_SUFFIXES)
+
+
+def _open_binary(path: str):
+    """Open a file for reading, decompressing gzip or lzma transparently."""
+    with open(path, 'rb') as f:
+        head = f.read(len(XZ_MAGIC))
+    if head.startswith(GZIP_MAGIC):
+        return gzip.open(path, 'rb')
+    if head.startswith(XZ_MAGIC):
+        return lzma.open(path, 'rb')
+    return open(path, 'rb')
+
+
+class _ObjectReader:
+    """Walks the top level of one large JSON object, decoding a member value at a time.
+
+    Only the unread part of the current chunk and the member being decoded are
+    held, so memory follows the largest record rather than the whole file.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def _more(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.text.read(CHUNK_SIZE)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        if len(self.buffer) > MAX_RECORD_BYTES:
+            raise StreamError(f"A record is larger than {MAX_RECORD_BYTES // (1024 * 1024)} MB")
+        return True
+
+    def _peek(self) -> str:
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._more():
+                return ""
+
+    def _expect(self, char: str):
+        found = self._peek()
+        if found != char:
+            raise StreamError(f"Expected '{char}' in roster, found {found!r}" if found else
+                              f"Roster ends early; expected '{char}'")
+        self.pos += 1
+
+    def _value(self) -> Any:
+        self._peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError as e:
+                if self._more():
+                    continue
+                raise StreamError(f"Invalid roster JSON: {e}")
+            # A number that ends the chunk may carry on in the next one
+            if end == len(self.buffer) and self._more():
+                continue
+            self.pos = end
+            return value
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        self._expect("{")
+        if self._peek() == "}":
+            return
+        while True:
+            key = self._value()
+            if not isinstance(key, str):
+                raise StreamError("Roster keys must be character names")
+            self._expect(":")
+            yield key, self._value()
+            if self._peek() != ",":
+                self._expect("}")
+                return
+            self.pos += 1
+
+
+def iter_records(path: str) -> Iterator[Tuple[str, Any]]:
+    """Yield (where, record) for each record in a JSON Lines file or a roster, one at a time.
+
+    where says where the record came from ("line 12" or the roster key) for
+    error messages. JSON rosters, compressed or not, are decoded incrementally;
+    binary rosters have to be read whole. Records are not validated here.
+    """
+    if is_jsonl(path):
+        with io.TextIOWrapper(_open_binary(path), encoding='utf-8') as text:
+            for number, line in enumerate(text, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as e:
+                    record = StreamError(f"Invalid JSON: {e}")
+                yield f"line {number}", record
+        return
+
+    with _open_binary(path) as raw:
+        if raw.peek(len(BINARY_MAGIC))[:len(BINARY_MAGIC)] == BINARY_MAGIC:
+            items = read_file(path)[0].items()
+        else:
+            items = _ObjectReader(io.TextIOWrapper(raw, encoding='utf-8')).items()
+        for name, record in items:
+            if isinstance(record, dict) and "name" not in record:
+                record["name"] = name
+            yield repr(name), record
+
+
+@lru_cache(maxsize=1)
+def _schema() -> Dict[str, Tuple[Optional[type], Optional[FrozenSet[str]], Optional[type]]]:
+    """Field -> (type, allowed keys, value type) from a new Character; the last two only for objects."""
+    from character_maker import Character
+    schema = {}
+    for field, default in {**Character().to_dict(), **OPTIONAL_FIELDS}.items():
+        if isinstance(default, dict):
+            item_types = {type(item) for item in default.values()}
+            schema[field] = (dict, frozenset(default), item_types.pop() if len(item_types) == 1 else None)
+        else:
+            schema[field] = (type(default) if default is not None else None, None, None)
+    return schema
+
+
+def validate_record(record: Any) -> List[str]:
+    """List what stops a record loading as a character; empty when it is fine.
+
+    Records may leave fields out (they take Character's defaults, as an
+    export with --fields does), but every field present must be known and of
+    the right type, with levels 1-20 and ability scores 1-30.
+    """
+    if isinstance(record, StreamError):
+        return [str(record)]
+    if not isinstance(record, dict):
+        return [f"Expected an object, not {type(record).__name__}"]
+    problems = []
+    name = record.get("name")
+    if not isinstance(name, str) or not name.strip():
+        problems.append("Missing name")
+    schema = _schema()
+    for field, value in record.items():
+        expected = schema.get(field)
+        if expected is None:
+            problems.append(f"Unknown field '{field}'")
+            continue
+        # Exact types, as JSON produces them, so a bool is never taken for an int
+        kind, keys, item_kind = expected
+        if kind is not None and type(value) is not kind:
+            problems.append(f"'{field}' should be {kind.__name__}, not {type(value).__name__}")
+        elif keys is not None:
+            problems.extend(f"Unknown key '{key}' in '{field}'" for key in value.keys() - keys)
+            if item_kind is not None and set(map(type, value.values())) - {item_kind}:
+                problems.extend(f"'{field}.{key}' should be {item_kind.__name__}, not {type(item).__name__}"
+                                for key, item in value.items() if type(item) is not item_kind)
+    if type(record.get("level")) is int and not LEVEL_RANGE[0] <= record["level"] <= LEVEL_RANGE[1]:
+        problems.append(f"Level {record['level']} is outside {LEVEL_RANGE[0]}-{LEVEL_RANGE[1]}")
+    for ability in ABILITIES:
+        score = record.get(ability)
+        if type(score) is int and not ABILITY_SCORE_RANGE[0] <= score <= ABILITY_SCORE_RANGE[1]:
+            problems.append(f"{ability.capitalize()} {score} is outside "
+                            f"{ABILITY_SCORE_RANGE[0]}-{ABILITY_SCORE_RANGE[1]}")
+    return problems
+
+
+def compile_where(where: Optional[str]) -> Callable[[Mapping[str, Any]], bool]:
+    """Turn a roster search ("class=cleric level>=5 skill=perception") into a per-record test.
+
+    Sorting and grouping need the whole roster, so they are refused; use
+    the limit argument of stream_records instead of limit=.
+    """
+    if not where:
+        return lambda record: True
+    try:
+        query = parse_query(where)
+    except ValueError as e:
+        raise StreamError(str(e))
+    if query["order_by"] or query["group_by"] or query["limit"] is not None:
+        raise StreamError("Streamed searches can only filter; sort=, group= and limit= need the whole roster")
+    filters = query["filters"]
+    return lambda record: record_matches(record, **filters)
+
+
+def project(record: Dict[str, Any], fields: Optional[Sequence[str]]) -> Dict[str, Any]:
+    """Keep only the given fields of a record (and always its name)."""
+    if not fields:
+        return record
+    return {field: record[field] for field in ("name", *fields) if field in record}
+
+
+def _write_atomically(path: str, write: Callable[[Any], int]) -> int:
+    """Write text through a temporary file swapped in at the end, compressing for .gz/.xz paths."""
+    temp_file = f"{path}.tmp"
+    lowered = path.lower()
+    opener = gzip.open if lowered.endswith(".gz") else lzma.open if lowered.endswith(".xz") else open
+    try:
+        with opener(temp_file, 'wt', encoding='utf-8') as f:
+            written = write(f)
+        os.replace(temp_file, path)
+    except BaseException:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        raise
+    return written
+
+
+def write_jsonl(path: str, records: Iterable[Dict[str, Any]]) -> int:
+    """Write records to a JSON Lines file, one compact object per line. Returns the count."""
+    def write(f) -> int:
+        count = 0
+        for record in records:
+            f.write(json.dumps(record, separators=(",", ":"), ensure_ascii=False))
+            f.write("\n")
+            count += 1
+        return count
+    return _write_atomically(path, write)
+
+
+def write_records(path: str, records: Iterable[Dict[str, Any]]) -> int:
+    """Write records as JSON Lines or, for any other path, as a readable JSON roster. Returns the count."""
+    if is_jsonl(path):
+        return write_jsonl(path, records)
+    from campaign_data import write_roster
+    return write_roster(path, records)
+
+
+class StreamReport:
+    """Counts from one pass over a stream, with the first few invalid records described."""
+
+    def __init__(self):
+        self.read = 0
+        self.invalid = 0
+        self.filtered = 0
+        self.errors: List[Dict[str, Any]] = []
+
+    def reject(self, where: str, record: Any, problems: List[str]):
+        self.invalid += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            name = record.get("name") if isinstance(record, dict) else None
+            self.errors.append({"at": where, **({"name": name} if isinstance(name, str) else {}),
+                                "problems": problems})
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"read": self.read, "invalid": self.invalid, "filtered_out": self.filtered, "errors": self.errors}
+
+
+def select_records(records: Iterable[Tuple[str, Any]], report: StreamReport, where: Optional[str] = None,
+                   validate: bool = True, strict: bool = False) -> Iterator[Dict[str, Any]]:
+    """Yield the valid records matching where, counting the rest into report.
+
+    Invalid records are skipped and reported, or with strict=True stop the
+    stream with a StreamError naming the first one.
+    """
+    matches = compile_where(where)
+    for where_from, record in records:
+        report.read += 1
+        # Lines that are not JSON objects are rejected even without validation
+        problems = validate_record(record) if validate or not isinstance(record, dict) else []
+        if problems:
+            if strict:
+                raise StreamError(f"Invalid record at {where_from}: {'; '.join(problems)}")
+            report.reject(where_from, record, problems)
+            continue
+        if not matches(record):
+            report.filtered += 1
+            continue
+        yield record
+
+
+def stream_records(source: str, destination: str, where: Optional[str] = None,
+                   fields: Optional[Sequence[str]] = None, limit: Optional[int] = None,
+                   validate: bool = True, strict: bool = False) -> Dict[str, Any]:
+    """Copy records from source to destination (JSON Lines or roster, by file name) one at a time.
+
+    Records are validated, filtered by a roster search, projected to fields
+    and cut off after limit, without the roster ever being loaded whole.
+    Returns the counts read, written, invalid and filtered out.
+    """
+    if os.path.abspath(source) == os.path.abspath(destination):
+        raise StreamError("Stream to a different file than the one being read")
+    report = StreamReport()
+    selected = select_records(iter_records(source), report, where, validate, strict)
+
+    def limited() -> Iterator[Dict[str, Any]]:
+        for count, record in enumerate(selected):
+            if limit is not None and count >= limit:
+                return
+            yield project(record, fields)
+    try:
+        written = write_records(destination, limited())
+    except CodecError as e:
+        raise StreamError(f"Could not read {source}: {e}")
+    return {"source": source, "output": destination, "written": written, **report.to_dict()}
@@ -0,0 +1,164 @@
+"""
+D&D 5E Roster Sync
+Advisory file locking and three-way merging so several sessions can share one roster file.
+"""
+
+import json
+import time
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+try:
+    import msvcrt
+except ImportError:  # POSIX
+    msvcrt = None
+
+# Seconds to wait for another session's lock before giving up
+LOCK_TIMEOUT = 10.0
+_POLL_INTERVAL = 0.05
+
+_MISSING = object()
+
+
+class LockTimeout(OSError):
+    """Another session held the roster lock for too long."""
+
+
+def lock_path(data_file: str) -> str:
+    """The lock file for a roster. A separate file, since saves replace the roster file itself."""
+    return f"{data_file}.lock"
+
+
+class FileLock:
+    """Advisory lock on a lock file: shared for readers, exclusive for writers.
+
+    Uses flock on POSIX and msvcrt.locking on Windows (where every lock is
+    exclusive). Without either module locking is a no-op.
+    """
+
+    def __init__(self, path: str, shared: bool = False, timeout: float = LOCK_TIMEOUT):
+        self.path = path
+        self.shared = shared
+        self.timeout = timeout
+        self._file = None
+
+    def acquire(self):
+        self._file = open(self.path, 'a+b')
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                if fcntl is not None:
+                    fcntl.flock(self._file.fileno(), (fcntl.LOCK_SH if self.shared else fcntl.LOCK_EX) | fcntl.LOCK_NB)
+                elif msvcrt is not None:
+                    self._file.seek(0)
+                    msvcrt.locking(self._file.fileno(), msvcrt.LK_NBLCK, 1)
+                return self
+            except OSError:
+                if time.monotonic() >= deadline:
+                    self._file.close()
+                    self._file = None
+                    raise LockTimeout(f"Timed out waiting for {self.path}; is another session saving?")
+                time.sleep(_POLL_INTERVAL)
+
+    def release(self):
+        if self._file is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            elif msvcrt is not None:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self) -> 'FileLock':
+        return self.acquire()
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+def normalize_record(record: Mapping[str, Any]) -> Dict[str, Any]:
+    """A deep, JSON-shaped copy of a record (tuples become lists), as it would be saved."""
+    return json.loads(json.dumps(record))
+
+
+def _content(record: Optional[Mapping[str, Any]]) -> Optional[Dict[str, Any]]:
+    if record is None:
+        return None
+    return {key: value for key, value in record.items() if key != "version"}
+
+
+def merge_record(base: Mapping[str, Any], ours: Mapping[str, Any], theirs: Mapping[str, Any],
+                 path: str = "") -> Tuple[Dict[str, Any], List[str]]:
+    """Three-way merge of one record's fields, recursing into nested objects.
+
+    Fields only we changed take our value, everything else keeps theirs. Fields
+    both sides changed to different values are conflicts: theirs is kept and
+    the field path is reported.
+    """
+    merged = dict(theirs)
+    conflicts = []
+    for key in list(theirs) + [key for key in ours if key not in theirs] + [key for key in base if key not in theirs and key not in ours]:
+        if key == "version" and not path:
+            continue
+        b, o, t = base.get(key, _MISSING), ours.get(key, _MISSING), theirs.get(key, _MISSING)
+        if o == b or o == t:
+            continue
+        if t == b:
+            if o is _MISSING:
+                merged.pop(key, None)
+            else:
+                merged[key] = o
+        elif isinstance(b, dict) and isinstance(o, dict) and isinstance(t, dict):
+            merged[key], nested = merge_record(b, o, t, f"{path}{key}.")
+            conflicts.extend(nested)
+        else:
+            conflicts.append(f"{path}{key}")
+    return merged, conflicts
+
+
+def merge_rosters(baseline: Mapping[str, Mapping[str, Any]], ours: Mapping[str, Mapping[str, Any]],
+                  theirs: Mapping[str, Mapping[str, Any]]) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, List[str]]]:
+    """Merge our roster into the one on disk, given the baseline both started from.
+
+    Characters we did not change take the on-disk record (including other
+    sessions' additions and deletions). Changed characters are merged field by
+    field and their version bumped. Returns (merged roster, conflict notes by name).
+    """
+    merged: Dict[str, Dict[str, Any]] = {}
+    conflicts: Dict[str, List[str]] = {}
+    names = list(theirs) + [name for name in ours if name not in theirs]
+    for name in names:
+        base, mine, disk = baseline.get(name), ours.get(name), theirs.get(name)
+        if _content(mine) == _content(base):
+            if disk is not None:
+                # Records this session could not load are carried over as they are
+                merged[name] = dict(disk) if isinstance(disk, Mapping) else disk
+            continue
+        if mine is None:
+            # Deleted here: only if nobody else changed it meanwhile
+            if disk is not None and _content(disk) != _content(base):
+                merged[name] = dict(disk)
+                conflicts[name] = ["deleted here but changed in another session; kept the saved copy"]
+            continue
+        if disk is None:
+            merged[name] = dict(mine)
+            merged[name]["version"] = max(mine.get("version", 0), (base or {}).get("version", 0) + 1)
+            if base is not None:
+                conflicts[name] = ["deleted in another session; kept this session's copy"]
+            continue
+
+        record, fields = merge_record(base or {}, mine, disk)
+        if _content(record) != _content(disk):
+            # Versions bumped in memory (by the character server) are kept if already ahead
+            record["version"] = max(mine.get("version", 0), disk.get("version", 0) + 1)
+        merged[name] = record
+        if fields:
+            conflicts[name] = [f"{field} changed in both sessions; kept the saved value" for field in fields]
+    return merged, conflicts
@@ -0,0 +1,238 @@
+"""
+D&D 5E Spell Compendium
+Indexed spell lookups and prefix autocomplete backed by data/spells.json.
+"""
+
+import bisect
+import itertools
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from game_data import load_compiled
+
+# Bump when the compiled compendium changes shape so cached data is rebuilt
+SPELL_DATA_VERSION = 1
+
+SPELL_SCHOOLS = [
+    "Abjuration", "Conjuration", "Divination", "Enchantment",
+    "Evocation", "Illusion", "Necromancy", "Transmutation"
+]
+
+
+@dataclass(frozen=True)
+class Spell:
+    """A single spell from the compendium."""
+    name: str
+    level: int
+    school: str
+    classes: Tuple[str, ...] = ()
+    components: Tuple[str, ...] = ()
+    concentration: bool = False
+    ritual: bool = False
+
+    @property
+    def level_label(self) -> str:
+        """Spell level as shown on the character sheet ("Cantrip", "1st", ...)."""
+        if self.level == 0:
+            return "Cantrip"
+        suffix = {1: "st", 2: "nd", 3: "rd"}.get(self.level, "th")
+        return f"{self.level}{suffix}"
+
+    @classmethod
+    def from_dict(cls, name: str, data: Dict[str, Any]) -> 'Spell':
+        """Create spell from its data file entry."""
+        return cls(
+            name=name,
+            level=int(data.get("level", 0)),
+            school=data.get("school", ""),
+            classes=tuple(data.get("classes", [])),
+            components=tuple(data.get("components", [])),
+            concentration=bool(data.get("concentration", False)),
+            ritual=bool(data.get("ritual", False))
+        )
+
+
+class PrefixTrie:
+    """Character trie mapping lowercase prefixes to names.
+
+    Every node keeps the sorted names reachable through it, so completion is a
+    walk down the prefix plus a slice. Names are inserted under their full text
+    and the start of each later word, so "miss" completes to "Magic Missile".
+    """
+
+    _NAMES = "\0"
+
+    def __init__(self):
+        self.root: Dict[str, Any] = {}
+        self._all: List[Tuple[str, str]] = []
+
+    @staticmethod
+    def _add_sorted(names: List[Tuple[str, str]], name: str) -> None:
+        entry = (name.lower(), name)
+        index = bisect.bisect_left(names, entry)
+        if index == len(names) or names[index] != entry:
+            names.insert(index, entry)
+
+    def insert(self, key: str, value: str) -> None:
+        """Index value under every prefix of key."""
+        node = self.root
+        for char in key.lower():
+            node = node.setdefault(char, {self._NAMES: []})
+            self._add_sorted(node[self._NAMES], value)
+        self._add_sorted(self._all, value)
+
+    def add_name(self, name: str) -> None:
+        """Index a name under its full text and each word start."""
+        words = name.split()
+        for i in range(len(words)):
+            self.insert(" ".join(words[i:]), name)
+
+    def iter_matches(self, prefix: str) -> Iterator[str]:
+        """Yield names matching a prefix in alphabetical order."""
+        names = self._all
+        if prefix:
+            node = self.root
+            for char in prefix.lower():
+                node = node.get(char)
+                if node is None:
+                    return
+            names = node[self._NAMES]
+        for _, name in names:
+            yield name
+
+    def complete(self, prefix: str, limit: Optional[int] = None) -> List[str]:
+        """Get names matching a prefix, in alphabetical order."""
+        return list(itertools.islice(self.iter_matches(prefix), limit))
+
+
+class SpellCompendium:
+    """Spell catalog with secondary indexes and prefix autocomplete."""
+
+    def __init__(self, spells: Iterable[Spell] = ()):
+        self.spells: Dict[str, Spell] = {}
+        self.by_level: Dict[int, Set[str]] = {}
+        self.by_school: Dict[str, Set[str]] = {}
+        self.by_class: Dict[str, Set[str]] = {}
+        self.by_component: Dict[str, Set[str]] = {}
+        self.concentration: Set[str] = set()
+        self.rituals: Set[str] = set()
+        self._names: Dict[str, str] = {}
+        self._trie = PrefixTrie()
+        for spell in spells:
+            self.add_spell(spell)
+
+    def __len__(self) -> int:
+        return len(self.spells)
+
+    def __contains__(self, name: str) -> bool:
+        return name.lower() in self._names
+
+    def add_spell(self, spell: Spell) -> None:
+        """Add a spell (or replace one with the same name) and index it."""
+        if spell.name.lower() in self._names:
+            self._unindex(self.spells[self._names[spell.name.lower()]])
+
+        self.spells[spell.name] = spell
+        self._names[spell.name.lower()] = spell.name
+        self.by_level.setdefault(spell.level, set()).add(spell.name)
+        self.by_school.setdefault(spell.school.lower(), set()).add(spell.name)
+        for class_name in spell.classes:
+            self.by_class.setdefault(class_name.lower(), set()).add(spell.name)
+        for component in spell.components:
+            self.by_component.setdefault(component.upper(), set()).add(spell.name)
+        if spell.concentration:
+            self.concentration.add(spell.name)
+        if spell.ritual:
+            self.rituals.add(spell.name)
+        self._trie.add_name(spell.name)
+
+    def _unindex(self, spell: Spell) -> None:
+        del self.spells[spell.name]
+        del self._names[spell.name.lower()]
+        self.by_level[spell.level].discard(spell.name)
+        self.by_school[spell.school.lower()].discard(spell.name)
+        for class_name in spell.classes:
+            self.by_class[class_name.lower()].discard(spell.name)
+        for component in spell.components:
+            self.by_component[component.upper()].discard(spell.name)
+        self.concentration.discard(spell.name)
+        self.rituals.discard(spell.name)
+        # The trie keeps the old entry; complete() filters out names no longer present
+
+    def get(self, name: str) -> Optional[Spell]:
+        """Find a spell by name (case-insensitive)."""
+        canonical = self._names.get(name.lower())
+        return self.spells.get(canonical) if canonical else None
+
+    def find(self, level: Optional[int] = None, school: Optional[str] = None,
+             class_name: Optional[str] = None, components: Iterable[str] = (),
+             without_components: Iterable[str] = (), concentration: Optional[bool] = None,
+             ritual: Optional[bool] = None) -> List[Spell]:
+        """Filter spells by intersecting the indexes, sorted by level then name."""
+        candidates: Optional[Set[str]] = None
+
+        def narrow(names: Set[str]) -> None:
+            nonlocal candidates
+            candidates = set(names) if candidates is None else candidates & names
+
+        if level is not None:
+            narrow(self.by_level.get(level, set()))
+        if school:
+            narrow(self.by_school.get(school.lower(), set()))
+        if class_name:
+            narrow(self.by_class.get(class_name.lower(), set()))
+        for component in components:
+            narrow(self.by_component.get(component.upper(), set()))
+        if concentration is not None:
+            narrow(self.concentration if concentration else set(self.spells) - self.concentration)
+        if ritual is not None:
+            narrow(self.rituals if ritual else set(self.spells) - self.rituals)
+
+        names = set(self.spells) if candidates is None else candidates
+        for component in without_components:
+            names = names - self.by_component.get(component.upper(), set())
+
+        spells = [self.spells[name] for name in names]
+        spells.sort(key=lambda spell: (spell.level, spell.name.lower()))
+        return spells
+
+    def complete(self, prefix: str, limit: int = 10, level: Optional[int] = None,
+                 class_name: Optional[str] = None, max_level: Optional[int] = None) -> List[Spell]:
+        """Autocomplete spell names from a typed prefix, optionally filtered."""
+        prefix = prefix.strip()
+        class_names = self.by_class.get(class_name.lower(), set()) if class_name else None
+
+        def accept(name: str) -> bool:
+            spell = self.spells.get(name)
+            if spell is None:
+                return False
+            if level is not None and spell.level != level:
+                return False
+            if max_level is not None and spell.level > max_level:
+                return False
+            return class_names is None or name in class_names
+
+        # Names starting with the prefix rank ahead of later-word matches
+        lowered = prefix.lower()
+        leading = [name for name in self._trie.iter_matches(prefix) if name.lower().startswith(lowered)]
+        matches = [name for name in leading if accept(name)][:limit]
+        if len(matches) < limit:
+            seen = set(leading)
+            for name in self._trie.iter_matches(prefix):
+                if name not in seen and accept(name):
+                    matches.append(name)
+                    if len(matches) >= limit:
+                        break
+        return [self.spells[name] for name in matches]
+
+
+def _compile_compendium(raw: Dict[str, Any]) -> SpellCompendium:
+    """Build the indexed compendium from the spell data file."""
+    return SpellCompendium(Spell.from_dict(name, data) for name, data in raw["spells"].items())
+
+
+@lru_cache(maxsize=None)
+def get_spell_compendium() -> SpellCompendium:
+    """Load the spell compendium on first use (data/spells.json plus homebrew packs)."""
+    return load_compiled("spells", ["spells"], _compile_compendium, version=SPELL_DATA_VERSION)
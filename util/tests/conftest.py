@@ -0,0 +1,8 @@
+"""Shared setup for the util test suite: the modules are flat scripts, so put util/ on the path."""
+
+import os
+import sys
+
+UTIL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if UTIL_DIR not in sys.path:
+    sys.path.insert(0, UTIL_DIR)
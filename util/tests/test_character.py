@@ -0,0 +1,48 @@
+"""Character rules: levelling, damage and healing."""
+
+import pytest
+
+from character_maker import Character
+
+
+@pytest.fixture
+def fighter():
+    character = Character("Ana")
+    character.character_class = "Fighter"
+    character.constitution = 14
+    character.level_up(4)
+    return character
+
+
+def test_level_up_gains_average_hit_points():
+    character = Character("Ana")
+    character.character_class = "Fighter"
+    character.constitution = 14
+    before = character.hit_point_maximum
+    character.level_up(4)
+    assert character.level == 5
+    # d10 average (6) plus CON +2 per level
+    assert character.hit_point_maximum == before + 4 * 8
+
+
+@pytest.mark.parametrize("levels", [0, -3])
+def test_level_up_refuses_fewer_than_one_level(fighter, levels):
+    before = fighter.to_dict()
+    with pytest.raises(ValueError):
+        fighter.level_up(levels)
+    assert fighter.to_dict() == before
+
+
+def test_level_up_stops_at_twenty(fighter):
+    fighter.level_up(30)
+    assert fighter.level == 20
+    assert fighter.level_up(1) == []
+
+
+def test_negative_damage_and_healing_change_nothing():
+    character = Character("Ana")
+    character.temporary_hit_points = 3
+    hit_points = character.current_hit_points
+    assert character.take_damage(-4) == 0
+    assert character.heal(-4) == 0
+    assert (character.temporary_hit_points, character.current_hit_points) == (3, hit_points)
@@ -0,0 +1,66 @@
+"""Scripted roster commands: validation leaves characters untouched on bad input."""
+
+import pytest
+
+from character_commands import CommandError, apply_patch, cmd_create, cmd_patch, cmd_rest
+from character_maker import Character, CharacterManager
+from dice import DiceRoller
+
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = CharacterManager(str(tmp_path / "characters.json"), verbose=False)
+    manager.add_character(Character("Ana"))
+    manager.add_character(Character("Bo"))
+    return manager
+
+
+@pytest.mark.parametrize("changes", [
+    [1],
+    "level",
+    {"spell_slots": {"1st": "three"}},
+    {"spell_slots": {"1st": True}},
+    {"skills": {"arcana": 1}},
+    {"saving_throws": {"wisdom": "yes"}},
+    {"spell_slots": {"10th": 1}},
+    {"level": "5"},
+    {"name": "Cy"},
+])
+def test_bad_patch_is_rejected_before_any_change(changes):
+    character = Character("Ana")
+    before = character.to_dict()
+    with pytest.raises(CommandError):
+        apply_patch(character, changes)
+    assert character.to_dict() == before
+
+
+def test_patch_merges_nested_fields():
+    character = Character("Ana")
+    assert apply_patch(character, {"spell_slots": {"1st": 3}, "skills": {"arcana": True}}) == ["spell_slots", "skills"]
+    assert character.spell_slots["1st"] == 3 and character.spell_slots["2nd"] == 0
+    assert character.skills["arcana"] and not character.skills["history"]
+
+
+def test_rename_conflict_changes_nothing(manager):
+    before = manager.get_character("Ana").to_dict()
+    with pytest.raises(CommandError):
+        cmd_patch(manager, {"name": "Ana", "changes": {"level": 5}, "rename": "Bo"}, DiceRoller(1))
+    assert manager.get_character("Ana").to_dict() == before
+
+
+def test_create_applies_class_saving_throws(manager):
+    record = cmd_create(manager, {"name": "Wiz", "character_class": "Wizard"}, DiceRoller(1))
+    assert sorted(name for name, proficient in record["saving_throws"].items() if proficient) == ["intelligence", "wisdom"]
+
+
+@pytest.mark.parametrize("hit_dice", [-3, {"Ana": -1}])
+def test_rest_rejects_negative_hit_dice(manager, hit_dice):
+    with pytest.raises(CommandError):
+        cmd_rest(manager, {"names": ["Ana"], "type": "short", "hit_dice": hit_dice}, DiceRoller(1))
+    assert manager.get_character("Ana").hit_dice_used == 0
+
+
+def test_short_rest_never_refunds_hit_dice():
+    character = Character("Ana")
+    assert character.short_rest(-2, DiceRoller(1)) == 0
+    assert character.hit_dice_used == 0
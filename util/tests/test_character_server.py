@@ -0,0 +1,55 @@
+"""Character server requests over a real loopback connection."""
+
+import asyncio
+import json
+
+import pytest
+
+import character_commands
+from character_maker import Character, CharacterManager
+from character_server import CharacterServer
+
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = CharacterManager(str(tmp_path / "characters.json"), verbose=False)
+    manager.add_character(Character("Ana"))
+    return manager
+
+
+def _exchange(manager, requests):
+    """Send requests on one connection and return the replies."""
+    async def run():
+        server = CharacterServer(manager, save_delay=0.01)
+        await server.start(host="127.0.0.1", port=0)
+        reader, writer = await asyncio.open_connection(*server.address)
+        replies = []
+        for request in requests:
+            writer.write(json.dumps(request).encode("utf-8") + b"\n")
+            await writer.drain()
+            replies.append(json.loads(await asyncio.wait_for(reader.readline(), 5)))
+        writer.close()
+        await server.close()
+        return replies
+    return asyncio.run(run())
+
+
+def test_failing_handler_replies_and_keeps_connection(manager, monkeypatch):
+    def broken(manager, spec, roller):
+        raise AttributeError("boom")
+    monkeypatch.setitem(character_commands.OPERATIONS, "get", (broken, False))
+    replies = _exchange(manager, [{"op": "get", "id": 1}, {"op": "list", "id": 2}])
+    assert replies[0]["ok"] is False and replies[0]["id"] == 1 and "boom" in replies[0]["error"]
+    assert replies[1] == {"id": 2, "ok": True, "result": {"Ana": 0}}
+
+
+def test_malformed_patch_is_an_error_reply(manager):
+    replies = _exchange(manager, [{"op": "patch", "name": "Ana", "changes": [1]},
+                                  {"op": "damage", "name": "Ana", "amount": 1}])
+    assert replies[0]["ok"] is False
+    assert replies[1]["ok"] is True
+
+
+def test_changes_are_saved_on_close(manager):
+    _exchange(manager, [{"op": "patch", "name": "Ana", "changes": {"race": "Elf"}}])
+    assert CharacterManager(manager.data_file, verbose=False).characters["Ana"].race == "Elf"
@@ -0,0 +1,94 @@
+"""Integrity checks and repairs of roster and inventory files."""
+
+import json
+
+import pytest
+
+from character_maker import Character
+from data_check import CheckError, check_file, quarantine_path
+from roster_sync import normalize_record
+
+
+def _write(path, data):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+
+
+def _read(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _quarantined(path):
+    with open(quarantine_path(path), encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def _item(name, **fields):
+    return {"name": name, "weight": 1.0, "rarity": "Common", **fields}
+
+
+@pytest.fixture
+def inventory_file(tmp_path):
+    path = str(tmp_path / "character_inventory.json")
+    _write(path, {"character_name": "Ana", "items": [
+        _item("Rope", quantity=2),
+        _item("Lantern", weight="heavy"),
+        _item("Torch", quantity=0),
+        {"weight": 2.0, "rarity": "Common"},
+        "Potion of Healing",
+        _item("Coin", value_gp=-1.0),
+    ]})
+    return path
+
+
+def test_malformed_inventory_report(inventory_file):
+    report = check_file(inventory_file, workers=1)
+    assert (report["kind"], report["records"]) == ("inventory", 6)
+    assert (report["errors"], report["fixable"], report["warnings"]) == (4, 0, 1)
+    assert [finding["at"] for finding in report["findings"] if finding["errors"]] == [1, 2, 3, 4]
+    # Checking alone changes nothing
+    assert len(_read(inventory_file)["items"]) == 6
+
+
+def test_malformed_inventory_repair(inventory_file):
+    report = check_file(inventory_file, repair=True, workers=1)
+    assert report["quarantined"] == 4
+    saved = _read(inventory_file)
+    assert saved["character_name"] == "Ana"
+    assert [item["name"] for item in saved["items"]] == ["Rope", "Coin"]
+    assert [entry["record"] for entry in _quarantined(inventory_file)][-1] == "Potion of Healing"
+    # The repaired file is clean apart from the warning
+    again = check_file(inventory_file, workers=1)
+    assert (again["errors"], again["fixable"], again["warnings"]) == (0, 0, 1)
+
+
+def test_inventory_with_broken_items_list_is_not_taken_for_a_roster(tmp_path):
+    path = str(tmp_path / "character_inventory.json")
+    _write(path, {"character_name": "Ana", "items": {"0": _item("Rope")}})
+    with pytest.raises(CheckError):
+        check_file(path, repair=True, workers=1)
+    assert _read(path)["items"] == {"0": _item("Rope")}
+
+
+def test_repair_refuses_when_every_record_is_bad(tmp_path):
+    path = str(tmp_path / "character_inventory.json")
+    original = {"character_name": "Ana", "items": [{"label": "Rope"}, {"label": "Torch"}]}
+    _write(path, original)
+    report = check_file(path, repair=True, workers=1)
+    assert "refused" in report
+    assert _read(path) == original
+
+
+def test_roster_repair_fixes_and_quarantines(tmp_path):
+    path = str(tmp_path / "characters.json")
+    good = normalize_record(Character("Ana").to_dict())
+    fixable = dict(normalize_record(Character("Bo").to_dict()), current_hit_points=99)
+    _write(path, {"Ana": good, "Bo": fixable, "Cy": {"name": "Cy", "level": "three"}})
+
+    report = check_file(path, repair=True, workers=1)
+    assert (report["quarantined"], report["repaired"]) == (1, 1)
+    saved = _read(path)
+    assert sorted(saved) == ["Ana", "Bo"]
+    assert saved["Bo"]["current_hit_points"] == saved["Bo"]["hit_point_maximum"]
+    assert _quarantined(path)[0]["at"] == "Cy"
@@ -0,0 +1,104 @@
+"""Dice expression parsing, bounds and rolling."""
+
+import time
+
+import pytest
+
+from dice import (MAX_DICE_PER_TERM, MAX_DIE_SIDES, DiceExpressionError, DiceRoller, DiceTerm, compile_dice,
+                  keep_distribution, keep_mean, parse_dice_terms)
+
+
+@pytest.mark.parametrize("expression, terms", [
+    ("8d6+4", (DiceTerm(1, 8, 6), DiceTerm(1, 4))),
+    ("d20", (DiceTerm(1, 1, 20),)),
+    ("d%", (DiceTerm(1, 1, 100),)),
+    ("1d4 - 6", (DiceTerm(1, 1, 4), DiceTerm(-1, 6))),
+    ("2d20kh1", (DiceTerm(1, 2, 20, 1, True),)),
+    ("2d20k1", (DiceTerm(1, 2, 20, 1, True),)),
+    ("2D20KL1", (DiceTerm(1, 2, 20, 1, False),)),
+    ("4d6dl1", (DiceTerm(1, 4, 6, 3, True),)),
+    ("4d6dh1", (DiceTerm(1, 4, 6, 3, False),)),
+    ("-2d8+1d6", (DiceTerm(-1, 2, 8), DiceTerm(1, 1, 6))),
+    ("7", (DiceTerm(1, 7),)),
+])
+def test_parse(expression, terms):
+    assert parse_dice_terms(expression) == terms
+
+
+@pytest.mark.parametrize("expression", [
+    "", "   ", "d", "2d", "1d6 2", "1d6++2", "abc", "1d6x", "2d20kh3", "4d6dl5",
+    f"{MAX_DICE_PER_TERM + 1}d6", f"1d{MAX_DIE_SIDES + 1}", "0d6", "1d0",
+])
+def test_parse_rejects(expression):
+    with pytest.raises(DiceExpressionError):
+        compile_dice(expression)
+
+
+def test_expression_error_is_value_error():
+    # Callers catch ValueError for bad input
+    with pytest.raises(ValueError):
+        compile_dice("1d6 2")
+
+
+def test_limits_are_accepted():
+    expression = compile_dice(f"{MAX_DICE_PER_TERM}d{MAX_DIE_SIDES}")
+    assert (expression.minimum, expression.maximum) == (MAX_DICE_PER_TERM, MAX_DICE_PER_TERM * MAX_DIE_SIDES)
+
+
+@pytest.mark.parametrize("expression, minimum, maximum, mean", [
+    ("8d6+4", 12, 52, 32.0),
+    ("1d4-6", -5, -2, -3.5),
+    ("-1d6+10", 4, 9, 6.5),
+    ("4d6dl1", 3, 18, 15869 / 1296),
+    ("2d20kh1", 1, 20, 13.825),
+    ("2d20kl1", 1, 20, 7.175),
+])
+def test_bounds_and_mean(expression, minimum, maximum, mean):
+    compiled = compile_dice(expression)
+    assert (compiled.minimum, compiled.maximum) == (minimum, maximum)
+    assert compiled.mean == pytest.approx(mean)
+    distribution = compiled.distribution()
+    assert (min(distribution), max(distribution)) == (minimum, maximum)
+    assert sum(distribution.values()) == pytest.approx(1.0)
+
+
+@pytest.mark.parametrize("expression", ["8d6+4", "1d4-6", "4d6dl1", "2d20kl1", "-1d6+10"])
+def test_rolls_stay_within_bounds(expression):
+    compiled = compile_dice(expression)
+    roller = DiceRoller(7, use_numpy=False)
+    rolls = [compiled.roll(roller) for _ in range(500)] + list(compiled.roll_batch(500, roller))
+    assert compiled.minimum <= min(rolls) and max(rolls) <= compiled.maximum
+
+
+def test_seeded_rolls_repeat():
+    compiled = compile_dice("3d8+2")
+    assert ([compiled.roll(DiceRoller(42)) for _ in range(3)]
+            == [compiled.roll(DiceRoller(42)) for _ in range(3)])
+
+
+def test_compile_is_cached_and_describes_itself():
+    assert compile_dice("2d20kh1") is compile_dice("2d20kh1")
+    assert str(compile_dice("1d4 - 6")) == "1d4-6"
+    total, details = compile_dice("2d6+3").describe_roll(DiceRoller(1))
+    assert details.startswith("2d6 [") and details.endswith("+3")
+    assert 5 <= total <= 15
+
+
+@pytest.mark.parametrize("count, sides, keep, highest", [(4, 6, 3, True), (5, 8, 2, False), (3, 20, 0, True),
+                                                        (6, 4, 6, False), (2, 20, 1, True)])
+def test_keep_mean_matches_exact_distribution(count, sides, keep, highest):
+    counts = keep_distribution(count, sides, keep, highest)
+    exact = sum(value * ways for value, ways in counts.items()) / sum(counts.values())
+    assert keep_mean(count, sides, keep, highest) == pytest.approx(exact)
+
+
+def test_large_keep_term_has_a_mean_without_a_distribution():
+    expression = compile_dice("60d100kh30")
+    start = time.perf_counter()
+    mean = expression.mean
+    assert time.perf_counter() - start < 5
+    assert expression.minimum < mean < expression.maximum
+    # Top half of 60 d100s averages about 75 each
+    assert mean == pytest.approx(30 * 75, rel=0.01)
+    with pytest.raises(DiceExpressionError):
+        expression.distribution()
@@ -0,0 +1,48 @@
+"""Class data compiled from data/ and homebrew packs."""
+
+import json
+
+import pytest
+
+from character_maker import GAME_DATA_VERSION, _compile_game_data
+from game_data import DATA_DIR, load_compiled
+
+
+def _compile(tmp_path, pack):
+    homebrew = tmp_path / "homebrew"
+    homebrew.mkdir(exist_ok=True)
+    (homebrew / "pack.json").write_text(json.dumps(pack) if not isinstance(pack, str) else pack, encoding="utf-8")
+    return load_compiled("classes", ["classes", "spell_slots"], _compile_game_data, version=GAME_DATA_VERSION,
+                         data_dir=DATA_DIR, homebrew_dir=str(homebrew), cache_dir=str(tmp_path / "cache"))
+
+
+BLOOD_HUNTER = {"hit_die": 10, "saving_throws": ["Dexterity", "Intelligence"], "features": {"1": ["Crimson Rite"]}}
+
+
+def test_homebrew_class_is_added(tmp_path):
+    data = _compile(tmp_path, {"classes": {"Blood Hunter": BLOOD_HUNTER}})
+    assert data["progression"][("Blood Hunter", 5)]["hit_dice"] == "5d10"
+    assert data["classes"]["Blood Hunter"]["subclass_level"] == 3
+    assert ("Wizard", 1) in data["progression"]
+
+
+@pytest.mark.parametrize("broken", [
+    {"saving_throws": ["Strength"]},
+    {"hit_die": "d8"},
+    {"hit_die": 8, "features": ["Rage"]},
+    {"hit_die": 8, "features": {"first": ["Rage"]}},
+    {"hit_die": 8, "spellcasting": {"ability": "Wisdom"}},
+    "Fighter but cooler",
+])
+def test_broken_homebrew_class_is_skipped(tmp_path, capsys, broken):
+    data = _compile(tmp_path, {"classes": {"Blood Hunter": BLOOD_HUNTER, "Broken": broken}})
+    assert "Skipping homebrew class Broken" in capsys.readouterr().out
+    assert "Broken" not in data["classes"]
+    assert not any(name == "Broken" for name, level in data["progression"])
+    assert ("Blood Hunter", 1) in data["progression"] and ("Fighter", 20) in data["progression"]
+
+
+def test_unreadable_pack_is_skipped(tmp_path, capsys):
+    data = _compile(tmp_path, "{not json")
+    assert "Skipping homebrew pack pack.json" in capsys.readouterr().out
+    assert ("Fighter", 1) in data["progression"]
@@ -0,0 +1,107 @@
+"""Character sheet export: PDF object syntax, and filling the bundled template and reading it back."""
+
+import os
+import shutil
+
+import pytest
+
+from character_maker import Character, CharacterManager
+from pdf_export import (TEMPLATE_PATH, PDFError, PDFName, PDFRef, SheetTemplate, decode_text, export_character_sheets,
+                        load_template, parse_object, serialize, sheet_values)
+
+LEGACY_ROSTER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "characters.json")
+
+
+def _read_back(data):
+    """Field values of a filled PDF: text as str, checkboxes as their state name."""
+    sheet = SheetTemplate(data)
+    values = {}
+    for name, field in sheet.fields.items():
+        value = sheet.document.resolve(field.ref).get("V")
+        if value is not None:
+            values[name] = decode_text(value) if isinstance(value, bytes) else str(value)
+    return values
+
+
+@pytest.fixture
+def wizard():
+    character = Character("Zoë (the “Quick”)")
+    character.character_class = "Wizard"
+    character.subclass = "School of Evocation"
+    character.level_up(2)
+    character.skills["arcana"] = True
+    character.languages = ["Common", "Elvish"]
+    return character
+
+
+@pytest.mark.parametrize("obj", [
+    {"Type": PDFName("Annot"), "Rect": [0, 1.5, -2, 300], "P": PDFRef(12, 0), "F": None, "Open": True},
+    [PDFName("A b#c"), b"(paren) \\ bytes", [], {}],
+    PDFName("Yes"),
+])
+def test_serialize_round_trips(obj):
+    parsed, end = parse_object(serialize(obj))
+    assert parsed == obj
+    assert end == len(serialize(obj))
+
+
+def test_parse_literal_strings_and_references():
+    assert parse_object(b"(a\\(b\\) (nested) \\n\\101)")[0] == b"a(b) (nested) \nA"
+    assert parse_object(b"[1 0 R 2 3]")[0] == [PDFRef(1, 0), 2, 3]
+    assert parse_object(b"<48 65 6c6>")[0] == b"Hel`"
+
+
+def test_text_encoding_round_trips():
+    for text in ("Ranger 2", "Zoë", "“Quick” – ✓"):
+        assert decode_text(parse_object(serialize(text))[0]) == text
+
+
+def test_fill_and_read_back(wizard):
+    template = load_template()
+    values = sheet_values(wizard, template)
+    filled = template.fill(values)
+
+    with open(TEMPLATE_PATH, "rb") as f:
+        original = f.read()
+    # An incremental update: the template's bytes are untouched
+    assert filled.startswith(original) and len(filled) > len(original)
+
+    read = _read_back(filled)
+    for name, value in values.items():
+        field = template.fields[name]
+        if field.kind == "Btn":
+            if field.on_state:
+                assert read[name] == (field.on_state if value else "Off"), name
+        else:
+            assert read[name] == ("" if value is None else str(value)), name
+    assert read["CharacterName"] == "Zoë (the “Quick”)"
+    assert read["ClassLevel"] == "Wizard (School of Evocation) 3"
+
+
+def test_filled_sheet_can_be_filled_again(wizard):
+    template = load_template()
+    once = template.fill(sheet_values(wizard, template))
+    twice = SheetTemplate(once).fill({"HPCurrent": 1, "CharacterName": "Renamed"})
+    read = _read_back(twice)
+    assert (read["HPCurrent"], read["CharacterName"]) == ("1", "Renamed")
+    assert read["ClassLevel"] == "Wizard (School of Evocation) 3"
+
+
+def test_unknown_field_is_refused():
+    with pytest.raises(PDFError):
+        load_template().fill({"NoSuchField": "x"})
+
+
+def test_legacy_class_level(tmp_path):
+    path = str(tmp_path / "characters.json")
+    shutil.copy(LEGACY_ROSTER, path)
+    lycaon = CharacterManager(path, verbose=False).characters["Lycaon"]
+    assert sheet_values(lycaon)["ClassLevel"] == "Ranger 2"
+
+
+def test_export_sheets_gives_each_character_a_file(tmp_path, wizard):
+    twin = Character(wizard.name)
+    paths = export_character_sheets([wizard, twin, Character("Bo/Cy")], str(tmp_path), workers=1)
+    assert [os.path.basename(path) for path in paths] == ["Zoë _the _Quick_.pdf", "Zoë _the _Quick_ 2.pdf", "Bo_Cy.pdf"]
+    with open(paths[2], "rb") as f:
+        assert _read_back(f.read())["CharacterName"] == "Bo/Cy"
@@ -0,0 +1,74 @@
+"""Roster encodings and compressions: round-trips, format detection and refusing unsafe pickles."""
+
+import os
+import pickle
+
+import pytest
+
+from character_maker import Character, CharacterManager
+from roster_codecs import (BINARY_MAGIC, COMPRESSIONS, ENCODINGS, CodecError, decode, encode, format_name,
+                           parse_format, read_file)
+from roster_sync import normalize_record
+
+FORMATS = [format_name(encoding, compression) for encoding in ENCODINGS for compression in (None, *COMPRESSIONS)]
+
+
+@pytest.fixture
+def roster():
+    characters = [Character(name) for name in ("Ana", "Bo", "Cé")]
+    characters[0].spell_slots_expended["1st"] = 2
+    characters[1].conditions = ["Poisoned"]
+    return {character.name: normalize_record(character.to_dict()) for character in characters}
+
+
+@pytest.mark.parametrize("storage_format", FORMATS)
+def test_round_trip(roster, storage_format):
+    data, detected = decode(encode(roster, storage_format))
+    assert data == roster
+    assert detected == storage_format
+
+
+def test_empty_roster_round_trips():
+    for storage_format in FORMATS:
+        assert decode(encode({}, storage_format))[0] == {}
+
+
+def test_gzip_output_is_reproducible(roster):
+    assert encode(roster, "compact+gzip") == encode(roster, "compact+gzip")
+
+
+@pytest.mark.parametrize("storage_format", ["", "yaml", "json+zip", "gzip"])
+def test_unknown_format(storage_format):
+    with pytest.raises(CodecError):
+        parse_format(storage_format)
+
+
+def test_parse_format_is_case_insensitive():
+    assert parse_format(" Binary+LZMA ") == ("binary", "lzma")
+
+
+@pytest.mark.parametrize("raw", [b"{not json", b"\x1f\x8bnot gzip", BINARY_MAGIC + b"\x80\x04truncated"])
+def test_corrupt_data(raw):
+    with pytest.raises(CodecError):
+        decode(raw)
+
+
+def test_binary_refuses_objects():
+    raw = BINARY_MAGIC + pickle.dumps({"Ana": os.system}, protocol=4)
+    with pytest.raises(CodecError, match="only plain data"):
+        decode(raw)
+
+
+@pytest.mark.parametrize("storage_format", ["compact", "binary+gzip", "json+lzma"])
+def test_manager_saves_and_reloads_in_format(tmp_path, storage_format):
+    path = str(tmp_path / "characters.json")
+    manager = CharacterManager(path, verbose=False, storage_format=storage_format)
+    manager.add_character(Character("Ana"))
+    manager.characters["Ana"].current_hit_points = 4
+    assert manager.save_characters()
+    assert read_file(path)[1] == storage_format
+
+    # Loading detects the format and keeps it for the next save
+    reloaded = CharacterManager(path, verbose=False)
+    assert reloaded.characters["Ana"].current_hit_points == 4
+    assert reloaded.loaded_format == storage_format
@@ -0,0 +1,97 @@
+"""Three-way roster merges, including rosters saved before the current Character fields existed."""
+
+import json
+import os
+import shutil
+
+import pytest
+
+from character_maker import Character, CharacterManager
+from roster_sync import merge_rosters, normalize_record
+
+LEGACY_ROSTER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "characters.json")
+
+
+@pytest.fixture
+def legacy_file(tmp_path):
+    path = str(tmp_path / "characters.json")
+    shutil.copy(LEGACY_ROSTER, path)
+    return path
+
+
+def _read(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_shipped_roster_is_legacy():
+    # The cases below rely on Lycaon predating these fields
+    record = _read(LEGACY_ROSTER)["Lycaon"]
+    for field in ("hit_dice_used", "level", "character_class", "subclass", "version"):
+        assert field not in record
+
+
+def test_merge_keeps_disk_record_for_unchanged_character():
+    disk = _read(LEGACY_ROSTER)
+    baseline = {"Lycaon": normalize_record(Character.from_dict(disk["Lycaon"]).to_dict())}
+    merged, conflicts = merge_rosters(baseline, dict(baseline), disk)
+    assert conflicts == {}
+    assert merged == disk
+
+
+def test_merge_against_normalized_legacy_record_has_no_conflicts():
+    disk = _read(LEGACY_ROSTER)
+    baseline = {"Lycaon": normalize_record(Character.from_dict(disk["Lycaon"]).to_dict())}
+    ours = {"Lycaon": dict(baseline["Lycaon"], hit_dice_used=1)}
+    theirs = {"Lycaon": dict(baseline["Lycaon"])}
+    merged, conflicts = merge_rosters(baseline, ours, theirs)
+    assert conflicts == {}
+    assert merged["Lycaon"]["hit_dice_used"] == 1
+    assert merged["Lycaon"]["version"] == 1
+
+
+def test_merge_reports_fields_changed_on_both_sides():
+    base = normalize_record(Character("Ana").to_dict())
+    ours = dict(base, current_hit_points=3)
+    theirs = dict(base, current_hit_points=7, race="Elf")
+    merged, conflicts = merge_rosters({"Ana": base}, {"Ana": ours}, {"Ana": theirs})
+    assert list(conflicts) == ["Ana"]
+    assert conflicts["Ana"][0].startswith("current_hit_points ")
+    assert merged["Ana"]["current_hit_points"] == 7
+    assert merged["Ana"]["race"] == "Elf"
+
+
+def test_merge_keeps_additions_and_deletions_from_both_sides():
+    base = {name: normalize_record(Character(name).to_dict()) for name in ("Ana", "Bo")}
+    ours = {"Ana": base["Ana"], "Cy": normalize_record(Character("Cy").to_dict())}
+    theirs = {"Ana": base["Ana"], "Bo": base["Bo"], "Di": normalize_record(Character("Di").to_dict())}
+    merged, conflicts = merge_rosters(base, ours, theirs)
+    assert conflicts == {}
+    assert sorted(merged) == ["Ana", "Cy", "Di"]
+
+
+def test_save_of_legacy_roster_keeps_new_fields(legacy_file):
+    manager = CharacterManager(legacy_file, verbose=False)
+    manager.characters["Lycaon"].hit_dice_used = 1
+    assert manager.save_characters()
+    assert manager.last_conflicts == {}
+    saved = _read(legacy_file)["Lycaon"]
+    assert saved["hit_dice_used"] == 1
+    assert saved["class_level"] == "Ranger 2"
+    assert set(vars(Character())) <= saved.keys()
+
+
+def test_save_merges_legacy_roster_edited_by_another_session(legacy_file):
+    manager = CharacterManager(legacy_file, verbose=False)
+    # Another session (or a hand edit) changes the legacy file after we loaded it
+    disk = _read(legacy_file)
+    disk["Lycaon"]["background"] = "Outlander"
+    with open(legacy_file, "w", encoding="utf-8") as f:
+        json.dump(disk, f, indent=2)
+
+    manager.characters["Lycaon"].current_hit_points = 10
+    assert manager.save_characters()
+    assert manager.last_conflicts == {}
+    saved = _read(legacy_file)["Lycaon"]
+    assert saved["current_hit_points"] == 10
+    assert saved["background"] == "Outlander"
@@ -0,0 +1,88 @@
+"""Snapshots beside roster and inventory files: a damaged one is ignored and the file parsed instead."""
+
+import json
+import os
+import pickle
+
+import pytest
+
+from character_maker import Character, CharacterManager
+from dnd_inventory import InventoryManager
+from game_data import CACHE_FORMAT, snapshot_path
+from roster_sync import normalize_record
+
+
+@pytest.fixture
+def roster_file(tmp_path):
+    path = str(tmp_path / "characters.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({name: normalize_record(Character(name).to_dict()) for name in ("Ana", "Bo")}, f)
+    CharacterManager(path, verbose=False)  # Writes the snapshot
+    assert os.path.exists(snapshot_path(path))
+    return path
+
+
+@pytest.fixture
+def inventory_file(tmp_path, capsys):
+    path = str(tmp_path / "character_inventory.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"character_name": "Ana", "items": [
+            {"name": "Rope", "weight": 10.0, "rarity": "Common", "quantity": 2}]}, f)
+    InventoryManager(path)
+    assert os.path.exists(snapshot_path(path))
+    return path
+
+
+def _damage(path, offset, value):
+    with open(snapshot_path(path), "rb") as f:
+        raw = bytearray(f.read())
+    raw[offset % len(raw)] = value
+    with open(snapshot_path(path), "wb") as f:
+        f.write(raw)
+
+
+def _replace(path, data):
+    with open(snapshot_path(path), "wb") as f:
+        pickle.dump(data, f)
+
+
+@pytest.mark.parametrize("offset", [0, 1, 2, 10, 50, -40, -2, -1])
+@pytest.mark.parametrize("value", [0x00, 0xff])
+def test_damaged_roster_snapshot_falls_back_to_file(roster_file, offset, value):
+    _damage(roster_file, offset, value)
+    manager = CharacterManager(roster_file, verbose=False)
+    assert sorted(manager.characters) == ["Ana", "Bo"]
+
+
+@pytest.mark.parametrize("data", [
+    {"characters": [], "baseline": {}, "format": "json"},
+    {"characters": {"Ana": "not attributes"}, "baseline": {}, "format": "json"},
+    {"characters": {"Ana": {"name": "Ana"}}, "baseline": {}, "format": "json"},
+    ["not", "a", "snapshot"],
+])
+def test_misshapen_roster_snapshot_falls_back_to_file(roster_file, data):
+    with open(snapshot_path(roster_file), "rb") as f:
+        stored = pickle.load(f)
+    _replace(roster_file, {**stored, "data": data})
+    manager = CharacterManager(roster_file, verbose=False)
+    assert sorted(manager.characters) == ["Ana", "Bo"]
+    assert manager.characters["Ana"].name == "Ana"
+
+
+@pytest.mark.parametrize("offset", [0, 1, 2, 10, -20, -2, -1])
+def test_damaged_inventory_snapshot_never_empties_the_file(inventory_file, offset):
+    _damage(inventory_file, offset, 0xff)
+    manager = InventoryManager(inventory_file)
+    assert [item.name for item in manager.items] == ["Rope"]
+    manager.save_inventory()
+    with open(inventory_file, encoding="utf-8") as f:
+        assert [item["name"] for item in json.load(f)["items"]] == ["Rope"]
+
+
+def test_misshapen_inventory_snapshot_falls_back_to_file(inventory_file):
+    with open(snapshot_path(inventory_file), "rb") as f:
+        stored = pickle.load(f)
+    assert stored["format"] == CACHE_FORMAT
+    _replace(inventory_file, {**stored, "data": {"character_name": "Ana", "items": [{"name": "Rope"}]}})
+    manager = InventoryManager(inventory_file)
+    assert manager.items[0].quantity == 2